@@ -1,11 +1,16 @@
 from rest_framework.serializers import ModelSerializer
 
 from apps.drivers.models import Driver
+from apps.locations.api.serializers import LocationSerializer
 from apps.users.api.serializers import UserSerializer
+from apps.utils.serializers import ExpandableSerializerMixin
 
 
-class DriverSerializer(ModelSerializer):
-    user = UserSerializer(many=False, read_only=True)
+class DriverSerializer(ExpandableSerializerMixin, ModelSerializer):
+    expandable_fields = {
+        "user": UserSerializer,
+        "current_location": LocationSerializer,
+    }
 
     class Meta:
         model = Driver
@@ -17,5 +22,7 @@ class DriverSerializer(ModelSerializer):
             "status",
             "current_cycle_hours",
             "home_terminal_time_zone",
+            "hos_rule_set",
             "created_at",
         ]
+        read_only_fields = ["user"]
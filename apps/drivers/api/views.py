@@ -13,6 +13,7 @@ class DriverViewSet(BaseViewSet):
     queryset = Driver.objects.all()
     serializer_class = DriverSerializer
     pagination_class = CustomPagination()
+    query_budget = {"list": 4}
 
     def list(self, request, *args, **kwargs):
         """
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("drivers", "0002_remove_driver_last_updated"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="driver",
+            name="hos_rule_set",
+            field=models.CharField(
+                choices=[
+                    ("us_property_70_8", "US property-carrying, 70 hours / 8 days"),
+                    ("us_property_60_7", "US property-carrying, 60 hours / 7 days"),
+                    (
+                        "us_short_haul",
+                        "US short-haul (150 air-mile), 70 hours / 8 days",
+                    ),
+                    (
+                        "us_adverse_conditions",
+                        "US adverse driving conditions, 70 hours / 8 days",
+                    ),
+                ],
+                default="us_property_70_8",
+                max_length=32,
+            ),
+        ),
+    ]
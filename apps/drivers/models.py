@@ -2,6 +2,8 @@ from apps.utils.base import BaseModel
 
 from django.db import models
 
+from apps.logs.rules import DEFAULT_RULE_SET, RULE_SET_CHOICES
+
 
 class Driver(BaseModel):
     user = models.OneToOneField("users.User", on_delete=models.CASCADE)
@@ -21,6 +23,9 @@ class Driver(BaseModel):
     )
     current_cycle_hours = models.FloatField(default=0.0)
     home_terminal_time_zone = models.CharField(max_length=50)
+    hos_rule_set = models.CharField(
+        max_length=32, choices=RULE_SET_CHOICES, default=DEFAULT_RULE_SET
+    )
 
     def __str__(self):
         return f"{self.user.get_fullname} ({self.license_number})"
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from apps.locations.models import Location
+from apps.locations.models import Location, GeocodeCacheEntry
 
 
 @admin.register(Location)
@@ -8,3 +8,10 @@ class LocationAdmin(admin.ModelAdmin):
     list_display = ("id", "address", "latitude", "longitude", "updated_at")
     search_fields = ("address",)
     ordering = ("-created_at",)
+
+
+@admin.register(GeocodeCacheEntry)
+class GeocodeCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ("id", "query", "location", "expires_at")
+    search_fields = ("query",)
+    ordering = ("-expires_at",)
@@ -0,0 +1,177 @@
+# apps/locations/geocoders.py
+import csv
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+Coordinates = Tuple[float, float]
+
+ZIP_RE = re.compile(r"\b(\d{5})(?:-\d{4})?\b")
+
+
+class BaseGeocoder:
+    """
+    Geocoder backend interface.
+
+    `geocode` returns (lat, lon), or None when the backend has no result.
+    Remote backends are network services: their answers go through the
+    geocode cache and are looked up concurrently. Local backends are
+    queried inline, before the cache.
+    """
+
+    remote = False
+
+    def geocode(self, address: str, countrycodes: str = "us") -> Optional[Coordinates]:
+        raise NotImplementedError
+
+
+class NominatimGeocoder(BaseGeocoder):
+    """
+    OpenStreetMap Nominatim search API over a shared keep-alive session.
+    """
+
+    remote = True
+
+    def __init__(self):
+        self.url = settings.NOMINATIM_URL
+        self.timeout = settings.GEOCODER_TIMEOUT
+        self.session = requests.Session()
+        self.session.mount(
+            "https://",
+            requests.adapters.HTTPAdapter(
+                pool_connections=1, pool_maxsize=settings.GEOCODE_MAX_WORKERS
+            ),
+        )
+        self.session.headers["User-Agent"] = "hos-app/1.0"
+
+    def geocode(self, address: str, countrycodes: str = "us") -> Optional[Coordinates]:
+        params = {
+            "format": "json",
+            "q": address,
+            "limit": 1,
+            "countrycodes": countrycodes,
+        }
+        resp = self.session.get(self.url, params=params, timeout=self.timeout)
+        resp.raise_for_status()
+        data = resp.json()
+        if not data:
+            return None
+        return float(data[0]["lat"]), float(data[0]["lon"])
+
+
+class LocalGazetteerGeocoder(BaseGeocoder):
+    """
+    Offline US geocoder over a city/ZIP gazetteer CSV.
+
+    The CSV needs `zip`, `city`, `state`, `latitude` and `longitude` columns
+    (`lat`/`lon`/`lng` are accepted too). Rows are indexed by ZIP code and by
+    normalized "city state"; keys are kept sorted for prefix search and
+    coordinates are packed into a single float array.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.GEOCODER_GAZETTEER_PATH
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._keys: List[str] = []
+        self._slots = array("l")
+        self._coords = array("d")
+        self._index = {}
+
+    def geocode(self, address: str, countrycodes: str = "us") -> Optional[Coordinates]:
+        if "us" not in countrycodes.lower().split(","):
+            return None
+        self._load()
+        if not self._index:
+            return None
+
+        # A ZIP code is the most precise thing the gazetteer knows about
+        for zip_code in reversed(ZIP_RE.findall(address)):
+            slot = self._index.get(zip_code)
+            if slot is not None:
+                return self._point(slot)
+
+        # Otherwise match the trailing "city state" words, longest city first
+        words = ZIP_RE.sub(" ", _normalize(address)).split()
+        for end in range(len(words), 1, -1):
+            for start in range(max(0, end - 4), end - 1):
+                slot = self._index.get(" ".join(words[start:end]))
+                if slot is not None:
+                    return self._point(slot)
+        return None
+
+    def search(self, prefix: str, limit: int = 10) -> List[Tuple[str, Coordinates]]:
+        """
+        Return up to `limit` (key, (lat, lon)) entries whose key starts with prefix.
+        """
+        self._load()
+        prefix = _normalize(prefix)
+        matches = []
+        i = bisect_left(self._keys, prefix)
+        while i < len(self._keys) and len(matches) < limit:
+            if not self._keys[i].startswith(prefix):
+                break
+            matches.append((self._keys[i], self._point(self._slots[i])))
+            i += 1
+        return matches
+
+    def _point(self, slot: int) -> Coordinates:
+        return self._coords[2 * slot], self._coords[2 * slot + 1]
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            if self.path:
+                self._read(self.path)
+            self._loaded = True
+
+    def _read(self, path: str) -> None:
+        index = {}
+        coords = array("d")
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                row = {k.strip().lower(): (v or "").strip() for k, v in row.items()}
+                try:
+                    lat = float(row.get("latitude") or row.get("lat"))
+                    lon = float(
+                        row.get("longitude") or row.get("lon") or row.get("lng")
+                    )
+                except (TypeError, ValueError):
+                    continue
+                slot = len(coords) // 2
+                coords.extend((lat, lon))
+                zip_code = row.get("zip", "")[:5]
+                if zip_code:
+                    index.setdefault(zip_code, slot)
+                city, state = _normalize(row.get("city", "")), _normalize(
+                    row.get("state", "")
+                )
+                if city and state:
+                    index.setdefault(f"{city} {state}", slot)
+
+        self._keys = sorted(index)
+        self._slots = array("l", (index[key] for key in self._keys))
+        self._coords = coords
+        self._index = index
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+@lru_cache(maxsize=None)
+def get_geocoders() -> Tuple[BaseGeocoder, ...]:
+    """
+    Instantiate the backends listed in settings.GEOCODER_BACKENDS, in order.
+    """
+    return tuple(import_string(path)() for path in settings.GEOCODER_BACKENDS)
@@ -10,3 +10,26 @@ class Location(BaseModel):
 
     def __str__(self):
         return f"{self.address} ({self.latitude}, {self.longitude})"
+
+
+class GeocodeCacheEntry(BaseModel):
+    """
+    Cached geocoding result keyed by normalized address.
+    A null location records that the geocoder returned no result.
+    """
+
+    query = models.CharField(max_length=255, unique=True)
+    location = models.ForeignKey(
+        "locations.Location",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="geocode_cache_entries",
+    )
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.query} -> {self.location or 'no result'}"
+
+    class Meta:
+        verbose_name_plural = "Geocode Cache Entries"
@@ -0,0 +1,155 @@
+# apps/locations/services.py
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.locations.models import Location, GeocodeCacheEntry
+
+Coordinates = Tuple[float, float]
+
+MAX_QUERY_LENGTH = 255
+
+
+def normalize_address(address: str, countrycodes: str = "us") -> str:
+    """
+    Build the cache key for an address: lowercase, punctuation stripped,
+    whitespace collapsed and prefixed with the country filter.
+    "123 Main St., Dallas TX" and "123 main st dallas, tx" share a key.
+    """
+    words = re.sub(r"[^\w\s]", " ", address.lower()).split()
+    key = f"{countrycodes.lower()}:{' '.join(words)}"
+    if len(key) > MAX_QUERY_LENGTH:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        key = f"{key[:MAX_QUERY_LENGTH - len(digest) - 1]}#{digest}"
+    return key
+
+
+class GeocodeCache:
+    """
+    In-process LRU in front of GeocodeCacheEntry rows.
+
+    Values are (lat, lon) tuples, or None for addresses the geocoder had
+    no result for (negative entries, kept for a shorter TTL).
+    """
+
+    def __init__(self, max_size: int, ttl: int, negative_ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Optional[Coordinates]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.db_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def lookup(self, key: str) -> Tuple[bool, Optional[Coordinates]]:
+        """
+        Returns (found, coords). coords is None for a cached negative result.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, coords = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self._count_hit(coords)
+                    return True, coords
+                del self._entries[key]
+
+        row = (
+            GeocodeCacheEntry.objects.select_related("location")
+            .filter(query=key, expires_at__gt=timezone.now())
+            .first()
+        )
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return False, None
+
+        coords = (
+            (row.location.latitude, row.location.longitude) if row.location else None
+        )
+        remaining = (row.expires_at - timezone.now()).total_seconds()
+        with self._lock:
+            self.db_hits += 1
+            self._count_hit(coords)
+            self._remember(key, coords, now + remaining)
+        return True, coords
+
+    def store(self, key: str, address: str, coords: Optional[Coordinates]) -> None:
+        """
+        Cache a geocode result (or None for "no result") in memory and in the DB.
+        """
+        ttl = self.ttl if coords is not None else self.negative_ttl
+        with self._lock:
+            self._remember(key, coords, time.monotonic() + ttl)
+
+        expires_at = timezone.now() + timedelta(seconds=ttl)
+        with transaction.atomic():
+            entry, _ = GeocodeCacheEntry.objects.select_for_update().get_or_create(
+                query=key, defaults={"expires_at": expires_at}
+            )
+            if coords is None:
+                entry.location = None
+            elif entry.location_id:
+                Location.objects.filter(id=entry.location_id).update(
+                    latitude=coords[0], longitude=coords[1]
+                )
+            else:
+                entry.location = Location.objects.create(
+                    address=address[:MAX_QUERY_LENGTH],
+                    latitude=coords[0],
+                    longitude=coords[1],
+                )
+            entry.expires_at = expires_at
+            entry.save(update_fields=["location", "expires_at", "updated_at"])
+
+    def clear(self) -> None:
+        """
+        Drop the in-process entries and reset counters (DB rows are kept).
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.db_hits = self.negative_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "db_hits": self.db_hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+            }
+
+    def _count_hit(self, coords: Optional[Coordinates]) -> None:
+        self.hits += 1
+        if coords is None:
+            self.negative_hits += 1
+
+    def _remember(
+        self, key: str, coords: Optional[Coordinates], expires: float
+    ) -> None:
+        self._entries[key] = (expires, coords)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+geocode_cache = GeocodeCache(
+    max_size=settings.GEOCODE_CACHE_SIZE,
+    ttl=settings.GEOCODE_CACHE_TTL,
+    negative_ttl=settings.GEOCODE_NEGATIVE_CACHE_TTL,
+)
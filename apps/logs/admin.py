@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from apps.logs.models import HOSLog, HOSViolation, DutyPeriod
+from apps.logs.models import HOSLog, HOSViolation, DutyPeriod, DriverDailyDuty
 
 
 @admin.register(HOSLog)
@@ -32,3 +32,11 @@ class HOSViolationAdmin(admin.ModelAdmin):
     )
     list_filter = ("type", "severity", "resolved", "timestamp")
     ordering = ("-timestamp",)
+
+
+@admin.register(DriverDailyDuty)
+class DriverDailyDutyAdmin(admin.ModelAdmin):
+    list_display = ("id", "driver", "day", "on_duty_minutes", "driving_minutes")
+    search_fields = ("driver__user__first_name", "driver__user__last_name")
+    list_filter = ("day",)
+    ordering = ("-day",)
@@ -3,11 +3,15 @@ from rest_framework.serializers import ModelSerializer
 from apps.logs.models import HOSLog, HOSViolation, DutyPeriod
 from apps.trips.api.serializers import TripSerializer
 from apps.drivers.api.serializers import DriverSerializer
+from apps.locations.api.serializers import LocationSerializer
+from apps.utils.serializers import ExpandableSerializerMixin
 
 
-class HOSLogSerializer(ModelSerializer):
-    trip = TripSerializer(many=False, read_only=True)
-    driver = DriverSerializer(many=False, read_only=False)
+class HOSLogSerializer(ExpandableSerializerMixin, ModelSerializer):
+    expandable_fields = {
+        "driver": DriverSerializer,
+        "trip": TripSerializer,
+    }
 
     class Meta:
         model = HOSLog
@@ -23,10 +27,14 @@ class HOSLogSerializer(ModelSerializer):
             "cycle_hours_used",
             "created_at",
         ]
+        read_only_fields = ["trip"]
 
 
-class DutyPeriodSerializer(ModelSerializer):
-    hos_log = HOSLogSerializer(many=False, read_only=True)
+class DutyPeriodSerializer(ExpandableSerializerMixin, ModelSerializer):
+    expandable_fields = {
+        "hos_log": HOSLogSerializer,
+        "location": LocationSerializer,
+    }
 
     class Meta:
         model = DutyPeriod
@@ -41,10 +49,11 @@ class DutyPeriodSerializer(ModelSerializer):
             "notes",
             "created_at",
         ]
+        read_only_fields = ["hos_log"]
 
 
-class HOSViolationSerializer(ModelSerializer):
-    hos_log = HOSLogSerializer(many=False, read_only=True)
+class HOSViolationSerializer(ExpandableSerializerMixin, ModelSerializer):
+    expandable_fields = {"hos_log": HOSLogSerializer}
 
     class Meta:
         model = HOSViolation
@@ -58,3 +67,4 @@ class HOSViolationSerializer(ModelSerializer):
             "resolved",
             "created_at",
         ]
+        read_only_fields = ["hos_log"]
@@ -1,8 +1,13 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.utils.http import parse_etags, quote_etag
+
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 
-from apps.logs.models import HOSLog, DutyPeriod, HOSViolation
+from apps.logs.models import HOSLog, DutyPeriod
 from apps.logs.api.serializers import (
     HOSLogSerializer,
     DutyPeriodSerializer,
@@ -10,8 +15,18 @@ from apps.logs.api.serializers import (
 )
 from apps.utils.pagination import CustomPagination
 from apps.utils.base import BaseViewSet
-from apps.logs.services import calculate_hos_status, generate_optimized_schedule
-from django.db import transaction
+from apps.logs.blocks import serialize_blocks
+from apps.logs.ingest import ingest_duty_events
+from apps.logs.persistence import save_duty_blocks, save_violations
+from apps.logs.services import (
+    fleet_availability,
+    generate_optimized_schedule,
+    hos_check_version,
+    load_hos_state,
+    log_rule_set,
+    prior_cycle_hours,
+    record_duty_period,
+)
 
 
 class HOSLogViewSet(BaseViewSet):
@@ -23,6 +38,7 @@ class HOSLogViewSet(BaseViewSet):
     queryset = HOSLog.objects.all().order_by("-created_at")
     serializer_class = HOSLogSerializer
     pagination_class = CustomPagination()
+    query_budget = {"list": 4, "retrieve": 3, "check": 10, "fleet": 5}
 
     def list(self, request, *args, **kwargs):
         """
@@ -54,13 +70,14 @@ class HOSLogViewSet(BaseViewSet):
         """
         GET /api/hos/logs/{log_id}/ → retrieve a single log.
         """
-        log = self.queryset.filter(id=kwargs.get("log_id")).first()
+        logs = self.serializer_class.optimize_queryset(self.queryset, request)
+        log = logs.filter(id=kwargs.get("log_id")).first()
         if log is None:
             return Response(
                 {"message": "Log not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
-        serializer = self.serializer_class(log)
+        serializer = self.serializer_class(log, context={"request": request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def update(self, request, *args, **kwargs):
@@ -77,7 +94,8 @@ class HOSLogViewSet(BaseViewSet):
         if not serializer.is_valid(raise_exception=True):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer.save()
+        # The starting cycle hours may have changed: replay on next check
+        serializer.save(hos_state=None)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def destroy(self, request, *args, **kwargs):
@@ -93,6 +111,50 @@ class HOSLogViewSet(BaseViewSet):
         log.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=["get"], url_path="fleet")
+    def fleet(self, request, *args, **kwargs):
+        """
+        GET /api/hos/fleet/ → every driver's remaining driving, on-duty and
+        cycle hours right now, most driving time first, and when the next
+        cycle hours come back (nextRecaptureAt, nextRecaptureHours).
+        ?available=1 keeps only drivers who can drive.
+        """
+        availability = fleet_availability()
+        if request.query_params.get("available") in ("1", "true"):
+            availability = [row for row in availability if row["canDrive"]]
+        return Response(
+            {"total": len(availability), "results": availability},
+            status=status.HTTP_200_OK,
+        )
+
+    @action(detail=False, methods=["post"], url_path="ingest")
+    def ingest(self, request, *args, **kwargs):
+        """
+        POST /api/hos/ingest/ → bulk-load duty status changes from devices.
+        Body: newline-delimited JSON, one event per line:
+        {"driver_id", "device_id", "sequence", "status", "timestamp"} and
+        optionally "log_id" and "notes". Each event closes the driver's
+        open period and opens a new one; repeated device sequence numbers
+        are skipped. Returns counts plus the lines that were rejected.
+        """
+        try:
+            result = ingest_duty_events(
+                request.stream or (), max_events=settings.ELD_INGEST_MAX_EVENTS
+            )
+        except ValueError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
+            # Another batch stored one of these periods meanwhile; nothing
+            # of this one was written
+            return Response(
+                {
+                    "message": "Conflicting duty periods were written "
+                    "meanwhile; retry the batch"
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(result, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=["get", "post"], url_path="periods")
     def periods(self, request, *args, **kwargs):
         """
@@ -106,15 +168,26 @@ class HOSLogViewSet(BaseViewSet):
             )
 
         if request.method == "GET":
-            periods = log.dutyperiod_set.all()
-            serializer = DutyPeriodSerializer(periods, many=True)
+            periods = DutyPeriodSerializer.optimize_queryset(
+                log.duty_periods.all(), request
+            )
+            serializer = DutyPeriodSerializer(
+                periods, many=True, context={"request": request}
+            )
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         serializer = DutyPeriodSerializer(data=request.data)
         if not serializer.is_valid(raise_exception=True):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        start_time = serializer.validated_data["start_time"]
+        if log.duty_periods.filter(start_time=start_time).exists():
+            return Response(
+                {"message": "A duty period already starts at that time"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        serializer.save(hos_log=log)
+        period = serializer.save(hos_log=log)
+        record_duty_period(log, period)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=["get", "post"], url_path="violations")
@@ -130,13 +203,22 @@ class HOSLogViewSet(BaseViewSet):
             )
 
         if request.method == "GET":
-            violations = log.hosviolation_set.all()
-            serializer = HOSViolationSerializer(violations, many=True)
+            violations = HOSViolationSerializer.optimize_queryset(
+                log.violations.all(), request
+            )
+            serializer = HOSViolationSerializer(
+                violations, many=True, context={"request": request}
+            )
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         serializer = HOSViolationSerializer(data=request.data)
         if not serializer.is_valid(raise_exception=True):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if log.violations.filter(type=serializer.validated_data["type"]).exists():
+            return Response(
+                {"message": "The log already has a violation of that type"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         serializer.save(hos_log=log)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -146,6 +228,9 @@ class HOSLogViewSet(BaseViewSet):
         """
         GET /api/hos/logs/{log_id}/check/
         → calculates HOS status and violations, saves violations in DB.
+        The ETag is the log's hos_check_version: If-None-Match gets a 304
+        while the duty periods are unchanged, and unchanged input is served
+        from the cache without rewriting violations.
         """
         log = self.queryset.filter(id=kwargs.get("log_id")).first()
         if not log:
@@ -153,33 +238,27 @@ class HOSLogViewSet(BaseViewSet):
                 {"message": "Log not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
-        # Build duty periods list
-        periods = [
-            {
-                "status": dp.status,
-                "start_time": dp.start_time.isoformat(),
-                "end_time": dp.end_time.isoformat(),
-            }
-            for dp in log.dutyperiod_set.all()
-        ]
-
-        hos_result = calculate_hos_status(
-            periods, getattr(log, "cycle_hours_used", 0.0)
-        )
-
-        # Save violations in DB
-        with transaction.atomic():
-            log.hosviolation_set.all().delete()
-            for v in hos_result.get("violations", []):
-                HOSViolation.objects.create(
-                    hos_log=log,
-                    violation_type=v["type"],
-                    severity=v["severity"],
-                    message=v["message"],
-                    time_remaining=v.get("timeRemaining"),
-                )
-
-        return Response({"hos_status": hos_result}, status=status.HTTP_200_OK)
+        version = hos_check_version(log)
+        etag = quote_etag(version)
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache_key = f"hos-check:{log.id}:{version}"
+            hos_result = cache.get(cache_key)
+            if hos_result is None:
+                # Resume from the log's snapshot instead of replaying every period
+                hos_result = load_hos_state(log).status()
+                cache.set(cache_key, hos_result, settings.HOS_CHECK_CACHE_TIMEOUT)
+
+            # Save violations in DB, once per version
+            if log.violations_version != version:
+                save_violations(log, hos_result.get("violations", []))
+                HOSLog.objects.filter(id=log.id).update(violations_version=version)
+
+            response = Response({"hos_status": hos_result}, status=status.HTTP_200_OK)
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
 
     @action(detail=True, methods=["post"], url_path="schedule")
     def schedule(self, request, *args, **kwargs):
@@ -187,6 +266,7 @@ class HOSLogViewSet(BaseViewSet):
         POST /api/hos/logs/{log_id}/schedule/
         → generate + save optimized schedule as DutyPeriod records.
         Body: { "start_time": "2025-09-20T06:00:00", "total_driving_hours": 10 }
+        Optional "sleeper_split": true lets the plan use sleeper-berth splits.
         """
         log = self.queryset.filter(id=kwargs.get("log_id")).first()
         if not log:
@@ -206,22 +286,17 @@ class HOSLogViewSet(BaseViewSet):
         schedule = generate_optimized_schedule(
             start_time,
             float(total_driving),
-            float(getattr(log, "cycle_hours_used", 0.0)),
+            prior_cycle_hours(log),
+            rules=log_rule_set(log),
+            sleeper_split=bool(request.data.get("sleeper_split")),
         )
 
         # Save schedule to DB as DutyPeriods
-        with transaction.atomic():
-            log.dutyperiod_set.all().delete()
-            for block in schedule:
-                DutyPeriod.objects.create(
-                    hos_log=log,
-                    status=block["status"],
-                    start_time=block["startTime"],
-                    end_time=block["endTime"],
-                    remarks=block.get("remarks", ""),
-                )
+        save_duty_blocks(log, schedule)
 
-        return Response({"schedule": schedule}, status=status.HTTP_200_OK)
+        return Response(
+            {"schedule": serialize_blocks(schedule)}, status=status.HTTP_200_OK
+        )
 
 
 class DutyPeriodViewSet(BaseViewSet):
@@ -248,8 +323,23 @@ class DutyPeriodViewSet(BaseViewSet):
         serializer = self.serializer_class(period, data=request.data, partial=True)
         if not serializer.is_valid(raise_exception=True):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        start_time = serializer.validated_data.get("start_time")
+        if (
+            start_time is not None
+            and DutyPeriod.objects.filter(
+                hos_log_id=period.hos_log_id, start_time=start_time
+            )
+            .exclude(id=period.id)
+            .exists()
+        ):
+            return Response(
+                {"message": "A duty period already starts at that time"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         serializer.save()
+        # Editing history invalidates the log's HOS snapshot
+        HOSLog.objects.filter(id=period.hos_log_id).update(hos_state=None)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def destroy(self, request, *args, **kwargs):
@@ -264,4 +354,5 @@ class DutyPeriodViewSet(BaseViewSet):
             )
 
         period.delete()
+        HOSLog.objects.filter(id=period.hos_log_id).update(hos_state=None)
         return Response(status=status.HTTP_204_NO_CONTENT)
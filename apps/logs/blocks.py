@@ -0,0 +1,81 @@
+# apps/logs/blocks.py
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, Iterable, List
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def epoch_minutes(value: datetime) -> int:
+    """
+    Whole minutes since the Unix epoch. Naive datetimes are taken as UTC.
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt_timezone.utc)
+    return int(value.timestamp()) // 60
+
+
+def from_epoch_minutes(minutes: int) -> datetime:
+    return EPOCH + timedelta(minutes=minutes)
+
+
+class DutyBlock:
+    """
+    A stretch of one duty status, [start, end) in whole minutes since the
+    Unix epoch (UTC).
+
+    Schedules are generated, checked and persisted as DutyBlocks; they are
+    only turned into ISO strings at the API edge (`as_dict`), and API input
+    only parsed once (`from_dict`).
+    """
+
+    __slots__ = ("status", "start", "end", "remarks")
+
+    def __init__(self, status: str, start: int, end: int, remarks: str = ""):
+        self.status = status
+        self.start = start
+        self.end = end
+        self.remarks = remarks
+
+    def __repr__(self):
+        return f"<DutyBlock {self.status} {self.start}-{self.end}>"
+
+    @property
+    def minutes(self) -> int:
+        return self.end - self.start
+
+    @property
+    def start_time(self) -> datetime:
+        return from_epoch_minutes(self.start)
+
+    @property
+    def end_time(self) -> datetime:
+        return from_epoch_minutes(self.end)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DutyBlock":
+        """
+        Parse an API dict with status, start_time and end_time (ISO) keys.
+        Raises KeyError/ValueError/TypeError for malformed input.
+        """
+        return cls(
+            data["status"],
+            epoch_minutes(datetime.fromisoformat(data["start_time"])),
+            epoch_minutes(datetime.fromisoformat(data["end_time"])),
+            data.get("remarks") or "",
+        )
+
+    def as_dict(self, block_id: str) -> Dict[str, Any]:
+        return {
+            "id": block_id,
+            "status": self.status,
+            "start_time": self.start_time.isoformat(),
+            "end_time": self.end_time.isoformat(),
+            "remarks": self.remarks,
+        }
+
+
+def serialize_blocks(blocks: Iterable[DutyBlock]) -> List[Dict[str, Any]]:
+    """
+    DutyBlock-like dicts for API responses, with ids block-1, block-2, ...
+    """
+    return [block.as_dict(f"block-{index}") for index, block in enumerate(blocks, 1)]
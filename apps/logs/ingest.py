@@ -0,0 +1,364 @@
+# apps/logs/ingest.py
+import json
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Dict, Iterable, List
+
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Q, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.drivers.models import Driver
+from apps.logs.models import DutyPeriod, HOSLog
+from apps.logs.services import (
+    refresh_drivers_daily_duty,
+    refresh_log_totals,
+    update_drivers_cycle_hours,
+)
+
+DUTY_STATUSES = frozenset(
+    value for value, _ in DutyPeriod._meta.get_field("status").choices
+)
+DEVICE_ID_MAX_LENGTH = DutyPeriod._meta.get_field("device_id").max_length
+
+
+class DutyEvent:
+    """
+    One duty status change reported by an in-cab device: from `timestamp`
+    on, the driver is in `status`.
+    """
+
+    __slots__ = (
+        "line",
+        "driver_id",
+        "device_id",
+        "sequence",
+        "status",
+        "timestamp",
+        "log_id",
+        "notes",
+    )
+
+    def __init__(self, line: int, data: Dict[str, Any]):
+        self.line = line
+        self.driver_id = _uuid(data.get("driver_id"), "driver_id")
+        self.device_id = data.get("device_id")
+        if (
+            not isinstance(self.device_id, str)
+            or not self.device_id
+            or len(self.device_id) > DEVICE_ID_MAX_LENGTH
+        ):
+            raise ValueError(
+                "device_id must be a non-empty string of at most "
+                f"{DEVICE_ID_MAX_LENGTH} characters"
+            )
+        self.sequence = data.get("sequence")
+        if (
+            not isinstance(self.sequence, int)
+            or isinstance(self.sequence, bool)
+            or self.sequence < 0
+        ):
+            raise ValueError("sequence must be a non-negative integer")
+        self.status = data.get("status")
+        if self.status not in DUTY_STATUSES:
+            raise ValueError(f"status must be one of {sorted(DUTY_STATUSES)}")
+        self.timestamp = _timestamp(data.get("timestamp"))
+        self.log_id = (
+            _uuid(data["log_id"], "log_id") if data.get("log_id") is not None else None
+        )
+        self.notes = data.get("notes")
+        if self.notes is not None and not isinstance(self.notes, str):
+            raise ValueError("notes must be a string")
+
+
+def _uuid(value: Any, field: str) -> uuid.UUID:
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        raise ValueError(f"{field} must be a UUID") from None
+
+
+def _timestamp(value: Any) -> datetime:
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise ValueError("timestamp must be an ISO 8601 date and time")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt_timezone.utc)
+    return parsed
+
+
+def _minutes(start: datetime, end: datetime) -> int:
+    return int((end - start).total_seconds() // 60)
+
+
+def parse_events(lines: Iterable[bytes], max_events: int):
+    """
+    Parse NDJSON duty events, dropping repeated (device_id, sequence) pairs.
+    Returns (events, rejected, duplicates); rejected lines are reported as
+    {"line", "error"}. Raises ValueError past `max_events` events.
+    """
+    events: List[DutyEvent] = []
+    rejected: List[Dict[str, Any]] = []
+    seen = set()
+    duplicates = 0
+    for number, raw in enumerate(lines, 1):
+        if not raw.strip():
+            continue
+        if len(events) + len(rejected) + duplicates >= max_events:
+            raise ValueError(f"A batch can hold at most {max_events} events")
+        try:
+            data = json.loads(raw)
+            if not isinstance(data, dict):
+                raise ValueError("Each line must be a JSON object")
+            event = DutyEvent(number, data)
+        except ValueError as exc:
+            # json.JSONDecodeError is a ValueError too
+            rejected.append({"line": number, "error": str(exc)})
+            continue
+        key = (event.device_id, event.sequence)
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        events.append(event)
+    return events, rejected, duplicates
+
+
+def _stored_sequences(events: List[DutyEvent]) -> set:
+    # One query, bounded by each device's sequence range
+    ranges: Dict[str, List[int]] = {}
+    for event in events:
+        low_high = ranges.setdefault(event.device_id, [event.sequence] * 2)
+        low_high[0] = min(low_high[0], event.sequence)
+        low_high[1] = max(low_high[1], event.sequence)
+    condition = Q()
+    for device_id, (low, high) in ranges.items():
+        condition |= Q(device_id=device_id, sequence__range=(low, high))
+    return set(
+        DutyPeriod.objects.filter(condition).values_list("device_id", "sequence")
+    )
+
+
+def _existing_starts(planned: Dict[uuid.UUID, tuple]) -> set:
+    # (log id, start time) pairs already taken, for the logs events go to
+    logs = set()
+    times = set()
+    for log_id, events in planned.values():
+        for event in events:
+            logs.add(event.log_id or log_id)
+            times.add(event.timestamp)
+    if not logs:
+        return set()
+    return set(
+        DutyPeriod.objects.filter(
+            hos_log_id__in=logs, start_time__in=times
+        ).values_list("hos_log_id", "start_time")
+    )
+
+
+def ingest_duty_events(lines: Iterable[bytes], max_events: int) -> Dict[str, Any]:
+    """
+    Turn a batch of NDJSON duty status changes, for any number of drivers,
+    into DutyPeriods.
+
+    Each event opens a period that runs until the driver's next event; the
+    driver's previously open period is closed at their first event. Events
+    go to their `log_id`, else the driver's latest log, else a new one.
+    Events already stored (same device_id and sequence) are skipped; events
+    older than the driver's open period, or starting when a period of the
+    same log already starts, are rejected. Everything is written in one
+    transaction with bulk inserts/updates, holding locks on the drivers and
+    their open periods so that concurrent batches for a driver apply one
+    after the other; the daily rollups, log totals and HOS snapshots the
+    per-row signals would have maintained are refreshed once for the whole
+    batch.
+
+    Returns {"accepted", "closed", "duplicates", "rejected"}. Raises
+    IntegrityError if a concurrent write still claims one of the rows.
+    """
+    events, rejected, duplicates = parse_events(lines, max_events)
+    if not events:
+        return {
+            "accepted": 0,
+            "closed": 0,
+            "duplicates": duplicates,
+            "rejected": rejected,
+        }
+
+    latest_log = (
+        HOSLog.objects.filter(driver=OuterRef("pk"))
+        .order_by("-created_at")
+        .values("id")[:1]
+    )
+    with transaction.atomic():
+        # Locked in id order so that overlapping batches cannot deadlock
+        drivers = (
+            Driver.objects.select_for_update(of=("self",))
+            .only("id", "home_terminal_time_zone", "hos_rule_set")
+            .annotate(latest_log=Subquery(latest_log))
+            .order_by("pk")
+            .in_bulk({event.driver_id for event in events})
+        )
+        stored = _stored_sequences(events)
+        fresh = [e for e in events if (e.device_id, e.sequence) not in stored]
+        duplicates += len(events) - len(fresh)
+        log_drivers = dict(
+            HOSLog.objects.filter(
+                id__in={event.log_id for event in fresh if event.log_id}
+            ).values_list("id", "driver_id")
+        )
+
+        by_driver: Dict[uuid.UUID, List[DutyEvent]] = defaultdict(list)
+        for event in fresh:
+            if event.driver_id not in drivers:
+                rejected.append({"line": event.line, "error": "Driver not found"})
+            elif event.log_id and log_drivers.get(event.log_id) != event.driver_id:
+                rejected.append(
+                    {"line": event.line, "error": "Log not found for this driver"}
+                )
+            else:
+                by_driver[event.driver_id].append(event)
+
+        open_periods = defaultdict(list)
+        for period in (
+            DutyPeriod.objects.select_for_update(of=("self",))
+            .filter(hos_log__driver_id__in=list(by_driver), end_time__isnull=True)
+            .annotate(log_driver=F("hos_log__driver_id"))
+        ):
+            open_periods[period.log_driver].append(period)
+        # Events may not start inside time the driver has already closed
+        closed_until = dict(
+            DutyPeriod.objects.filter(
+                hos_log__driver_id__in=list(by_driver), end_time__isnull=False
+            )
+            .values("hos_log__driver_id")
+            .annotate(last_end=Max("end_time"))
+            .values_list("hos_log__driver_id", "last_end")
+        )
+
+        planned = {}  # driver id -> (log id, events in order)
+        for driver_id, driver_events in by_driver.items():
+            driver = drivers[driver_id]
+            driver_events.sort(key=lambda e: (e.timestamp, e.sequence))
+            open_start = max(
+                (p.start_time for p in open_periods[driver_id]), default=None
+            )
+            closed_end = closed_until.get(driver_id)
+
+            accepted: List[DutyEvent] = []
+            for event in driver_events:
+                if open_start is not None and event.timestamp <= open_start:
+                    rejected.append(
+                        {
+                            "line": event.line,
+                            "error": "Event is older than the driver's open "
+                            "duty period",
+                        }
+                    )
+                elif closed_end is not None and event.timestamp < closed_end:
+                    rejected.append(
+                        {
+                            "line": event.line,
+                            "error": "Event is older than the driver's last "
+                            "closed duty period",
+                        }
+                    )
+                elif accepted and accepted[-1].timestamp == event.timestamp:
+                    superseded = accepted.pop()
+                    rejected.append(
+                        {
+                            "line": superseded.line,
+                            "error": "Superseded by a later event at the same time",
+                        }
+                    )
+                    accepted.append(event)
+                else:
+                    accepted.append(event)
+            if accepted:
+                planned[driver_id] = (driver.latest_log, accepted)
+
+        taken = _existing_starts(planned)
+        now = timezone.now()
+        new_logs: List[HOSLog] = []
+        closed: List[DutyPeriod] = []
+        periods: List[DutyPeriod] = []
+        spans = {}  # driver id -> (start, end) of the closed time written
+        for driver_id, (log_id, accepted) in planned.items():
+            driver = drivers[driver_id]
+            kept: List[DutyEvent] = []
+            for event in accepted:
+                if (event.log_id or log_id, event.timestamp) in taken:
+                    rejected.append(
+                        {
+                            "line": event.line,
+                            "error": "A duty period already starts at this time",
+                        }
+                    )
+                else:
+                    kept.append(event)
+            accepted = kept
+            if not accepted:
+                continue
+
+            if log_id is None and any(event.log_id is None for event in accepted):
+                log = HOSLog(
+                    driver_id=driver_id, time_zone=driver.home_terminal_time_zone
+                )
+                new_logs.append(log)
+                driver.latest_log = log_id = log.id
+
+            first = accepted[0].timestamp
+            for period in open_periods[driver_id]:
+                period.end_time = first
+                period.duration_minutes = _minutes(period.start_time, first)
+                period.updated_at = now
+                closed.append(period)
+
+            for event, following in zip(accepted, accepted[1:] + [None]):
+                end = following.timestamp if following else None
+                periods.append(
+                    DutyPeriod(
+                        hos_log_id=event.log_id or log_id,
+                        status=event.status,
+                        start_time=event.timestamp,
+                        end_time=end,
+                        duration_minutes=_minutes(event.timestamp, end) if end else 0,
+                        notes=event.notes,
+                        device_id=event.device_id,
+                        sequence=event.sequence,
+                    )
+                )
+
+            start = min([first] + [p.start_time for p in open_periods[driver_id]])
+            if len(accepted) > 1 or open_periods[driver_id]:
+                spans[driver_id] = (start, accepted[-1].timestamp)
+
+        touched_logs = {period.hos_log_id for period in periods + closed}
+        HOSLog.objects.bulk_create(new_logs)
+        DutyPeriod.objects.bulk_update(
+            closed, ["end_time", "duration_minutes", "updated_at"], batch_size=1000
+        )
+        DutyPeriod.objects.bulk_create(periods, batch_size=1000)
+        HOSLog.objects.filter(id__in=touched_logs).update(hos_state=None)
+
+        refresh_drivers_daily_duty(
+            {drivers[driver_id]: span for driver_id, span in spans.items()}
+        )
+        update_drivers_cycle_hours(drivers[driver_id] for driver_id in spans)
+        if spans:
+            earliest = min(start for start, _ in spans.values())
+            refresh_log_totals(
+                HOSLog.objects.filter(
+                    Q(id__in=touched_logs)
+                    | Q(driver_id__in=list(spans), duty_periods__end_time__gte=earliest)
+                ).distinct()
+            )
+
+    return {
+        "accepted": len(periods),
+        "closed": len(closed),
+        "duplicates": duplicates,
+        "rejected": sorted(rejected, key=lambda row: row["line"]),
+    }
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from apps.drivers.models import Driver
+from apps.logs.models import DriverDailyDuty
+from apps.logs.services import refresh_drivers_daily_duty, update_drivers_cycle_hours
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild every driver's daily duty rollups and current cycle hours "
+        "from their duty periods."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Drivers rebuilt per transaction.",
+        )
+        parser.add_argument("--driver", help="Only rebuild this driver id.")
+
+    def handle(self, *args, **options):
+        drivers = Driver.objects.only(
+            "id", "home_terminal_time_zone", "hos_rule_set"
+        ).order_by("id")
+        if options["driver"]:
+            drivers = drivers.filter(id=options["driver"])
+        drivers = drivers.annotate(
+            first_start=Min("hos_logs__duty_periods__start_time"),
+            last_start=Max("hos_logs__duty_periods__start_time"),
+            last_end=Max("hos_logs__duty_periods__end_time"),
+        )
+
+        drivers = list(drivers)
+        batch_size = options["batch_size"]
+        days = 0
+        for i in range(0, len(drivers), batch_size):
+            batch = drivers[i : i + batch_size]
+            spans = {
+                driver: (
+                    driver.first_start,
+                    max(t for t in (driver.last_start, driver.last_end) if t),
+                )
+                for driver in batch
+                if driver.first_start is not None
+            }
+            with transaction.atomic():
+                DriverDailyDuty.objects.filter(driver__in=batch).delete()
+                refresh_drivers_daily_duty(spans)
+                update_drivers_cycle_hours(batch)
+            days += DriverDailyDuty.objects.filter(driver__in=batch).count()
+        self.stdout.write(
+            f"Rebuilt {days} daily duty row(s) for {len(drivers)} driver(s)"
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from apps.logs.models import HOSLog
+from apps.logs.services import refresh_log_totals
+
+
+class Command(BaseCommand):
+    help = "Recompute the duty time totals stored on every HOS log."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Logs updated per UPDATE statement.",
+        )
+        parser.add_argument("--driver", help="Only rebuild the logs of this driver id.")
+
+    def handle(self, *args, **options):
+        logs = HOSLog.objects.order_by("id")
+        if options["driver"]:
+            logs = logs.filter(driver_id=options["driver"])
+
+        ids = list(logs.values_list("id", flat=True))
+        batch_size = options["batch_size"]
+        updated = 0
+        for i in range(0, len(ids), batch_size):
+            updated += refresh_log_totals(
+                HOSLog.objects.filter(id__in=ids[i : i + batch_size])
+            )
+        self.stdout.write(f"Rebuilt totals for {updated} HOS log(s)")
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logs", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="hoslog",
+            name="hos_state",
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:02
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("drivers", "0002_remove_driver_last_updated"),
+        ("logs", "0002_hoslog_hos_state"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DriverDailyDuty",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("day", models.DateField()),
+                ("on_duty_minutes", models.IntegerField(default=0)),
+                ("driving_minutes", models.IntegerField(default=0)),
+                (
+                    "driver",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_duty",
+                        to="drivers.driver",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Driver Daily Duty",
+                "ordering": ["-day"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("driver", "day"), name="unique_driver_daily_duty"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:13
+
+from django.db import migrations, models
+
+
+def remove_duplicates(apps, schema_editor):
+    # Keep the most recently updated row for each new unique key
+    for model_name, key in (
+        ("DutyPeriod", "start_time"),
+        ("HOSViolation", "type"),
+    ):
+        model = apps.get_model("logs", model_name)
+        rows = model.objects.order_by("hos_log_id", key, "-updated_at").values_list(
+            "id", "hos_log_id", key
+        )
+        seen, duplicates = set(), []
+        for row_id, log_id, value in rows.iterator():
+            if (log_id, value) in seen:
+                duplicates.append(row_id)
+            seen.add((log_id, value))
+        for i in range(0, len(duplicates), 500):
+            model.objects.filter(id__in=duplicates[i : i + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("locations", "0002_geocodecacheentry"),
+        ("logs", "0003_driverdailyduty"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="hosviolation",
+            name="type",
+            field=models.CharField(
+                choices=[
+                    ("daily_drive_limit", "Daily Drive Limit Exceeded"),
+                    ("daily_on_duty_limit", "Daily On-Duty Limit Exceeded"),
+                    ("cycle_limit", "Cycle Limit Exceeded"),
+                    ("break_required", "Break Required"),
+                    ("approaching_drive_limit", "Approaching Drive Limit"),
+                    ("approaching_on_duty_limit", "Approaching On-Duty Limit"),
+                    ("approaching_cycle_limit", "Approaching Cycle Limit"),
+                ],
+                max_length=50,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dutyperiod",
+            constraint=models.UniqueConstraint(
+                fields=("hos_log", "start_time"), name="unique_duty_period_start"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="hosviolation",
+            constraint=models.UniqueConstraint(
+                fields=("hos_log", "type"), name="unique_hos_violation_type"
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("locations", "0002_geocodecacheentry"),
+        ("logs", "0004_duty_period_violation_constraints"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dutyperiod",
+            name="device_id",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="dutyperiod",
+            name="sequence",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="dutyperiod",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("device_id__isnull", False)),
+                fields=("device_id", "sequence"),
+                name="unique_duty_period_device_sequence",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logs", "0005_dutyperiod_device_sequence"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="hoslog",
+            name="violations_version",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=40
+            ),
+        ),
+    ]
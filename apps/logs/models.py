@@ -20,6 +20,12 @@ class HOSLog(BaseModel):
     total_drive_time = models.IntegerField(default=0)  # in minutes
     total_on_duty_time = models.IntegerField(default=0)  # in minutes
     cycle_hours_used = models.IntegerField(default=0)  # in minutes
+    # HOSAccumulator snapshot after the last closed duty period
+    hos_state = models.JSONField(null=True, blank=True, editable=False)
+    # hos_check_version the stored violations were computed from
+    violations_version = models.CharField(
+        max_length=40, blank=True, default="", editable=False
+    )
 
     def __str__(self):
         return f"HOS Log for Driver {self.driver.id} on {self.created_at}"
@@ -49,13 +55,34 @@ class DutyPeriod(BaseModel):
         "locations.Location", on_delete=models.SET_NULL, null=True, blank=True
     )
     notes = models.TextField(null=True, blank=True)
+    # Source of periods ingested from in-cab devices (ELD event stream)
+    device_id = models.CharField(max_length=64, null=True, blank=True)
+    sequence = models.BigIntegerField(null=True, blank=True)
 
     def __str__(self):
         return f"Duty Period ({self.status}) for HOS Log {self.hos_log.id}"
 
+    def save(self, *args, **kwargs):
+        # Log totals and daily rollups sum duration_minutes
+        if self.start_time and self.end_time:
+            self.duration_minutes = int(
+                (self.end_time - self.start_time).total_seconds() // 60
+            )
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ["-start_time"]
         verbose_name_plural = "Duty Periods"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["hos_log", "start_time"], name="unique_duty_period_start"
+            ),
+            models.UniqueConstraint(
+                fields=["device_id", "sequence"],
+                condition=models.Q(device_id__isnull=False),
+                name="unique_duty_period_device_sequence",
+            ),
+        ]
 
 
 class HOSViolation(BaseModel):
@@ -69,6 +96,9 @@ class HOSViolation(BaseModel):
             ("daily_on_duty_limit", "Daily On-Duty Limit Exceeded"),
             ("cycle_limit", "Cycle Limit Exceeded"),
             ("break_required", "Break Required"),
+            ("approaching_drive_limit", "Approaching Drive Limit"),
+            ("approaching_on_duty_limit", "Approaching On-Duty Limit"),
+            ("approaching_cycle_limit", "Approaching Cycle Limit"),
         ],
     )
     severity = models.CharField(
@@ -89,3 +119,34 @@ class HOSViolation(BaseModel):
     class Meta:
         ordering = ["-timestamp"]
         verbose_name_plural = "HOS Violations"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["hos_log", "type"], name="unique_hos_violation_type"
+            )
+        ]
+
+
+class DriverDailyDuty(BaseModel):
+    """
+    On-duty and driving minutes per driver per calendar day in the driver's
+    home-terminal time zone, kept in sync with DutyPeriod writes.
+    """
+
+    driver = models.ForeignKey(
+        "drivers.Driver", on_delete=models.CASCADE, related_name="daily_duty"
+    )
+    day = models.DateField()
+    on_duty_minutes = models.IntegerField(default=0)  # driving included
+    driving_minutes = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Daily duty for Driver {self.driver_id} on {self.day}"
+
+    class Meta:
+        ordering = ["-day"]
+        verbose_name_plural = "Driver Daily Duty"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["driver", "day"], name="unique_driver_daily_duty"
+            )
+        ]
@@ -0,0 +1,152 @@
+# apps/logs/persistence.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max, Min
+
+from apps.drivers.models import Driver
+from apps.logs.blocks import DutyBlock
+from apps.logs.models import DutyPeriod, HOSLog, HOSViolation
+from apps.logs.services import (
+    refresh_affected_log_totals,
+    refresh_daily_duty,
+    update_driver_cycle_hours,
+)
+
+# Model validation that would cost a query per row; the writes below enforce it
+_CLEAN_EXCLUDE = ["hos_log"]
+
+_duty_period_signals_suppressed: ContextVar[bool] = ContextVar(
+    "duty_period_signals_suppressed", default=False
+)
+
+
+@contextmanager
+def suppress_duty_period_signals() -> Iterator[None]:
+    """
+    Skip the per-row refresh of apps.logs.signals for duty periods written
+    inside the block; the caller refreshes the rollups and totals itself.
+    """
+    token = _duty_period_signals_suppressed.set(True)
+    try:
+        yield
+    finally:
+        _duty_period_signals_suppressed.reset(token)
+
+
+def duty_period_signals_suppressed() -> bool:
+    return _duty_period_signals_suppressed.get()
+
+
+def _validate(instances: Sequence, key: str) -> None:
+    """
+    full_clean every unsaved instance and reject repeated `key` values.
+    Raises one ValidationError keyed by row index.
+    """
+    errors: Dict[str, Any] = {}
+    seen = set()
+    for index, instance in enumerate(instances):
+        try:
+            instance.full_clean(
+                exclude=_CLEAN_EXCLUDE,
+                validate_unique=False,
+                validate_constraints=False,
+            )
+        except ValidationError as exc:
+            errors[str(index)] = exc.messages
+            continue
+        value = getattr(instance, key)
+        if value in seen:
+            errors[str(index)] = [f"Duplicate {key}: {value}"]
+        seen.add(value)
+    if errors:
+        raise ValidationError(errors)
+
+
+def save_duty_blocks(log: HOSLog, blocks: Iterable[DutyBlock]) -> int:
+    """
+    Make `blocks` the log's duty periods: periods starting at the same time
+    are updated in place, new ones inserted, the rest deleted. Validates
+    every row before writing anything (raises ValidationError), then writes
+    in one transaction: a single upsert plus one delete. Also clears the
+    log's HOS snapshot and refreshes the driver's daily rollups and log
+    totals, which the per-row signals would otherwise have done. Returns the number of
+    periods written.
+    """
+    periods = [
+        DutyPeriod(
+            hos_log=log,
+            status=block.status,
+            start_time=block.start_time,
+            end_time=block.end_time,
+            duration_minutes=block.minutes,
+            notes=block.remarks or None,
+        )
+        for block in blocks
+    ]
+    _validate(periods, "start_time")
+
+    with transaction.atomic():
+        stale = log.duty_periods.exclude(start_time__in=[p.start_time for p in periods])
+        span = stale.aggregate(start=Min("start_time"), end=Max("end_time"))
+        with suppress_duty_period_signals():
+            stale.delete()
+        DutyPeriod.objects.bulk_create(
+            periods,
+            update_conflicts=True,
+            unique_fields=["hos_log", "start_time"],
+            update_fields=[
+                "status",
+                "end_time",
+                "duration_minutes",
+                "notes",
+                "updated_at",
+            ],
+        )
+        HOSLog.objects.filter(id=log.id).update(hos_state=None)
+        log.hos_state = None
+
+        times = [p.start_time for p in periods] + [p.end_time for p in periods]
+        times += [t for t in span.values() if t is not None]
+        if times:
+            driver = Driver.objects.only(
+                "id", "home_terminal_time_zone", "hos_rule_set"
+            ).get(id=log.driver_id)
+            refresh_daily_duty(driver, min(times), max(times))
+            update_driver_cycle_hours(driver)
+            refresh_affected_log_totals(driver, log.id, min(times), max(times))
+    return len(periods)
+
+
+def save_violations(log: HOSLog, violations: List[Dict[str, Any]]) -> int:
+    """
+    Make `violations` (calculate_hos_status() violation dicts) the log's
+    violation set, one row per type: existing types are updated in place
+    (keeping their first `timestamp` and `resolved` flag), new ones
+    inserted, the rest deleted. Validates first (raises ValidationError),
+    then writes in one transaction: a single upsert plus one delete.
+    Returns the number of violations written.
+    """
+    rows = [
+        HOSViolation(
+            hos_log=log,
+            type=violation["type"],
+            severity=violation["severity"],
+            description=violation["description"],
+        )
+        for violation in violations
+    ]
+    _validate(rows, "type")
+
+    with transaction.atomic():
+        log.violations.exclude(type__in=[row.type for row in rows]).delete()
+        HOSViolation.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["hos_log", "type"],
+            update_fields=["severity", "description", "updated_at"],
+        )
+    return len(rows)
@@ -0,0 +1,141 @@
+# apps/logs/rules.py
+from typing import Dict, Optional, Tuple
+
+HOUR = 3600
+
+
+class HOSRuleSet:
+    """
+    An immutable set of hours-of-service limits.
+
+    Hours are converted to whole seconds once, when the rule set is built,
+    so evaluators (HOSAccumulator, the route planner) read plain integer
+    attributes instead of looking keys up in a dict on every call. Rule
+    sets are module-level singletons keyed by `id`, so the id is also a
+    safe cache key for anything computed under them.
+
+    break_after is None for rule sets without a 30-minute break requirement.
+    A sleeper-berth split pairs two rests of at least split_rest each, one
+    of them split_sleeper in the sleeper berth, that add up to reset_length.
+    """
+
+    __slots__ = (
+        "id",
+        "name",
+        "max_driving",
+        "window",
+        "max_cycle",
+        "cycle_days",
+        "break_after",
+        "break_length",
+        "reset_length",
+        "restart_length",
+        "split_sleeper",
+        "split_rest",
+        "warnings",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        name: str,
+        max_driving_hours: float = 11.0,
+        window_hours: float = 14.0,
+        max_cycle_hours: float = 70.0,
+        cycle_days: int = 8,
+        break_after_driving_hours: Optional[float] = 8.0,
+        break_hours: float = 0.5,
+        reset_hours: float = 10.0,
+        restart_hours: float = 34.0,
+        split_sleeper_hours: float = 7.0,
+        split_rest_hours: float = 2.0,
+        warning_margins: Tuple[float, float, float] = (1.0, 2.0, 5.0),
+    ):
+        def seconds(hours: float) -> int:
+            return int(round(hours * HOUR))
+
+        values = {
+            "id": id,
+            "name": name,
+            "max_driving": seconds(max_driving_hours),
+            "window": seconds(window_hours),
+            "max_cycle": seconds(max_cycle_hours),
+            "cycle_days": cycle_days,
+            "break_after": (
+                seconds(break_after_driving_hours)
+                if break_after_driving_hours is not None
+                else None
+            ),
+            "break_length": seconds(break_hours),
+            "reset_length": seconds(reset_hours),
+            "restart_length": seconds(restart_hours),
+            "split_sleeper": seconds(split_sleeper_hours),
+            "split_rest": seconds(split_rest_hours),
+        }
+        # Usage above which the driving, window and cycle warnings fire
+        drive_margin, window_margin, cycle_margin = map(seconds, warning_margins)
+        values["warnings"] = (
+            values["max_driving"] - drive_margin,
+            values["window"] - window_margin,
+            values["max_cycle"] - cycle_margin,
+        )
+        for field, value in values.items():
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        return f"<HOSRuleSet {self.id}>"
+
+    def __reduce__(self):
+        # Unpickle (e.g. in a worker process) to the registered instance
+        return get_rule_set, (self.id,)
+
+    def hours(self, attr: str) -> Optional[float]:
+        """
+        A limit in hours, e.g. rules.hours("max_driving") -> 11.0.
+        """
+        value = getattr(self, attr)
+        return None if value is None else value / HOUR
+
+
+RULE_SETS: Dict[str, HOSRuleSet] = {
+    rules.id: rules
+    for rules in (
+        HOSRuleSet("us_property_70_8", "US property-carrying, 70 hours / 8 days"),
+        HOSRuleSet(
+            "us_property_60_7",
+            "US property-carrying, 60 hours / 7 days",
+            max_cycle_hours=60.0,
+            cycle_days=7,
+        ),
+        # 150 air-mile short-haul exemption: no 30-minute break requirement
+        HOSRuleSet(
+            "us_short_haul",
+            "US short-haul (150 air-mile), 70 hours / 8 days",
+            break_after_driving_hours=None,
+        ),
+        # Adverse driving conditions: driving limit and window extended by 2h
+        HOSRuleSet(
+            "us_adverse_conditions",
+            "US adverse driving conditions, 70 hours / 8 days",
+            max_driving_hours=13.0,
+            window_hours=16.0,
+        ),
+    )
+}
+
+DEFAULT_RULE_SET = "us_property_70_8"
+RULE_SET_CHOICES = [(rules.id, rules.name) for rules in RULE_SETS.values()]
+
+
+def get_rule_set(rule_set_id: Optional[str] = None) -> HOSRuleSet:
+    """
+    The rule set with the given id (the default one for None/"").
+    Raises ValueError for unknown ids.
+    """
+    try:
+        return RULE_SETS[rule_set_id or DEFAULT_RULE_SET]
+    except KeyError:
+        raise ValueError(f"Unknown HOS rule set: {rule_set_id}") from None
@@ -1,139 +1,1199 @@
 # apps/hos/services.py
-from typing import List, Dict, Any
-from datetime import datetime
-import math
-
-DEFAULT_LIMITS = {
-    "maxDrivingHours": 11.0,
-    "maxOnDutyHours": 14.0,
-    "maxCycleHours": 70.0,
-    "requiredRestBreak": 0.5,  # hours
-    "requiredOffDuty": 10.0,
+import hashlib
+from collections import defaultdict
+from operator import attrgetter
+from typing import Iterable, List, Dict, Any, Optional, Tuple, Union
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db import transaction
+from django.db.models import (
+    Count,
+    DateTimeField,
+    ExpressionWrapper,
+    F,
+    Func,
+    IntegerField,
+    Max,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.drivers.models import Driver
+from apps.logs.blocks import DutyBlock, epoch_minutes
+from apps.logs.models import DriverDailyDuty, DutyPeriod, HOSLog
+from apps.logs.rules import HOSRuleSet, RULE_SETS, get_rule_set
+
+REST_STATUSES = ("off_duty", "sleeper_berth")
+SNAPSHOT_VERSION = 4
+
+
+def _epoch_seconds(value: datetime) -> int:
+    # Naive datetimes (schedule blocks) are taken as UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt_timezone.utc)
+    return int(value.timestamp())
+
+
+class HOSAccumulator:
+    """
+    Incremental HOS state fed one duty period at a time, in chronological
+    order. Each `feed` is O(1), and `snapshot`/`from_snapshot` persist and
+    resume the state, so a new duty period never needs history rescanned.
+
+    Limits come from an HOSRuleSet (the default one when omitted) and are
+    copied into the accumulator's own slots. Times are integer seconds.
+    Shift totals (driving, on-duty, the on-duty window) reset after
+    `reset_length` consecutive seconds off duty or in the sleeper berth,
+    the cycle after `restart_length`. The rest break is any `break_length`
+    of consecutive non-driving time. Unlogged time between periods counts
+    as off duty. Violations are remembered once they happen, even across
+    resets.
+
+    Rests shorter than a reset but at least `split_rest` long are
+    sleeper-berth split halves: when one pairs with the previous half, the
+    shift totals are recalculated from the end of that previous half, so
+    only the work between the two halves still counts.
+    """
+
+    __slots__ = (
+        "rules",
+        "shift_driving",
+        "shift_on_duty",
+        "shift_start",
+        "since_break",
+        "idle",
+        "off",
+        "cycle",
+        "last_end",
+        "flags",
+        "restarted",
+        "sleeper",
+        "half",
+        "half_sleeper",
+        "seg_driving",
+        "seg_on_duty",
+        "seg_start",
+        "_max_driving",
+        "_window",
+        "_max_cycle",
+        "_break_after",
+        "_break_length",
+        "_reset_length",
+        "_restart_length",
+        "_split_sleeper",
+        "_split_rest",
+        "_warnings",
+    )
+
+    STATE_FIELDS = (
+        "shift_driving",
+        "shift_on_duty",
+        "shift_start",
+        "since_break",
+        "idle",
+        "off",
+        "cycle",
+        "last_end",
+        "flags",
+        "restarted",
+        "sleeper",
+        "half",
+        "half_sleeper",
+        "seg_driving",
+        "seg_on_duty",
+        "seg_start",
+    )
+
+    def __init__(
+        self,
+        rules: Optional[HOSRuleSet] = None,
+        current_cycle_hours: float = 0.0,
+    ):
+        self.rules = rules = rules or get_rule_set()
+        self._max_driving = rules.max_driving
+        self._window = rules.window
+        self._max_cycle = rules.max_cycle
+        self._break_after = rules.break_after
+        self._break_length = rules.break_length
+        self._reset_length = rules.reset_length
+        self._restart_length = rules.restart_length
+        self._split_sleeper = rules.split_sleeper
+        self._split_rest = rules.split_rest
+        self._warnings = rules.warnings
+
+        self.shift_driving = 0  # driving since the last 10-hour reset
+        self.shift_on_duty = 0  # on duty, not driving, since the last reset
+        self.shift_start: Optional[int] = None  # first on-duty second of the shift
+        self.since_break = 0  # driving since the last 30-minute break
+        self.idle = 0  # consecutive non-driving time
+        self.off = 0  # consecutive off-duty/sleeper time
+        self.cycle = int(round(current_cycle_hours * 3600))
+        self.last_end: Optional[int] = None
+        self.flags: List[str] = []  # violation types seen so far
+        self.restarted = False  # a cycle restart happened since the start
+        self.sleeper = 0  # sleeper-berth time in the current rest
+        self.half = 0  # length of the last split half, 0 when none is open
+        self.half_sleeper = 0  # its sleeper-berth time
+        self.seg_driving = 0  # driving since the last split half
+        self.seg_on_duty = 0  # on duty, not driving, since the last split half
+        self.seg_start: Optional[int] = None  # end of the last split half
+
+    def feed(self, status: str, start: datetime, end: datetime) -> None:
+        """
+        Account for one duty period. Overlap with what was already fed is
+        ignored; periods must arrive in start order.
+        """
+        self._feed(status, _epoch_seconds(start), _epoch_seconds(end))
+
+    def feed_block(self, block: DutyBlock) -> None:
+        """
+        `feed` for a DutyBlock, without going through datetimes.
+        """
+        self._feed(block.status, block.start * 60, block.end * 60)
+
+    def _feed(self, status: str, start_s: int, end_s: int) -> None:
+        if self.last_end is not None:
+            if start_s > self.last_end:
+                self._rest(start_s - self.last_end)
+            start_s = max(start_s, self.last_end)
+        if end_s <= start_s:
+            return
+
+        if status in REST_STATUSES:
+            self._rest(end_s - start_s, sleeper=status == "sleeper_berth")
+        else:
+            self._work(status, start_s, end_s)
+        self.last_end = end_s
+
+    def rest_until(self, moment: datetime) -> None:
+        """
+        Count the time from the last period fed up to `moment` as off duty.
+        """
+        moment_s = _epoch_seconds(moment)
+        if self.last_end is not None and moment_s > self.last_end:
+            self._rest(moment_s - self.last_end)
+            self.last_end = moment_s
+
+    def _rest(self, seconds: int, sleeper: bool = False) -> None:
+        self.idle += seconds
+        self.off += seconds
+        if sleeper:
+            self.sleeper += seconds
+        if self.idle >= self._break_length:
+            self.since_break = 0
+        if self.off >= self._reset_length:
+            self.shift_driving = self.shift_on_duty = 0
+            self.shift_start = None
+            self.half = 0
+        if self.off >= self._restart_length:
+            self.cycle = 0
+            self.restarted = True
+
+    def _work(self, status: str, start: int, end: int) -> None:
+        seconds = end - start
+        if self._split_rest <= self.off < self._reset_length:
+            self._split_half(start)
+        self.off = self.sleeper = 0
+        if self.shift_start is None:
+            self.shift_start = start
+        self.cycle += seconds
+
+        if status != "driving":
+            self.shift_on_duty += seconds
+            self.seg_on_duty += seconds
+            self.idle += seconds
+            if self.idle >= self._break_length:
+                self.since_break = 0
+            return
+
+        self.idle = 0
+        self.shift_driving += seconds
+        self.seg_driving += seconds
+        self.since_break += seconds
+        if self.shift_driving > self._max_driving:
+            self._flag("daily_drive_limit")
+        if end > self.shift_start + self._window:
+            self._flag("daily_on_duty_limit")
+        if self._break_after is not None and self.since_break > self._break_after:
+            self._flag("break_required")
+        if self.cycle > self._max_cycle:
+            self._flag("cycle_limit")
+
+    def _split_half(self, start: int) -> None:
+        # The rest that just ended at `start` is a split half
+        rest, sleeper = self.off, self.sleeper
+        if self.half and split_rests_pair(
+            self.rules, self.half, self.half_sleeper, rest, sleeper
+        ):
+            self.shift_driving = self.seg_driving
+            self.shift_on_duty = self.seg_on_duty
+            # Window restarts at the end of the previous half, without this rest
+            self.shift_start = self.seg_start + rest
+        self.half, self.half_sleeper = rest, sleeper
+        self.seg_driving = self.seg_on_duty = 0
+        self.seg_start = start
+
+    def _flag(self, violation_type: str) -> None:
+        if violation_type not in self.flags:
+            self.flags.append(violation_type)
+
+    @property
+    def window_used(self) -> int:
+        if self.shift_start is None or self.last_end is None:
+            return 0
+        return self.last_end - self.shift_start
+
+    def remaining(self, cycle: Optional[int] = None) -> Dict[str, Optional[int]]:
+        """
+        Seconds left before each limit: `driving` (the tightest of the
+        driving, on-duty window and cycle limits), `window`, `cycle` and
+        `break` (None when the rule set has no break requirement).
+        `cycle` overrides the accumulated cycle seconds.
+        """
+        cycle = self.cycle if cycle is None else cycle
+        window = max(0, self._window - self.window_used)
+        cycle_left = max(0, self._max_cycle - cycle)
+        driving = max(
+            0, min(self._max_driving - self.shift_driving, window, cycle_left)
+        )
+        return {
+            "driving": driving,
+            "window": window,
+            "cycle": cycle_left,
+            "break": (
+                max(0, self._break_after - self.since_break)
+                if self._break_after is not None
+                else None
+            ),
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = {field: getattr(self, field) for field in self.STATE_FIELDS}
+        state["flags"] = list(self.flags)
+        state["rules"] = self.rules.id
+        state["version"] = SNAPSHOT_VERSION
+        return state
+
+    @classmethod
+    def from_snapshot(
+        cls, snapshot: Dict[str, Any], rules: Optional[HOSRuleSet] = None
+    ) -> "HOSAccumulator":
+        """
+        Resume from `snapshot()` output. Raises ValueError for snapshots
+        written by an incompatible version or under other rules than
+        `rules`.
+        """
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            raise ValueError("Unsupported HOS state snapshot")
+        if rules is not None and snapshot["rules"] != rules.id:
+            raise ValueError("HOS state snapshot uses other rules")
+        accumulator = cls(rules or get_rule_set(snapshot["rules"]))
+        for field in cls.STATE_FIELDS:
+            setattr(accumulator, field, snapshot[field])
+        accumulator.flags = list(snapshot["flags"])
+        return accumulator
+
+    def status(self) -> Dict[str, Any]:
+        """
+        HOSStatus-like dict for the state after the last period fed.
+        Driving/on-duty hours are for the current shift.
+        """
+        rules = self.rules
+        hours = {
+            attr: rules.hours(attr)
+            for attr in ("max_driving", "window", "max_cycle", "break_length")
+        }
+        hours["break_after"] = rules.hours("break_after") or 0.0
+        violations = [
+            {
+                "type": violation_type,
+                "severity": "violation",
+                "description": VIOLATION_DESCRIPTIONS[violation_type].format(**hours),
+            }
+            for violation_type in self.flags
+        ]
+
+        # Warnings for limits about to be hit in the current shift/cycle
+        drive_warning, window_warning, cycle_warning = self._warnings
+        warnings = (
+            (
+                "daily_drive_limit",
+                self.shift_driving > drive_warning,
+                "approaching_drive_limit",
+                "Approaching driving limit",
+            ),
+            (
+                "daily_on_duty_limit",
+                self.window_used > window_warning,
+                "approaching_on_duty_limit",
+                "Approaching on-duty limit",
+            ),
+            (
+                "cycle_limit",
+                self.cycle > cycle_warning,
+                "approaching_cycle_limit",
+                "Approaching cycle limit",
+            ),
+        )
+        for violation_type, approaching, warning_type, description in warnings:
+            if approaching and violation_type not in self.flags:
+                violations.append(
+                    {
+                        "type": warning_type,
+                        "severity": "warning",
+                        "description": description,
+                    }
+                )
+
+        remaining = self.remaining()
+        return {
+            "drivingHoursUsed": self.shift_driving / 3600,
+            "onDutyHoursUsed": self.shift_on_duty / 3600,
+            "cycleHoursUsed": self.cycle / 3600,
+            "hoursUntilBreak": (
+                remaining["break"] / 3600 if remaining["break"] is not None else None
+            ),
+            "hoursUntilOffDuty": remaining["window"] / 3600,
+            "violations": violations,
+            "ruleSet": rules.id,
+            "canContinueDriving": not self.flags and remaining["driving"] > 0,
+        }
+
+
+def split_rests_pair(
+    rules: HOSRuleSet, first: int, first_sleeper: int, second: int, second_sleeper: int
+) -> bool:
+    """
+    Whether two rests (lengths and their sleeper-berth time, in seconds)
+    form a sleeper-berth split under `rules`, e.g. 7/3 or 8/2 hours.
+    """
+    return (
+        min(first, second) >= rules.split_rest
+        and first + second >= rules.reset_length
+        and max(first_sleeper, second_sleeper) >= rules.split_sleeper
+    )
+
+
+# Formatted with the rule set's limits in hours
+VIOLATION_DESCRIPTIONS = {
+    "daily_drive_limit": "Exceeded {max_driving:g} driving hours",
+    "daily_on_duty_limit": "Drove past the {window:g}-hour on-duty window",
+    "cycle_limit": "Exceeded {max_cycle:g} cycle hours",
+    "break_required": "Drove more than {break_after:g} hours without a "
+    "{break_length:g}-hour break",
 }
 
 
 def calculate_hos_status(
-    duty_periods: List[Dict[str, Any]],
+    duty_periods: Iterable[Union[DutyBlock, Dict[str, Any]]],
     current_cycle_hours: float = 0.0,
-    limits: Dict[str, float] = None,
+    rules: Optional[HOSRuleSet] = None,
+    hos_state: Union[HOSAccumulator, Dict[str, Any], None] = None,
 ) -> Dict[str, Any]:
     """
-    duty_periods: list of dicts with keys: status, start_time (ISO), end_time (ISO)
+    duty_periods: DutyBlocks, or API dicts with keys: status, start_time (ISO),
+    end_time (ISO)
+    rules: the HOSRuleSet to check against (the default one when omitted)
+    hos_state: the shift already under way when the first period starts,
+    as for generate_optimized_schedule (which plans from the same seed)
     returns HOSStatus-like dict
     """
-    if limits is None:
-        limits = DEFAULT_LIMITS
+    blocks = []
+    for block in duty_periods:
+        if not isinstance(block, DutyBlock):
+            try:
+                block = DutyBlock.from_dict(block)
+            except Exception:
+                # fallback: skip malformed block
+                continue
+        blocks.append(block)
 
-    driving_hours = 0.0
-    on_duty_hours = 0.0
-    total_on_duty_time = 0.0
-    last_rest_break = 0.0
-    violations = []
+    blocks.sort(key=attrgetter("start"))
+    if hos_state:
+        rules = rules or get_rule_set()
+        accumulator = _seeded_accumulator(
+            rules,
+            _schedule_seed(rules, hos_state, current_cycle_hours),
+            blocks[0].start * 60 if blocks else 0,
+        )
+    else:
+        accumulator = HOSAccumulator(rules, current_cycle_hours)
+    for block in blocks:
+        accumulator.feed_block(block)
+    return accumulator.status()
 
-    for block in duty_periods:
-        # parse times (assume ISO or HH:MM) — caller should pass ISO strings
-        try:
-            start = datetime.fromisoformat(block["start_time"])
-            end = datetime.fromisoformat(block["end_time"])
-        except Exception:
-            # fallback: skip malformed block
+
+def rule_set_for(driver: Optional[Driver] = None, trip=None) -> HOSRuleSet:
+    """
+    The trip's rule set when it names one, otherwise the driver's.
+    """
+    return get_rule_set(
+        (trip and trip.hos_rule_set) or (driver and driver.hos_rule_set) or None
+    )
+
+
+def _log_check_inputs(log) -> Tuple[HOSRuleSet, int]:
+    """
+    The rule set a log is checked against and the cycle minutes it starts
+    from, read from the database: the duty period signals refresh the log's
+    totals after `log` itself was loaded.
+    """
+    row = (
+        type(log)
+        .objects.filter(id=log.id)
+        .values_list(
+            "trip__hos_rule_set",
+            "driver__hos_rule_set",
+            "cycle_hours_used",
+            "total_on_duty_time",
+        )
+        .first()
+    )
+    if row is None:
+        return get_rule_set(), 0
+    trip_rules, driver_rules, cycle, on_duty = row
+    return get_rule_set(trip_rules or driver_rules), max(0, cycle - on_duty)
+
+
+def log_rule_set(log) -> HOSRuleSet:
+    """
+    The rule set a log is checked against (its trip's, else its driver's).
+    """
+    return _log_check_inputs(log)[0]
+
+
+def rebuild_hos_state(
+    log, check_inputs: Optional[Tuple[HOSRuleSet, int]] = None
+) -> HOSAccumulator:
+    """
+    Replay a log's closed duty periods and store the result in log.hos_state.
+    check_inputs: _log_check_inputs(log), when the caller already read them
+    """
+    rules, prior_cycle = check_inputs or _log_check_inputs(log)
+    accumulator = HOSAccumulator(rules, current_cycle_hours=prior_cycle / 60)
+    periods = (
+        log.duty_periods.filter(end_time__isnull=False)
+        .order_by("start_time")
+        .values_list("status", "start_time", "end_time")
+    )
+    for status, start, end in periods.iterator():
+        accumulator.feed(status, start, end)
+    _save_hos_state(log, accumulator, prior_cycle)
+    return accumulator
+
+
+def load_hos_state(log) -> HOSAccumulator:
+    """
+    The log's HOS state, resumed from its snapshot when there is one.
+    """
+    inputs = _log_check_inputs(log)
+    return _resume_hos_state(log, inputs) or rebuild_hos_state(log, inputs)
+
+
+def record_duty_period(log, period) -> HOSAccumulator:
+    """
+    Fold a newly saved duty period into the log's snapshot in O(1). Periods
+    that are still open wait until they are closed; a period that lands
+    before the snapshot's last one triggers a full replay instead.
+    """
+    inputs = _log_check_inputs(log)
+    accumulator = _resume_hos_state(log, inputs)
+    if accumulator is None:
+        return rebuild_hos_state(log, inputs)
+    if period.end_time is None:
+        return accumulator
+    if (
+        accumulator.last_end is not None
+        and _epoch_seconds(period.start_time) < accumulator.last_end
+    ):
+        return rebuild_hos_state(log, inputs)
+    accumulator.feed(period.status, period.start_time, period.end_time)
+    _save_hos_state(log, accumulator, log.hos_state["prior_cycle"])
+    return accumulator
+
+
+def _resume_hos_state(
+    log, check_inputs: Tuple[HOSRuleSet, int]
+) -> Optional[HOSAccumulator]:
+    if not log.hos_state:
+        return None
+    rules, prior_cycle = check_inputs
+    # A snapshot seeded with other prior cycle minutes (an earlier log
+    # changed) or taken under other rules is stale
+    if log.hos_state.get("prior_cycle") != prior_cycle:
+        return None
+    try:
+        return HOSAccumulator.from_snapshot(log.hos_state, rules)
+    except (KeyError, ValueError):
+        return None
+
+
+def _save_hos_state(log, accumulator: HOSAccumulator, prior_cycle: int) -> None:
+    log.hos_state = accumulator.snapshot()
+    log.hos_state["prior_cycle"] = prior_cycle
+    type(log).objects.filter(id=log.id).update(hos_state=log.hos_state)
+
+
+# Longest cycle window of any rule set
+CYCLE_DAYS = max(rules.cycle_days for rules in RULE_SETS.values())
+
+
+def driver_time_zone(driver: Driver) -> Union[ZoneInfo, dt_timezone]:
+    """
+    The driver's home-terminal time zone (UTC when unset or unknown).
+    """
+    return _time_zone(driver.home_terminal_time_zone)
+
+
+def _time_zone(name: str) -> Union[ZoneInfo, dt_timezone]:
+    try:
+        return ZoneInfo(name)
+    except (ValueError, ZoneInfoNotFoundError):
+        return dt_timezone.utc
+
+
+def _local_midnight(day: date, tz) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=tz)
+
+
+def refresh_daily_duty(driver: Driver, start: datetime, end: datetime) -> None:
+    """
+    Recompute the DriverDailyDuty rows for every home-terminal day touching
+    [start, end] from that driver's closed duty periods. Signals call this
+    on each DutyPeriod write; bulk writes (which skip signals) must call it
+    themselves, or refresh_drivers_daily_duty for many drivers at once.
+    """
+    refresh_drivers_daily_duty({driver: (start, end)})
+
+
+def refresh_drivers_daily_duty(
+    spans: Dict[Driver, Tuple[datetime, datetime]],
+) -> None:
+    """
+    refresh_daily_duty for several drivers, each over its own (start, end)
+    span, in one read, one delete and one upsert.
+    """
+    windows = {}  # driver -> (tz, first day, window start, window end)
+    for driver, (start, end) in spans.items():
+        tz = driver_time_zone(driver)
+        first_day = start.astimezone(tz).date()
+        last_day = max(start, end).astimezone(tz).date()
+        windows[driver.id] = (
+            tz,
+            first_day,
+            _local_midnight(first_day, tz),
+            _local_midnight(last_day + timedelta(days=1), tz),
+        )
+    if not windows:
+        return
+
+    totals = {}  # (driver id, day) -> [on-duty, driving seconds]
+    for driver_id, (tz, first_day, window_start, window_end) in windows.items():
+        for i in range((window_end - window_start).days + 1):
+            day = first_day + timedelta(days=i)
+            if _local_midnight(day, tz) < window_end:
+                totals[driver_id, day] = [0.0, 0.0]
+
+    periods = DutyPeriod.objects.filter(
+        hos_log__driver_id__in=list(windows),
+        status__in=("driving", "on_duty"),
+        start_time__lt=max(window[3] for window in windows.values()),
+        end_time__gt=min(window[2] for window in windows.values()),
+    ).values_list("hos_log__driver_id", "status", "start_time", "end_time")
+    for driver_id, status, period_start, period_end in periods:
+        tz, _, window_start, window_end = windows[driver_id]
+        cursor = max(period_start, window_start)
+        period_end = min(period_end, window_end)
+        # Split the period at each local midnight it crosses
+        while cursor < period_end:
+            day = cursor.astimezone(tz).date()
+            chunk_end = min(period_end, _local_midnight(day + timedelta(days=1), tz))
+            seconds = (chunk_end - cursor).total_seconds()
+            totals[driver_id, day][0] += seconds
+            if status == "driving":
+                totals[driver_id, day][1] += seconds
+            cursor = chunk_end
+
+    rows = []
+    empty = defaultdict(list)
+    for (driver_id, day), (on_duty, driving) in totals.items():
+        if not on_duty:
+            empty[driver_id].append(day)
             continue
-        duration = (end - start).total_seconds() / 3600.0
-
-        if block["status"] == "driving":
-            driving_hours += duration
-            total_on_duty_time += duration
-        elif block["status"] == "on_duty":
-            on_duty_hours += duration
-            total_on_duty_time += duration
-        elif block["status"] in ("off_duty", "sleeper_berth"):
-            if duration >= 0.5:
-                last_rest_break = total_on_duty_time
-            # 10+ hour off duty resets cycles in some rules — left to caller to implement restart logic
-
-    total_on_duty_used = driving_hours + on_duty_hours
-    total_cycle_hours = current_cycle_hours + total_on_duty_used
-
-    # driving limit checks
-    if driving_hours > limits["maxDrivingHours"]:
-        violations.append(
-            {
-                "type": "daily_drive_limit",
-                "severity": "violation",
-                "description": f"Exceeded {limits['maxDrivingHours']} driving hours",
-            }
+        rows.append(
+            DriverDailyDuty(
+                driver_id=driver_id,
+                day=day,
+                on_duty_minutes=round(on_duty / 60),
+                driving_minutes=round(driving / 60),
+            )
         )
-    elif driving_hours > limits["maxDrivingHours"] - 1:
-        violations.append(
-            {
-                "type": "approaching_drive_limit",
-                "severity": "warning",
-                "description": "Approaching driving limit",
-            }
+    with transaction.atomic():
+        if empty:
+            condition = Q()
+            for driver_id, days in empty.items():
+                condition |= Q(driver_id=driver_id, day__in=days)
+            DriverDailyDuty.objects.filter(condition).delete()
+        DriverDailyDuty.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["driver", "day"],
+            update_fields=["on_duty_minutes", "driving_minutes", "updated_at"],
         )
 
-    # on duty checks
-    if total_on_duty_used > limits["maxOnDutyHours"]:
-        violations.append(
-            {
-                "type": "daily_on_duty_limit",
-                "severity": "violation",
-                "description": f"Exceeded {limits['maxOnDutyHours']} on-duty hours",
-            }
+
+def cycle_availability(
+    driver: Driver,
+    now: Optional[datetime] = None,
+    rules: Optional[HOSRuleSet] = None,
+) -> Dict[str, Any]:
+    """
+    Rolling cycle (70 hours / 8 days under the default rules) from the daily
+    rollup, in one indexed read of at most `cycle_days` rows.
+
+    Hours come back when their day leaves the window: nextRecaptureAt is
+    the home-terminal midnight when the oldest day with on-duty time drops
+    out, and nextRecaptureHours how much it frees (None when nothing is
+    used). 34-hour restarts are applied by HOSAccumulator on top of this.
+    """
+    rules = rules or rule_set_for(driver)
+    cycle_days = rules.cycle_days
+    tz = driver_time_zone(driver)
+    today = (now or timezone.now()).astimezone(tz).date()
+    first_day = today - timedelta(days=cycle_days - 1)
+    rows = list(
+        DriverDailyDuty.objects.filter(
+            driver=driver, day__gte=first_day, day__lte=today
         )
-    elif total_on_duty_used > limits["maxOnDutyHours"] - 2:
-        violations.append(
-            {
-                "type": "approaching_on_duty_limit",
-                "severity": "warning",
-                "description": "Approaching on-duty limit",
-            }
+        .order_by("day")
+        .values_list("day", "on_duty_minutes")
+    )
+
+    used = sum(minutes for _, minutes in rows) / 60
+    return {
+        "cycleHoursUsed": used,
+        "cycleHoursAvailable": max(0.0, rules.hours("max_cycle") - used),
+        **_next_recapture(rows[0] if rows else None, cycle_days, tz),
+    }
+
+
+def _next_recapture(oldest, cycle_days: int, tz) -> Dict[str, Any]:
+    # oldest: (day, on-duty minutes) of the first rollup day in the window
+    if oldest is None:
+        return {"nextRecaptureAt": None, "nextRecaptureHours": None}
+    day, minutes = oldest
+    return {
+        "nextRecaptureAt": _local_midnight(day + timedelta(days=cycle_days), tz),
+        "nextRecaptureHours": minutes / 60,
+    }
+
+
+ON_DUTY_STATUSES = ("driving", "on_duty")
+
+
+def _sum_minutes(periods: QuerySet) -> Coalesce:
+    # Scalar subquery: SUM(duration_minutes) over `periods`, without GROUP BY
+    total = Func(F("duration_minutes"), function="SUM", output_field=IntegerField())
+    return Coalesce(
+        Subquery(periods.order_by().annotate(total=total).values("total")[:1]), 0
+    )
+
+
+def refresh_log_totals(logs: QuerySet) -> int:
+    """
+    Recompute total_drive_time, total_on_duty_time and cycle_hours_used
+    (all minutes) for an HOSLog queryset inside the database, with one
+    aggregate UPDATE per cycle length among the logs' rule sets.
+
+    cycle_hours_used is the driver's on-duty time in the cycle window
+    ending with the log's last closed duty period, the log itself included.
+    Clears the logs' HOS snapshots, which were seeded from the old totals.
+    Returns the number of logs updated.
+    """
+    by_cycle_days = defaultdict(list)
+    rows = logs.values_list("id", "trip__hos_rule_set", "driver__hos_rule_set")
+    for log_id, trip_rules, driver_rules in rows:
+        cycle_days = get_rule_set(trip_rules or driver_rules).cycle_days
+        by_cycle_days[cycle_days].append(log_id)
+
+    log_periods = DutyPeriod.objects.filter(hos_log=OuterRef("pk"))
+    last_end = Subquery(
+        DutyPeriod.objects.filter(
+            hos_log=OuterRef(OuterRef("pk")), end_time__isnull=False
+        )
+        .order_by("-end_time")
+        .values("end_time")[:1]
+    )
+    updated = 0
+    for cycle_days, ids in by_cycle_days.items():
+        cycle_start = ExpressionWrapper(
+            last_end - timedelta(days=cycle_days), output_field=DateTimeField()
         )
+        updated += HOSLog.objects.filter(id__in=ids).update(
+            total_drive_time=_sum_minutes(log_periods.filter(status="driving")),
+            total_on_duty_time=_sum_minutes(
+                log_periods.filter(status__in=ON_DUTY_STATUSES)
+            ),
+            cycle_hours_used=_sum_minutes(
+                DutyPeriod.objects.filter(
+                    hos_log__driver=OuterRef("driver"),
+                    status__in=ON_DUTY_STATUSES,
+                    end_time__gt=cycle_start,
+                    end_time__lte=last_end,
+                )
+            ),
+            hos_state=None,
+        )
+    return updated
 
-    # cycle checks
-    if total_cycle_hours > limits["maxCycleHours"]:
-        violations.append(
-            {
-                "type": "cycle_limit",
-                "severity": "violation",
-                "description": "Exceeded cycle hours",
-            }
+
+def refresh_affected_log_totals(
+    driver: Driver, log_id, start: datetime, end: datetime
+) -> int:
+    """
+    refresh_log_totals for a log whose duty periods changed over
+    [start, end], and for the driver's later logs whose cycle window can
+    reach back into that span.
+    """
+    reach = end + timedelta(days=CYCLE_DAYS)
+    logs = HOSLog.objects.filter(
+        Q(id=log_id) | Q(driver=driver, duty_periods__end_time__range=(start, reach))
+    ).distinct()
+    return refresh_log_totals(logs)
+
+
+def refresh_removed_duty(spans: Dict[Driver, Tuple[datetime, datetime]]) -> None:
+    """
+    After deleting duty periods, refresh each driver's daily rollups over
+    its (start, end) span, their cycle hours and the totals of their logs
+    whose cycle window can reach back into it: a fixed number of queries
+    however many periods, logs or drivers the delete took.
+    """
+    if not spans:
+        return
+    refresh_drivers_daily_duty(spans)
+    update_drivers_cycle_hours(spans)
+    condition = Q()
+    for driver, (start, end) in spans.items():
+        condition |= Q(
+            driver=driver,
+            duty_periods__end_time__range=(start, end + timedelta(days=CYCLE_DAYS)),
+        )
+    refresh_log_totals(HOSLog.objects.filter(condition).distinct())
+
+
+def hos_check_version(log) -> str:
+    """
+    Digest of everything a log's HOS check depends on: its duty periods
+    (how many, and the latest change to any of them), its rule set and the
+    cycle hours it starts from. Computed in one query, without reading the
+    periods themselves.
+    """
+    rows = (
+        HOSLog.objects.filter(id=log.id)
+        .values_list(
+            "trip__hos_rule_set",
+            "driver__hos_rule_set",
+            "cycle_hours_used",
+            "total_on_duty_time",
+        )
+        .annotate(
+            periods=Count("duty_periods"), changed=Max("duty_periods__updated_at")
+        )
+        .order_by()
+    )
+    if not rows:
+        return ""
+    trip_rules, driver_rules, cycle, on_duty, periods, changed = rows[0]
+    rules = get_rule_set(trip_rules or driver_rules)
+    key = f"{SNAPSHOT_VERSION}:{rules.id}:{cycle - on_duty}:{periods}:{changed}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def prior_cycle_hours(log) -> float:
+    """
+    Cycle hours the driver had used before the log's own on-duty time,
+    from the log's maintained totals.
+    """
+    return max(0, log.cycle_hours_used - log.total_on_duty_time) / 60
+
+
+def update_driver_cycle_hours(driver: Driver) -> float:
+    """
+    Store the driver's rolling cycle hours on Driver.current_cycle_hours.
+    """
+    used = cycle_availability(driver)["cycleHoursUsed"]
+    Driver.objects.filter(id=driver.id).update(current_cycle_hours=used)
+    driver.current_cycle_hours = used
+    return used
+
+
+def update_drivers_cycle_hours(drivers: Iterable[Driver]) -> None:
+    """
+    update_driver_cycle_hours for many drivers, in one rollup read and one
+    bulk update.
+    """
+    windows = {}  # driver id -> (driver, first day, today) in home-terminal time
+    now = timezone.now()
+    for driver in drivers:
+        today = now.astimezone(driver_time_zone(driver)).date()
+        cycle_days = rule_set_for(driver).cycle_days
+        windows[driver.id] = (driver, today - timedelta(days=cycle_days - 1), today)
+    if not windows:
+        return
+
+    used = dict.fromkeys(windows, 0)
+    rows = DriverDailyDuty.objects.filter(
+        driver_id__in=list(windows),
+        day__gte=min(first_day for _, first_day, _ in windows.values()),
+        day__lte=max(today for _, _, today in windows.values()),
+    ).values_list("driver_id", "day", "on_duty_minutes")
+    for driver_id, day, minutes in rows:
+        _, first_day, today = windows[driver_id]
+        if first_day <= day <= today:
+            used[driver_id] += minutes
+
+    for driver, _, _ in windows.values():
+        driver.current_cycle_hours = used[driver.id] / 60
+    Driver.objects.bulk_update(
+        [driver for driver, _, _ in windows.values()],
+        ["current_cycle_hours"],
+        batch_size=1000,
+    )
+
+
+def fleet_availability(now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Remaining driving, on-duty window and cycle time for every driver, most
+    driving time first, with when (and how many) cycle hours come back next.
+
+    Three queries regardless of fleet size: drivers, their daily rollups for
+    the cycle window and every duty period of the last CYCLE_DAYS days
+    (streamed in driver order through one HOSAccumulator per driver). Open
+    periods run until `now`, and the time since the last period counts as
+    off duty. Cycle hours come from the rollup unless the periods show a
+    34-hour restart. Each driver is evaluated under their own rule set.
+    """
+    now = now or timezone.now()
+    since = now - timedelta(days=CYCLE_DAYS)
+
+    drivers = list(
+        Driver.objects.values(
+            "id",
+            "status",
+            "home_terminal_time_zone",
+            "hos_rule_set",
+            "user__first_name",
+            "user__last_name",
         )
-    elif total_cycle_hours > limits["maxCycleHours"] - 5:
-        violations.append(
+    )
+
+    # Rolling cycle minutes, per driver over their own home-terminal days
+    rules = {driver["id"]: get_rule_set(driver["hos_rule_set"]) for driver in drivers}
+    first_days = {}
+    for driver in drivers:
+        today = now.astimezone(_time_zone(driver["home_terminal_time_zone"])).date()
+        cycle_days = rules[driver["id"]].cycle_days
+        first_days[driver["id"]] = (today - timedelta(days=cycle_days - 1), today)
+    cycle_minutes = dict.fromkeys(first_days, 0)
+    oldest_days = {}  # driver id -> (day, minutes) of their first day in the window
+    rollup = DriverDailyDuty.objects.filter(
+        day__gte=(now - timedelta(days=CYCLE_DAYS + 1)).date()
+    ).values_list("driver_id", "day", "on_duty_minutes")
+    for driver_id, day, minutes in rollup.iterator():
+        window = first_days.get(driver_id)
+        if window and window[0] <= day <= window[1]:
+            cycle_minutes[driver_id] += minutes
+            if driver_id not in oldest_days or day < oldest_days[driver_id][0]:
+                oldest_days[driver_id] = (day, minutes)
+
+    accumulators = {}
+    periods = (
+        DutyPeriod.objects.filter(start_time__lt=now)
+        .exclude(end_time__lte=since)
+        .order_by("hos_log__driver_id", "start_time")
+        .values_list("hos_log__driver_id", "status", "start_time", "end_time")
+    )
+    for driver_id, status, start, end in periods.iterator():
+        accumulator = accumulators.get(driver_id)
+        if accumulator is None:
+            accumulator = accumulators[driver_id] = HOSAccumulator(rules[driver_id])
+        accumulator.feed(status, max(start, since), min(end or now, now))
+
+    availability = []
+    for driver in drivers:
+        accumulator = accumulators.get(driver["id"]) or HOSAccumulator(
+            rules[driver["id"]]
+        )
+        accumulator.rest_until(now)
+        remaining = accumulator.remaining(
+            cycle=None if accumulator.restarted else cycle_minutes[driver["id"]] * 60
+        )
+        # A restart gave the whole cycle back already
+        recapture = _next_recapture(
+            None if accumulator.restarted else oldest_days.get(driver["id"]),
+            rules[driver["id"]].cycle_days,
+            _time_zone(driver["home_terminal_time_zone"]),
+        )
+        name = f"{driver['user__first_name']} {driver['user__last_name']}"
+        availability.append(
             {
-                "type": "approaching_cycle_limit",
-                "severity": "warning",
-                "description": "Approaching cycle limit",
+                "driverId": driver["id"],
+                "name": name.strip(),
+                "status": driver["status"],
+                "canDrive": remaining["driving"] > 0,
+                "drivingHoursAvailable": remaining["driving"] / 3600,
+                "onDutyHoursAvailable": remaining["window"] / 3600,
+                "cycleHoursAvailable": remaining["cycle"] / 3600,
+                **recapture,
+                "hoursUntilBreak": (
+                    remaining["break"] / 3600
+                    if remaining["break"] is not None
+                    else None
+                ),
+                "ruleSet": rules[driver["id"]].id,
             }
         )
 
-    hours_until_break = max(0.0, 8.0 - (total_on_duty_used - last_rest_break))
-    hours_until_off_duty = max(0.0, limits["maxOnDutyHours"] - total_on_duty_used)
+    availability.sort(key=lambda row: (-row["drivingHoursAvailable"], row["name"]))
+    return availability
+
+
+# Sleeper-berth splits the schedule generator may use: (sleeper, other rest) hours
+SLEEPER_SPLITS = ((7, 3), (8, 2))
+INSPECTION_MINUTES = 30
+
+
+class _SchedulePlan:
+    """
+    One candidate schedule of DutyBlocks, built greedily in epoch minutes
+    from `start`. Mirrors HOSAccumulator's bookkeeping so that a plan
+    it produces checks clean.
+    """
+
+    __slots__ = (
+        "rules",
+        "split",
+        "blocks",
+        "clock",
+        "driving",
+        "window",
+        "since_break",
+        "cycle",
+        "seg_driving",
+        "seg_window",
+        "half",
+    )
+
+    def __init__(self, rules: HOSRuleSet, seed: Dict[str, int], start: int, split=None):
+        self.rules = rules
+        self.split = split  # (sleeper, other rest) minutes, or None
+        self.blocks: List[DutyBlock] = []
+        self.clock = start
+        self.driving = seed["driving"]
+        self.window = seed["window"]
+        self.since_break = seed["since_break"]
+        self.cycle = seed["cycle"]
+        self.seg_driving = self.seg_window = 0
+        self.half: Optional[tuple] = None  # (minutes, sleeper minutes) of open half
+
+    def work(self, status: str, minutes: int, remarks: str) -> None:
+        self._add(status, minutes, remarks)
+        self.window += minutes
+        self.seg_window += minutes
+        self.cycle += minutes
+        if status == "driving":
+            self.driving += minutes
+            self.seg_driving += minutes
+            self.since_break += minutes
+        elif minutes * 60 >= self.rules.break_length:
+            self.since_break = 0
 
+    def rest(self, status: str, minutes: int, remarks: str) -> None:
+        rules = self.rules
+        seconds = minutes * 60
+        self._add(status, minutes, remarks)
+        if seconds >= rules.break_length:
+            self.since_break = 0
+        if seconds >= rules.restart_length:
+            self.cycle = 0
+        if seconds >= rules.reset_length:
+            self.driving = self.window = 0
+            self.seg_driving = self.seg_window = 0
+            self.half = None
+            return
+
+        self.window += minutes
+        if seconds < rules.split_rest:
+            self.seg_window += minutes
+            return
+        sleeper = minutes if status == "sleeper_berth" else 0
+        if self.half is not None and split_rests_pair(
+            rules, self.half[0] * 60, self.half[1] * 60, seconds, sleeper * 60
+        ):
+            self.driving, self.window = self.seg_driving, self.seg_window
+        self.half = (minutes, sleeper)
+        self.seg_driving = self.seg_window = 0
+
+    def drive(self, minutes: int) -> None:
+        """
+        Drive `minutes`, resting wherever the limits require it.
+        """
+        rules = self.rules
+        max_driving, window = rules.max_driving // 60, rules.window // 60
+        max_cycle = rules.max_cycle // 60
+        break_after = None if rules.break_after is None else rules.break_after // 60
+
+        while minutes > 0:
+            limits = [
+                minutes,
+                max_driving - self.driving,
+                window - self.window,
+                max_cycle - self.cycle,
+            ]
+            if break_after is not None:
+                limits.append(break_after - self.since_break)
+            chunk = min(limits)
+            if chunk > 0:
+                self.work("driving", chunk, f"Driving {chunk / 60:g}h")
+                minutes -= chunk
+            elif self.cycle >= max_cycle:
+                self.rest(
+                    "off_duty",
+                    rules.restart_length // 60,
+                    f"{rules.hours('restart_length'):g}-hour restart",
+                )
+            elif self.split is not None and (
+                self.half is not None
+                or (self.driving < max_driving and self.window < window)
+            ):
+                self._split_rest()
+            elif self.driving >= max_driving or self.window >= window:
+                self.rest(
+                    "off_duty",
+                    rules.reset_length // 60,
+                    f"{rules.hours('reset_length'):g}-hour off-duty reset",
+                )
+            else:
+                self.rest(
+                    "off_duty",
+                    rules.break_length // 60,
+                    f"Required {rules.break_length // 60}-minute break",
+                )
+
+    def _add(self, status: str, minutes: int, remarks: str) -> None:
+        self.blocks.append(DutyBlock(status, self.clock, self.clock + minutes, remarks))
+        self.clock += minutes
+
+    def _split_rest(self) -> None:
+        # Alternate the halves so that each one pairs with the previous
+        sleeper, other = self.split
+        split = f"{sleeper / 60:g}/{other / 60:g} split"
+        if self.half is None or self.half[1] >= self.rules.split_sleeper // 60:
+            self.rest("off_duty", other, f"Off-duty rest ({split})")
+        else:
+            self.rest("sleeper_berth", sleeper, f"Sleeper berth ({split})")
+
+
+def _schedule_seed(
+    rules: HOSRuleSet,
+    hos_state: Union[HOSAccumulator, Dict[str, Any], None],
+    current_cycle_hours: float,
+) -> Dict[str, int]:
+    # Minutes already used in the shift/cycle when the schedule starts.
+    # Partial minutes count as used: calculate_hos_status checks the plan
+    # in seconds, so rounding down would let it run past a limit.
+    def used(seconds):
+        return -(-seconds // 60)
+
+    def seconds(hours):
+        return int(round(float(hours) * 3600))
+
+    if isinstance(hos_state, HOSAccumulator):
+        return {
+            "driving": used(hos_state.shift_driving),
+            "on_duty": used(hos_state.shift_on_duty),
+            "window": used(hos_state.window_used),
+            "since_break": used(hos_state.since_break),
+            "cycle": used(hos_state.cycle),
+        }
+    if not hos_state:
+        return {
+            "driving": 0,
+            "on_duty": 0,
+            "window": 0,
+            "since_break": 0,
+            "cycle": used(seconds(current_cycle_hours)),
+        }
+
+    def minutes(key, default=0.0):
+        value = hos_state.get(key)
+        return used(seconds(default if value is None else value))
+
+    def remaining(key):
+        return seconds(hos_state[key]) // 60
+
+    driving = minutes("drivingHoursUsed")
+    on_duty = minutes("onDutyHoursUsed")
+    window = driving + on_duty
+    if hos_state.get("hoursUntilOffDuty") is not None:
+        window = rules.window // 60 - remaining("hoursUntilOffDuty")
+    since_break = driving
+    if rules.break_after is not None and hos_state.get("hoursUntilBreak") is not None:
+        since_break = rules.break_after // 60 - remaining("hoursUntilBreak")
     return {
-        "drivingHoursUsed": driving_hours,
-        "onDutyHoursUsed": on_duty_hours,
-        "cycleHoursUsed": total_cycle_hours,
-        "hoursUntilBreak": hours_until_break,
-        "hoursUntilOffDuty": hours_until_off_duty,
-        "violations": violations,
-        "canContinueDriving": len(
-            [v for v in violations if v.get("severity") == "violation"]
-        )
-        == 0,
+        "driving": driving,
+        "on_duty": on_duty,
+        "window": max(0, window),
+        "since_break": max(0, since_break),
+        "cycle": minutes("cycleHoursUsed", current_cycle_hours),
     }
 
 
+def _seeded_accumulator(
+    rules: HOSRuleSet, seed: Dict[str, int], start: int
+) -> HOSAccumulator:
+    # An accumulator whose shift, as described by `seed`, runs up to `start`
+    accumulator = HOSAccumulator(rules)
+    accumulator.cycle = seed["cycle"] * 60
+    accumulator.since_break = seed["since_break"] * 60
+    if seed["driving"] or seed["on_duty"] or seed["window"]:
+        accumulator.shift_driving = seed["driving"] * 60
+        accumulator.shift_on_duty = seed["on_duty"] * 60
+        accumulator.shift_start = start - seed["window"] * 60
+        accumulator.last_end = start
+    return accumulator
+
+
 def generate_optimized_schedule(
-    start_time_iso: str, total_driving_hours: float, current_cycle_hours: float = 0.0
-) -> List[Dict[str, Any]]:
+    start_time_iso: str,
+    total_driving_hours: float,
+    current_cycle_hours: float = 0.0,
+    rules: Optional[HOSRuleSet] = None,
+    hos_state: Union[HOSAccumulator, Dict[str, Any], None] = None,
+    sleeper_split: bool = False,
+) -> List[DutyBlock]:
     """
-    Port of generateOptimizedSchedule - returns DutyBlock-like dicts.
+    Legal duty schedule for `total_driving_hours` of driving, over as many
+    days as it takes. Serialize it with blocks.serialize_blocks().
     start_time_iso: ISO timestamp string
-    """
-    from datetime import datetime, timedelta
+    rules: the HOSRuleSet to plan under (the default one when omitted)
+    hos_state: where the driver starts from, an HOSAccumulator or a
+    calculate_hos_status() result; otherwise a fresh shift with
+    `current_cycle_hours` of the cycle used
+    sleeper_split: also consider sleeper-berth splits (SLEEPER_SPLITS)
 
+    Driving runs until the tightest of the driving, window, break and cycle
+    limits, which is then cleared with the shortest rest that does it: a
+    30-minute break, a 10-hour reset (or the next split half) or a 34-hour
+    restart. With sleeper_split, the plan finishing first wins. Everything
+    is integer minutes; a 3,000-mile trip is a couple dozen blocks.
+    """
     try:
         current_time = datetime.fromisoformat(start_time_iso)
     except Exception:
@@ -141,71 +1201,19 @@ def generate_optimized_schedule(
             hour=6, minute=0, second=0, microsecond=0
         )
 
-    blocks = []
-    remaining = total_driving_hours
-    block_id = 1
-
-    def add_minutes(t, mins):
-        return t + timedelta(minutes=mins)
-
-    # pre-trip 30 min
-    blocks.append(
-        {
-            "id": f"block-{block_id}",
-            "status": "on_duty",
-            "start_time": current_time.isoformat(),
-            "end_time": add_minutes(current_time, 30).isoformat(),
-            "remarks": "Pre-trip inspection",
-        }
-    )
-    block_id += 1
-    current_time = add_minutes(current_time, 30)
-
-    while remaining > 0:
-        drive_time = min(8, remaining)
-        drive_minutes = int(drive_time * 60)
-        start = current_time
-        end = add_minutes(current_time, drive_minutes)
-        blocks.append(
-            {
-                "id": f"block-{block_id}",
-                "status": "driving",
-                "start_time": start.isoformat(),
-                "end_time": end.isoformat(),
-                "remarks": f"Driving {drive_time}h",
-            }
-        )
-        block_id += 1
-        current_time = end
-        remaining -= drive_time
-
-        if remaining > 0:
-            # 30 minute break
-            start = current_time
-            end = add_minutes(current_time, 30)
-            blocks.append(
-                {
-                    "id": f"block-{block_id}",
-                    "status": "off_duty",
-                    "start_time": start.isoformat(),
-                    "end_time": end.isoformat(),
-                    "remarks": "Required 30-minute break",
-                }
-            )
-            block_id += 1
-            current_time = end
-
-    # post trip
-    start = current_time
-    end = add_minutes(current_time, 30)
-    blocks.append(
-        {
-            "id": f"block-{block_id}",
-            "status": "on_duty",
-            "start_time": start.isoformat(),
-            "end_time": end.isoformat(),
-            "remarks": "Post-trip inspection",
-        }
-    )
+    rules = rules or get_rule_set()
+    seed = _schedule_seed(rules, hos_state, current_cycle_hours)
+    splits = [None]
+    if sleeper_split:
+        splits += [(sleeper * 60, other * 60) for sleeper, other in SLEEPER_SPLITS]
+
+    best = None
+    for split in splits:
+        plan = _SchedulePlan(rules, seed, epoch_minutes(current_time), split)
+        plan.work("on_duty", INSPECTION_MINUTES, "Pre-trip inspection")
+        plan.drive(int(round(total_driving_hours * 60)))
+        plan.work("on_duty", INSPECTION_MINUTES, "Post-trip inspection")
+        if best is None or plan.clock < best.clock:
+            best = plan
 
-    return blocks
+    return best.blocks
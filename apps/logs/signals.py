@@ -0,0 +1,139 @@
+# apps/logs/signals.py
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from django.db.models import Max, Min
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from apps.drivers.models import Driver
+from apps.logs.models import DutyPeriod, HOSLog
+from apps.logs.persistence import duty_period_signals_suppressed
+from apps.logs.services import (
+    refresh_affected_log_totals,
+    refresh_daily_duty,
+    refresh_removed_duty,
+    update_driver_cycle_hours,
+)
+from apps.trips.models import Trip
+
+# Deletes in progress in this context: the logs, trips and drivers between
+# their pre_delete and post_delete, with the duty spans each trip collects
+_deleting: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+    "duty_deletes", default=None
+)
+
+
+def _pending_deletes() -> Dict[str, Any]:
+    pending = _deleting.get()
+    if pending is None:
+        pending = {"logs": set(), "trips": {}, "drivers": set()}
+        _deleting.set(pending)
+    return pending
+
+
+@receiver(pre_save, sender=DutyPeriod)
+def remember_previous_span(sender, instance, **kwargs):
+    # An edit can move a period off days it used to cover
+    instance._previous_span = None
+    if not instance._state.adding:
+        instance._previous_span = (
+            DutyPeriod.objects.filter(pk=instance.pk)
+            .values_list("start_time", "end_time")
+            .first()
+        )
+
+
+@receiver(post_save, sender=DutyPeriod)
+@receiver(post_delete, sender=DutyPeriod)
+def refresh_driver_daily_duty(sender, instance, **kwargs):
+    """
+    Keep DriverDailyDuty, Driver.current_cycle_hours and the HOSLog totals
+    in sync with duty period writes.
+    """
+    # apps.logs.persistence refreshes once after its bulk writes, and a
+    # deleted log refreshes once for all of its periods
+    if duty_period_signals_suppressed():
+        return
+    if instance.hos_log_id in _pending_deletes()["logs"]:
+        return
+
+    driver = (
+        Driver.objects.only("id", "home_terminal_time_zone", "hos_rule_set")
+        .filter(hos_logs__id=instance.hos_log_id)
+        .first()
+    )
+    if driver is None:
+        return
+
+    times = [instance.start_time, instance.end_time]
+    times.extend(getattr(instance, "_previous_span", None) or ())
+    times = [t for t in times if t is not None]
+    refresh_daily_duty(driver, min(times), max(times))
+    update_driver_cycle_hours(driver)
+    refresh_affected_log_totals(driver, instance.hos_log_id, min(times), max(times))
+
+
+@receiver(pre_delete, sender=HOSLog)
+def remember_deleted_log(sender, instance, **kwargs):
+    # The cascade deletes the periods first; note what they covered
+    span = instance.duty_periods.aggregate(
+        start=Min("start_time"), end=Max("end_time"), last_start=Max("start_time")
+    )
+    instance._deleted_span = None
+    if span["start"] is not None:
+        end = max(t for t in (span["end"], span["last_start"]) if t is not None)
+        instance._deleted_span = (span["start"], end)
+    _pending_deletes()["logs"].add(instance.id)
+
+
+@receiver(pre_delete, sender=Trip)
+def remember_deleted_trip(sender, instance, **kwargs):
+    # Its logs hand their spans to the trip, which refreshes once
+    _pending_deletes()["trips"][instance.id] = {}
+
+
+@receiver(pre_delete, sender=Driver)
+def remember_deleted_driver(sender, instance, **kwargs):
+    # The driver's rollups go with them; there is nothing to refresh
+    _pending_deletes()["drivers"].add(instance.id)
+
+
+@receiver(post_delete, sender=HOSLog)
+def refresh_deleted_log(sender, instance, **kwargs):
+    """
+    Refresh the rollups and totals a deleted log's periods counted in, once
+    for the whole log (or for its trip, when the trip is being deleted).
+    """
+    pending = _pending_deletes()
+    pending["logs"].discard(instance.id)
+    span = getattr(instance, "_deleted_span", None)
+    if span is None or instance.driver_id in pending["drivers"]:
+        return
+    trip_spans = pending["trips"].get(instance.trip_id)
+    if trip_spans is None:
+        _refresh_removed({instance.driver_id: span})
+        return
+    start, end = trip_spans.get(instance.driver_id, span)
+    trip_spans[instance.driver_id] = (min(start, span[0]), max(end, span[1]))
+
+
+@receiver(post_delete, sender=Trip)
+def refresh_deleted_trip(sender, instance, **kwargs):
+    spans = _pending_deletes()["trips"].pop(instance.id, None)
+    if spans:
+        _refresh_removed(spans)
+
+
+@receiver(post_delete, sender=Driver)
+def forget_deleted_driver(sender, instance, **kwargs):
+    _pending_deletes()["drivers"].discard(instance.id)
+
+
+def _refresh_removed(spans: Dict[Any, tuple]) -> None:
+    drivers = Driver.objects.only(
+        "id", "home_terminal_time_zone", "hos_rule_set"
+    ).in_bulk(list(spans))
+    refresh_removed_duty(
+        {driver: spans[driver_id] for driver_id, driver in drivers.items()}
+    )
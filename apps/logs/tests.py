@@ -1,3 +1,428 @@
-from django.test import TestCase
+import json
+from io import StringIO
+from datetime import datetime, timedelta, timezone
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone as django_timezone
+from rest_framework.test import APITestCase
+
+from apps.drivers.models import Driver
+from apps.logs.blocks import DutyBlock
+from apps.logs.persistence import save_duty_blocks
+from apps.logs.models import DriverDailyDuty, DutyPeriod, HOSLog
+from apps.logs.rules import RULE_SETS
+from apps.logs.services import (
+    HOSAccumulator,
+    calculate_hos_status,
+    generate_optimized_schedule,
+)
+from apps.trips.models import Trip
+from apps.users.models import User
+from apps.utils.testing import QueryBudgetTestMixin
+
+
+class HOSLogAPITestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="driver@example.com")
+        self.driver = Driver.objects.create(
+            user=self.user, license_number="D-1", home_terminal_time_zone="UTC"
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_log(self) -> HOSLog:
+        return HOSLog.objects.create(driver=self.driver, time_zone="UTC")
+
+    def post_period(self, log, status, start, end):
+        response = self.client.post(
+            f"/api/logs/hos/{log.id}/periods/",
+            {"status": status, "start_time": start, "end_time": end},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def check(self, log):
+        response = self.client.get(f"/api/logs/hos/{log.id}/check/")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()["hos_status"]
+
+
+class HOSCheckCycleTests(HOSLogAPITestCase):
+    def test_check_counts_earlier_logs_in_the_cycle(self):
+        first, second = self.create_log(), self.create_log()
+        period = self.post_period(
+            first, "driving", "2025-03-03T06:00:00Z", "2025-03-03T10:00:00Z"
+        )
+        self.post_period(
+            second, "driving", "2025-03-04T06:00:00Z", "2025-03-04T08:00:00Z"
+        )
+        self.assertEqual(self.check(second)["cycleHoursUsed"], 6.0)
+        second.refresh_from_db()
+        self.assertIsNotNone(second.hos_state)
+
+        # Editing the earlier log moves the later log's cycle hours too
+        response = self.client.put(
+            f"/api/logs/hos/periods/{period['id']}/",
+            {"end_time": "2025-03-03T15:00:00Z"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        second.refresh_from_db()
+        self.assertIsNone(second.hos_state)
+        self.assertEqual(self.check(second)["cycleHoursUsed"], 11.0)
+
+
+class DutyPeriodSignalTests(HOSLogAPITestCase):
+    def driving_minutes(self):
+        return sum(
+            DriverDailyDuty.objects.filter(driver=self.driver).values_list(
+                "driving_minutes", flat=True
+            )
+        )
+
+    def test_queryset_delete_refreshes_totals(self):
+        log = self.create_log()
+        self.post_period(log, "driving", "2025-03-03T06:00:00Z", "2025-03-03T10:00:00Z")
+        self.check(log)
+        log.refresh_from_db()
+        self.assertEqual(log.total_drive_time, 240)
+        self.assertIsNotNone(log.hos_state)
+
+        DutyPeriod.objects.filter(hos_log=log).delete()
+        log.refresh_from_db()
+        self.assertEqual(log.total_drive_time, 0)
+        self.assertIsNone(log.hos_state)
+        self.assertEqual(self.driving_minutes(), 0)
+        self.assertEqual(self.check(log)["cycleHoursUsed"], 0.0)
+
+    def test_save_duty_blocks_refreshes_totals(self):
+        log = self.create_log()
+        self.post_period(log, "driving", "2025-03-03T06:00:00Z", "2025-03-03T10:00:00Z")
+        start = datetime(2025, 3, 3, 12, tzinfo=timezone.utc)
+        save_duty_blocks(
+            log,
+            [
+                DutyBlock.from_dict(
+                    {
+                        "status": "driving",
+                        "start_time": start.isoformat(),
+                        "end_time": (start + timedelta(hours=2)).isoformat(),
+                    }
+                )
+            ],
+        )
+        log.refresh_from_db()
+        self.assertEqual(log.total_drive_time, 120)
+        self.assertEqual(self.driving_minutes(), 120)
+
+
+class DeleteCascadeTests(HOSLogAPITestCase):
+    def add_driving(self, log, start, count):
+        # `count` back-to-back driving periods of 5 minutes from `start`
+        for i in range(count):
+            DutyPeriod.objects.create(
+                hos_log=log,
+                status="driving",
+                start_time=start + timedelta(minutes=5 * i),
+                end_time=start + timedelta(minutes=5 * (i + 1)),
+            )
+
+    def rollup_minutes(self):
+        return sum(
+            DriverDailyDuty.objects.filter(driver=self.driver).values_list(
+                "on_duty_minutes", flat=True
+            )
+        )
+
+    def test_deleting_a_trip_refreshes_rollups_and_later_logs(self):
+        start = django_timezone.now().replace(microsecond=0) - timedelta(days=2)
+        trip = Trip.objects.create(driver=self.driver)
+        trip_log = HOSLog.objects.create(driver=self.driver, trip=trip, time_zone="UTC")
+        self.add_driving(trip_log, start, 48)
+        later = self.create_log()
+        self.add_driving(later, start + timedelta(days=1), 12)
+        later.refresh_from_db()
+        self.assertEqual(later.cycle_hours_used, 300)
+
+        response = self.client.delete(f"/api/trips/{trip.id}/")
+        self.assertEqual(response.status_code, 204)
+
+        later.refresh_from_db()
+        self.driver.refresh_from_db()
+        self.assertEqual(later.cycle_hours_used, 60)
+        self.assertEqual(self.rollup_minutes(), 60)
+        self.assertEqual(self.driver.current_cycle_hours, 1.0)
+
+    def test_deleting_a_log_refreshes_once(self):
+        start = django_timezone.now().replace(microsecond=0) - timedelta(days=2)
+        counts = []
+        for periods in (5, 50):
+            log = self.create_log()
+            self.add_driving(log, start, periods)
+            with CaptureQueriesContext(connection) as queries:
+                log.delete()
+            counts.append(len(queries))
+            self.assertEqual(self.rollup_minutes(), 0)
+        # A query count that does not grow with the periods deleted
+        self.assertEqual(counts[0], counts[1])
+        self.assertLess(counts[1], 20)
+
+    def test_deleting_a_driver_skips_the_refresh(self):
+        log = self.create_log()
+        self.add_driving(log, django_timezone.now() - timedelta(days=1), 3)
+        self.user.delete()
+        self.assertFalse(HOSLog.objects.exists())
+        self.assertFalse(DriverDailyDuty.objects.exists())
+
+
+class RebuildDailyDutyTests(HOSLogAPITestCase):
+    def test_backfills_rollups_and_cycle_hours(self):
+        log = self.create_log()
+        start = django_timezone.now().replace(microsecond=0) - timedelta(days=1)
+        DutyPeriod.objects.create(
+            hos_log=log,
+            status="driving",
+            start_time=start,
+            end_time=start + timedelta(hours=3),
+        )
+        # As left by the migration that added the rollups
+        DriverDailyDuty.objects.all().delete()
+        Driver.objects.update(current_cycle_hours=0)
+
+        call_command("rebuild_daily_duty", stdout=StringIO())
+
+        self.driver.refresh_from_db()
+        self.assertEqual(self.driver.current_cycle_hours, 3.0)
+        self.assertEqual(
+            sum(DriverDailyDuty.objects.values_list("driving_minutes", flat=True)),
+            180,
+        )
+
+
+class FleetAvailabilityTests(HOSLogAPITestCase):
+    def test_reports_the_next_recapture(self):
+        log = self.create_log()
+        now = django_timezone.now().replace(microsecond=0)
+        # Less than 34 hours apart, so no restart gives the cycle back
+        for ago, hours in ((28, 2), (5, 3)):
+            start = now - timedelta(hours=ago)
+            DutyPeriod.objects.create(
+                hos_log=log,
+                status="driving",
+                start_time=start,
+                end_time=start + timedelta(hours=hours),
+            )
+        oldest = DriverDailyDuty.objects.order_by("day").first()
+
+        response = self.client.get("/api/logs/hos/fleet/")
+        self.assertEqual(response.status_code, 200)
+        row = response.json()["results"][0]
+        self.assertEqual(row["cycleHoursAvailable"], 65.0)
+        self.assertEqual(row["nextRecaptureHours"], oldest.on_duty_minutes / 60)
+        self.assertEqual(
+            datetime.fromisoformat(row["nextRecaptureAt"].replace("Z", "+00:00")),
+            datetime.combine(
+                oldest.day + timedelta(days=8), datetime.min.time(), timezone.utc
+            ),
+        )
+
+
+class DutyEventIngestTests(HOSLogAPITestCase):
+    def ingest(self, *events):
+        body = "\n".join(
+            json.dumps({"driver_id": str(self.driver.id), **event}) for event in events
+        )
+        response = self.client.generic(
+            "POST",
+            "/api/logs/hos/ingest/",
+            body.encode(),
+            content_type="application/x-ndjson",
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_events_chain_into_periods(self):
+        result = self.ingest(
+            {
+                "device_id": "A",
+                "sequence": 1,
+                "status": "on_duty",
+                "timestamp": "2025-03-03T06:00:00Z",
+            },
+            {
+                "device_id": "A",
+                "sequence": 2,
+                "status": "driving",
+                "timestamp": "2025-03-03T06:30:00Z",
+            },
+        )
+        self.assertEqual(result["accepted"], 2)
+        self.assertEqual(result["rejected"], [])
+        self.assertEqual(DutyPeriod.objects.filter(end_time__isnull=True).count(), 1)
+
+    def test_events_inside_a_closed_period_are_rejected(self):
+        log = self.create_log()
+        self.post_period(log, "on_duty", "2025-03-03T06:00:00Z", "2025-03-03T07:00:00Z")
+        result = self.ingest(
+            {
+                "device_id": "A",
+                "sequence": 1,
+                "status": "driving",
+                "timestamp": "2025-03-03T06:00:00Z",
+            },
+            {
+                "device_id": "A",
+                "sequence": 2,
+                "status": "off_duty",
+                "timestamp": "2025-03-03T09:00:00Z",
+            },
+        )
+        self.assertEqual(result["accepted"], 1)
+        self.assertEqual(
+            result["rejected"],
+            [
+                {
+                    "line": 1,
+                    "error": "Event is older than the driver's last closed "
+                    "duty period",
+                }
+            ],
+        )
+        self.assertEqual(log.duty_periods.count(), 2)
+        self.assertFalse(DutyPeriod.objects.filter(device_id="A", sequence=1).exists())
+
+    def test_events_before_a_closed_period_are_rejected(self):
+        # No period is open, so only the closed one shows the event is late
+        log = self.create_log()
+        self.post_period(log, "on_duty", "2025-03-03T06:00:00Z", "2025-03-03T07:00:00Z")
+        result = self.ingest(
+            {
+                "device_id": "A",
+                "sequence": 1,
+                "status": "driving",
+                "timestamp": "2025-03-03T05:00:00Z",
+            },
+            {
+                "device_id": "A",
+                "sequence": 2,
+                "status": "off_duty",
+                "timestamp": "2025-03-03T07:00:00Z",
+            },
+        )
+        self.assertEqual(result["accepted"], 1)
+        self.assertEqual([r["line"] for r in result["rejected"]], [1])
+        self.assertEqual(
+            list(
+                log.duty_periods.order_by("start_time").values_list(
+                    "start_time", "end_time"
+                )
+            ),
+            [
+                (
+                    datetime(2025, 3, 3, 6, tzinfo=timezone.utc),
+                    datetime(2025, 3, 3, 7, tzinfo=timezone.utc),
+                ),
+                (datetime(2025, 3, 3, 7, tzinfo=timezone.utc), None),
+            ],
+        )
+
+
+class HOSQueryBudgetTests(QueryBudgetTestMixin, HOSLogAPITestCase):
+    def setUp(self):
+        super().setUp()
+        # Session authentication, as the budgets were measured with
+        self.client.force_authenticate(None)
+        self.client.force_login(self.user)
+
+    def add_day(self, driver, day):
+        log = HOSLog.objects.create(driver=driver, time_zone="UTC")
+        start = django_timezone.now().replace(microsecond=0) - timedelta(days=day)
+        for hour, status in enumerate(["on_duty", "driving", "off_duty", "driving"]):
+            DutyPeriod.objects.create(
+                hos_log=log,
+                status=status,
+                start_time=start + timedelta(hours=hour),
+                end_time=start + timedelta(hours=hour + 1),
+            )
+        return log
+
+    def test_check(self):
+        for day in range(5, 1, -1):
+            self.add_day(self.driver, day)
+        log = self.add_day(self.driver, 1)
+        response = self.client.get(f"/api/logs/hos/{log.id}/check/")
+        self.assertEqual(response.status_code, 200)
+        self.assertQueryBudget(response)
+
+    def test_fleet(self):
+        for number in range(12):
+            user = User.objects.create_user(email=f"fleet{number}@example.com")
+            driver = Driver.objects.create(
+                user=user, license_number=f"F-{number}", home_terminal_time_zone="UTC"
+            )
+            self.add_day(driver, 1)
+        response = self.client.get("/api/logs/hos/fleet/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total"], 13)
+        self.assertQueryBudget(response)
+
+    def test_list(self):
+        for day in range(12):
+            self.add_day(self.driver, day)
+        response = self.client.get("/api/logs/hos/", {"expand": "driver,trip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertQueryBudget(response)
+
+
+def violation_types(status):
+    return [
+        violation["type"]
+        for violation in status["violations"]
+        if violation["severity"] == "violation"
+    ]
+
+
+class OptimizedScheduleTests(SimpleTestCase):
+    start = "2025-03-03T06:00:00+00:00"
+
+    def assertLegal(self, blocks, cycle_hours, rules, prior=()):
+        status = calculate_hos_status(list(prior) + blocks, cycle_hours, rules)
+        self.assertEqual(violation_types(status), [])
+
+    def test_plans_pass_the_hos_check(self):
+        for rules in RULE_SETS.values():
+            for minutes in range(0, rules.max_cycle // 60, 41):
+                # Whole minutes, and hours that are not a whole number of them
+                for cycle_hours in (minutes / 60, minutes / 60 + 0.004):
+                    for sleeper_split in (False, True):
+                        with self.subTest(
+                            rules=rules.id,
+                            cycle_hours=cycle_hours,
+                            sleeper_split=sleeper_split,
+                        ):
+                            blocks = generate_optimized_schedule(
+                                self.start,
+                                40,
+                                cycle_hours,
+                                rules=rules,
+                                sleeper_split=sleeper_split,
+                            )
+                            self.assertLegal(blocks, cycle_hours, rules)
+
+    def test_plans_from_a_partial_shift_pass_the_hos_check(self):
+        rules = RULE_SETS["us_property_70_8"]
+        for seconds in range(0, 6 * 3600, 997):
+            end = f"2025-03-03T{6 + seconds // 3600:02d}:{seconds // 60 % 60:02d}:"
+            end += f"{seconds % 60:02d}+00:00"
+            prior = [{"status": "driving", "start_time": self.start, "end_time": end}]
+            accumulator = HOSAccumulator(rules, 50.017)
+            accumulator.feed_block(DutyBlock.from_dict(prior[0]))
+            for hos_state in (accumulator, calculate_hos_status(prior, 50.017, rules)):
+                with self.subTest(seconds=seconds, hos_state=type(hos_state)):
+                    blocks = generate_optimized_schedule(
+                        end, 20, 50.017, rules=rules, hos_state=hos_state
+                    )
+                    self.assertLegal(blocks, 50.017, rules, prior)
@@ -1,13 +1,17 @@
-from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import IntegerField, ModelSerializer, UUIDField
 
 from apps.reports.models import ComplianceReport
+from apps.trips.models import Trip
 from apps.drivers.api.serializers import DriverSerializer
+from apps.utils.serializers import ExpandableSerializerMixin
 from apps.vehicles.api.serializers import VehicleSerializer
 
 
-class ComplianceReportSerializer(ModelSerializer):
-    driver = DriverSerializer(many=False, read_only=True)
-    vehicle = VehicleSerializer(many=False, read_only=True)
+class ComplianceReportSerializer(ExpandableSerializerMixin, ModelSerializer):
+    expandable_fields = {
+        "driver": DriverSerializer,
+        "vehicle": VehicleSerializer,
+    }
 
     class Meta:
         model = ComplianceReport
@@ -21,3 +25,25 @@ class ComplianceReportSerializer(ModelSerializer):
             "violations_by_type",
             "driver_compliance_scores",
         ]
+        read_only_fields = ["vehicle", "driver"]
+
+
+class TripReportSerializer(ModelSerializer):
+    """
+    Rows of the trips report; expects annotate_trip_violations() trips.
+    """
+
+    trip_id = UUIDField(source="id", read_only=True)
+    driver_id = UUIDField(read_only=True)
+    vehicle_id = UUIDField(read_only=True)
+    total_violations = IntegerField(read_only=True)
+
+    class Meta:
+        model = Trip
+        fields = [
+            "trip_id",
+            "driver_id",
+            "vehicle_id",
+            "status",
+            "total_violations",
+        ]
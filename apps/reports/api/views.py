@@ -1,14 +1,45 @@
-from django.db.models import Sum
+from datetime import datetime, time as datetime_time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 
 from apps.reports.models import ComplianceReport
-from apps.reports.api.serializers import ComplianceReportSerializer
+from apps.reports.api.serializers import (
+    ComplianceReportSerializer,
+    TripReportSerializer,
+)
+from apps.reports.services import annotate_trip_violations, compliance_summary
 from apps.trips.models import Trip
 from apps.utils.pagination import CustomPagination
 from apps.utils.base import BaseViewSet
-from apps.utils.helpers import _average_driver_scores, _aggregate_violations_by_type
+
+
+def date_range_params(request):
+    """
+    Returns (start_date, end_date, error_response) from ?start_date /
+    ?end_date (YYYY-MM-DD); missing dates are None.
+    """
+    dates = []
+    for param in ("start_date", "end_date"):
+        value = request.query_params.get(param)
+        try:
+            day = parse_date(value) if value else None
+        except ValueError:
+            day = None
+        if value and day is None:
+            return (
+                None,
+                None,
+                Response(
+                    {"message": f"{param} must be a date (YYYY-MM-DD)"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                ),
+            )
+        dates.append(day)
+    return dates[0], dates[1], None
 
 
 class ComplianceReportViewSet(BaseViewSet):
@@ -20,25 +51,45 @@ class ComplianceReportViewSet(BaseViewSet):
     queryset = ComplianceReport.objects.all().order_by("-period_start")
     serializer_class = ComplianceReportSerializer
     pagination_class = CustomPagination()
+    query_budget = {"list": 4, "fleet_compliance_summary": 3, "trips_report": 4}
+
+    def list(self, request, *args, **kwargs):
+        """
+        GET /api/reports/ → list compliance reports (optionally filtered by
+        driver_id / vehicle_id).
+        """
+        reports = self.queryset
+        driver_id = request.query_params.get("driver_id")
+        vehicle_id = request.query_params.get("vehicle_id")
+
+        if driver_id:
+            reports = reports.filter(driver__id=driver_id)
+        if vehicle_id:
+            reports = reports.filter(vehicle__id=vehicle_id)
+
+        paginated_res = self.pagination_class.get_paginated_response(
+            query_set=reports, serializer_obj=self.serializer_class, request=request
+        )
+        return Response(paginated_res, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["get"], url_path="compliance")
     def fleet_compliance_summary(self, request):
         """
         GET /api/reports/compliance/
         → fleet compliance summary (aggregated across all drivers/vehicles).
+        start_date / end_date (YYYY-MM-DD) keep the reports whose period
+        overlaps that range.
         """
+        start_date, end_date, error_response = date_range_params(request)
+        if error_response is not None:
+            return error_response
         reports = self.queryset
+        if start_date:
+            reports = reports.filter(period_end__gte=start_date)
+        if end_date:
+            reports = reports.filter(period_start__lte=end_date)
 
-        summary = {
-            "total_reports": reports.count(),
-            "total_violations": reports.aggregate(total=Sum("total_violations"))[
-                "total"
-            ]
-            or 0,
-            "violations_by_type": _aggregate_violations_by_type(reports),
-            "average_scores": _average_driver_scores(reports),
-        }
-        return Response(summary, status=status.HTTP_200_OK)
+        return Response(compliance_summary(reports), status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["get"], url_path=r"compliance/(?P<driver_id>[^/.]+)")
     def driver_compliance_report(self, request, driver_id=None):
@@ -71,28 +122,34 @@ class ComplianceReportViewSet(BaseViewSet):
     def trips_report(self, request):
         """
         GET /api/reports/trips/
-        → report of trips with associated compliance stats.
+        → paginated report of trips with associated compliance stats.
+        Filters: driver_id, vehicle_id, start_date / end_date (YYYY-MM-DD,
+        on the trip's creation day).
         """
-        trips = Trip.objects.all()
-        data = []
-
-        for trip in trips:
-            reports = self.queryset.filter(
-                driver=trip.driver,
-                vehicle=trip.vehicle,
-                period_start__lte=trip.created_at,
-                period_end__gte=trip.updated_at,
-            )
+        trips = Trip.objects.only("id", "driver", "vehicle", "status").order_by(
+            "-created_at"
+        )
+        driver_id = request.query_params.get("driver_id")
+        vehicle_id = request.query_params.get("vehicle_id")
+        if driver_id:
+            trips = trips.filter(driver__id=driver_id)
+        if vehicle_id:
+            trips = trips.filter(vehicle__id=vehicle_id)
 
-            total_violations = sum(r.total_violations for r in reports)
-            data.append(
-                {
-                    "trip_id": trip.id,
-                    "driver_id": trip.driver_id,
-                    "vehicle_id": trip.vehicle_id,
-                    "status": trip.status,
-                    "total_violations": total_violations,
-                }
-            )
+        start_date, end_date, error_response = date_range_params(request)
+        if error_response is not None:
+            return error_response
+        # Day bounds as datetimes so the created_at indexes apply
+        if start_date:
+            start = datetime.combine(start_date, datetime_time.min)
+            trips = trips.filter(created_at__gte=timezone.make_aware(start))
+        if end_date:
+            end = datetime.combine(end_date + timedelta(days=1), datetime_time.min)
+            trips = trips.filter(created_at__lt=timezone.make_aware(end))
 
-        return Response(data, status=status.HTTP_200_OK)
+        paginated_res = self.pagination_class.get_paginated_response(
+            query_set=annotate_trip_violations(trips),
+            serializer_obj=TripReportSerializer,
+            request=request,
+        )
+        return Response(paginated_res, status=status.HTTP_200_OK)
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("drivers", "0003_driver_hos_rule_set"),
+        ("reports", "0001_initial"),
+        ("vehicles", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="compliancereport",
+            index=models.Index(
+                fields=["driver", "vehicle", "period_start"],
+                name="report_driver_vehicle_period",
+            ),
+        ),
+    ]
@@ -27,3 +27,12 @@ class ComplianceReport(BaseModel):
 
     def __str__(self):
         return f"Compliance Report for {self.driver} - {self.vehicle} ({self.period_start} to {self.period_end})"
+
+    class Meta:
+        indexes = [
+            # Trips report: one driver and vehicle's reports covering a day
+            models.Index(
+                fields=["driver", "vehicle", "period_start"],
+                name="report_driver_vehicle_period",
+            )
+        ]
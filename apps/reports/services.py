@@ -0,0 +1,139 @@
+# apps/reports/services.py
+import json
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import IntegerField, OuterRef, QuerySet, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+from apps.reports.models import ComplianceReport
+
+
+def annotate_trip_violations(trips: QuerySet) -> QuerySet:
+    """
+    Annotate each trip with `total_violations`: the sum over the compliance
+    reports of its driver and vehicle whose period covers the trip (from
+    the day it was created to the day it was last updated). One correlated
+    subquery, so a page of trips costs a single query.
+    """
+    reports = (
+        ComplianceReport.objects.filter(
+            driver=OuterRef("driver"),
+            vehicle=OuterRef("vehicle"),
+            period_start__lte=OuterRef("created_day"),
+            period_end__gte=OuterRef("updated_day"),
+        )
+        .order_by()
+        .values("driver")
+        .annotate(total=Sum("total_violations"))
+        .values("total")
+    )
+    return trips.alias(
+        created_day=TruncDate("created_at"), updated_day=TruncDate("updated_at")
+    ).annotate(
+        total_violations=Coalesce(Subquery(reports, output_field=IntegerField()), 0)
+    )
+
+
+# One scan of the filtered reports (materialized CTE); JSON objects are
+# expanded with jsonb_each and only their numeric values aggregated.
+_POSTGRES_SUMMARY_SQL = """
+WITH reports AS MATERIALIZED ({reports})
+SELECT
+    (SELECT COUNT(*) FROM reports),
+    (SELECT COALESCE(SUM(total_violations), 0) FROM reports),
+    (
+        SELECT COALESCE(jsonb_object_agg(key, total), '{{}}')
+        FROM (
+            SELECT item.key, SUM(item.value::numeric) AS total
+            FROM reports, jsonb_each(
+                CASE WHEN jsonb_typeof(reports.violations_by_type) = 'object'
+                THEN reports.violations_by_type ELSE '{{}}' END
+            ) AS item
+            WHERE jsonb_typeof(item.value) = 'number'
+            GROUP BY item.key
+        ) AS by_type
+    ),
+    (
+        SELECT COALESCE(jsonb_object_agg(key, average), '{{}}')
+        FROM (
+            SELECT item.key, ROUND(AVG(item.value::numeric), 2) AS average
+            FROM reports, jsonb_each(
+                CASE WHEN jsonb_typeof(reports.driver_compliance_scores) = 'object'
+                THEN reports.driver_compliance_scores ELSE '{{}}' END
+            ) AS item
+            WHERE jsonb_typeof(item.value) = 'number'
+            GROUP BY item.key
+        ) AS scores
+    )
+"""
+
+_SUMMARY_FIELDS = ("total_violations", "violations_by_type", "driver_compliance_scores")
+
+
+def _json_object(value) -> Dict[str, Any]:
+    # psycopg hands jsonb back as text under Django
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _numbers(data) -> Iterator[Tuple[str, Any]]:
+    # The numeric entries of a JSON object, as jsonb_typeof() = 'number'
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield key, value
+
+
+def _summary(rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    # compliance_summary() in one pass over the rows, for non-Postgres backends
+    count = violations = 0
+    by_type: Dict[str, Any] = {}
+    totals: Dict[str, Any] = {}
+    counts: Dict[str, int] = {}
+    for row in rows:
+        count += 1
+        violations += row["total_violations"]
+        for v_type, value in _numbers(row["violations_by_type"]):
+            by_type[v_type] = by_type.get(v_type, 0) + value
+        for metric, score in _numbers(row["driver_compliance_scores"]):
+            totals[metric] = totals.get(metric, 0) + score
+            counts[metric] = counts.get(metric, 0) + 1
+    return {
+        "total_reports": count,
+        "total_violations": violations,
+        "violations_by_type": by_type,
+        "average_scores": {
+            metric: round(totals[metric] / counts[metric], 2) for metric in totals
+        },
+    }
+
+
+def compliance_summary(reports: QuerySet) -> Dict[str, Any]:
+    """
+    Fleet-wide totals of `reports` in a single query: total_reports,
+    total_violations, violations_by_type (summed per type) and
+    average_scores (per metric, over the reports that have it, 2 decimals).
+    Only numeric JSON values are aggregated.
+
+    Postgres aggregates the JSON fields in the database; other backends
+    fetch the three columns once and aggregate them in one pass.
+    """
+    reports = reports.order_by().values(*_SUMMARY_FIELDS)
+    connection = connections[reports.db]
+    if connection.vendor != "postgresql":
+        return _summary(reports.iterator())
+
+    try:
+        sql, params = reports.query.get_compiler(using=reports.db).as_sql()
+    except EmptyResultSet:
+        return _summary([])
+    with connection.cursor() as cursor:
+        cursor.execute(_POSTGRES_SUMMARY_SQL.format(reports=sql), params)
+        count, violations, by_type, scores = cursor.fetchone()
+    return {
+        "total_reports": count,
+        "total_violations": violations,
+        "violations_by_type": _json_object(by_type),
+        "average_scores": _json_object(scores),
+    }
@@ -1,3 +1,52 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from rest_framework.test import APITestCase
+
+from apps.drivers.models import Driver
+from apps.reports.models import ComplianceReport
+from apps.trips.models import Trip
+from apps.users.models import User
+from apps.utils.testing import QueryBudgetTestMixin
+from apps.vehicles.models import Vehicle
+
+
+class ReportQueryBudgetTests(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        # A driver, vehicle, trip and report per row, so a query per row
+        # shows up as a repeated query
+        for number in range(12):
+            user = User.objects.create_user(email=f"driver{number}@example.com")
+            driver = Driver.objects.create(
+                user=user, license_number=f"D-{number}", home_terminal_time_zone="UTC"
+            )
+            vehicle = Vehicle.objects.create(
+                vehicle_number=f"V-{number}", make_model="Freightliner Cascadia"
+            )
+            Trip.objects.create(driver=driver, vehicle=vehicle)
+            ComplianceReport.objects.create(
+                driver=driver,
+                vehicle=vehicle,
+                period_start=date(2000, 1, 1),
+                period_end=date(2100, 1, 1),
+                total_violations=number,
+                violations_by_type={"cycle_limit": number},
+                driver_compliance_scores={"safety_score": 90},
+            )
+        self.client.force_login(user)
+
+    def test_list(self):
+        response = self.client.get("/api/reports/", {"expand": "driver,vehicle"})
+        self.assertEqual(response.status_code, 200)
+        self.assertQueryBudget(response)
+        self.assertIsInstance(response.json()["results"][0]["driver"], dict)
+
+    def test_fleet_compliance_summary(self):
+        response = self.client.get("/api/reports/compliance/")
+        self.assertEqual(response.status_code, 200)
+        self.assertQueryBudget(response)
+
+    def test_trips_report(self):
+        response = self.client.get("/api/reports/trips/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 12)
+        self.assertQueryBudget(response)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from apps.trips.models import Trip, RouteWaypoint
+from apps.trips.models import Trip, RouteWaypoint, RouteCalculationJob
 
 
 @admin.register(Trip)
@@ -21,3 +21,11 @@ class RouteWaypointAdmin(admin.ModelAdmin):
     search_fields = ("trip__id",)
     list_filter = ("waypoint_type",)
     ordering = ("-estimated_arrival",)
+
+
+@admin.register(RouteCalculationJob)
+class RouteCalculationJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "trip", "status", "created_at", "finished_at")
+    search_fields = ("trip__id",)
+    list_filter = ("status",)
+    ordering = ("-created_at",)
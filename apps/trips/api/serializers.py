@@ -1,18 +1,20 @@
-from rest_framework.serializers import ModelSerializer, CharField
+from rest_framework.serializers import ModelSerializer
 
-from apps.trips.models import Trip
+from apps.trips.models import Trip, RouteWaypoint, RouteCalculationJob
 from apps.drivers.api.serializers import DriverSerializer
 from apps.vehicles.api.serializers import VehicleSerializer
 from apps.locations.api.serializers import LocationSerializer
-from apps.locations.models import Location
+from apps.utils.serializers import ExpandableSerializerMixin
 
 
-class TripSerializer(ModelSerializer):
-    driver = DriverSerializer(many=False, read_only=True)
-    vehicle = VehicleSerializer(many=False, read_only=True)
-    current_location = LocationSerializer(many=False, read_only=True)
-    pickup_location = LocationSerializer(many=False, read_only=True)
-    dropoff_location = LocationSerializer(many=False, read_only=True)
+class TripSerializer(ExpandableSerializerMixin, ModelSerializer):
+    expandable_fields = {
+        "driver": DriverSerializer,
+        "vehicle": VehicleSerializer,
+        "current_location": LocationSerializer,
+        "pickup_location": LocationSerializer,
+        "dropoff_location": LocationSerializer,
+    }
 
     class Meta:
         model = Trip
@@ -28,23 +30,47 @@ class TripSerializer(ModelSerializer):
             "current_cycle_hours",
             "status",
             "time_zone",
+            "hos_rule_set",
             "created_at",
         ]
+        read_only_fields = [
+            "driver",
+            "vehicle",
+            "current_location",
+            "pickup_location",
+            "dropoff_location",
+        ]
 
 
-class RouteWaypointSerializer(ModelSerializer):
-    trip = TripSerializer(many=False, read_only=True)
+class RouteWaypointSerializer(ExpandableSerializerMixin, ModelSerializer):
+    expandable_fields = {"trip": TripSerializer}
 
     class Meta:
-        model = Trip
+        model = RouteWaypoint
         fields = [
             "id",
             "trip",
             "waypoint_type",
-            "location",
             "estimated_arrival",
             "duration_minutes",
             "description",
             "is_mandatory",
+            "sequence",
+            "created_at",
+        ]
+        read_only_fields = ["trip"]
+
+
+class RouteCalculationJobSerializer(ModelSerializer):
+    class Meta:
+        model = RouteCalculationJob
+        fields = [
+            "id",
+            "trip",
+            "status",
+            "result",
+            "error",
             "created_at",
+            "started_at",
+            "finished_at",
         ]
@@ -1,35 +1,78 @@
-from datetime import datetime
+import json
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import parse_header_parameters
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 
 from apps.drivers.models import Driver
 from apps.locations.models import Location
-from apps.trips.models import Trip, RouteWaypoint
-from apps.trips.api.serializers import TripSerializer, RouteWaypointSerializer
+from apps.trips.models import Trip, RouteWaypoint, RouteCalculationJob
+from apps.trips.api.serializers import (
+    TripSerializer,
+    RouteWaypointSerializer,
+    RouteCalculationJobSerializer,
+)
 from apps.utils.pagination import CustomPagination
 from apps.utils.base import BaseViewSet
 
+from apps.trips.batch import plan_trip_batch
+from apps.trips.jobs import enqueue_route_job
 from apps.trips.services import (
-    geocode_address,
-    calculate_approx_route,
-    generate_hos_waypoints,
-    build_route_response,
-)
-from django.db import transaction
-from apps.logs.services import (
-    generate_optimized_schedule,
-    calculate_hos_status,
-    DEFAULT_LIMITS as DEFAULT_HOS_LIMITS,
+    calculate_trip_route,
+    GeocodingUnavailable,
+    ROUTE_GEOMETRY_FORMATS,
 )
 
+JOB_POLL_INTERVAL = 0.25  # seconds between checks while long-polling
+
+
+def route_format_options(request):
+    """
+    Returns (geometry, zoom, error_response) from ?geometry / ?zoom or the
+    Accept media type parameters (application/json; geometry=polyline).
+    """
+    _, media_params = parse_header_parameters(request.accepted_media_type or "")
+    geometry = request.query_params.get("geometry") or media_params.get(
+        "geometry", "coordinates"
+    )
+    zoom = request.query_params.get("zoom") or media_params.get("zoom")
+    if geometry not in ROUTE_GEOMETRY_FORMATS:
+        return (
+            None,
+            None,
+            Response(
+                {"message": f"geometry must be one of {ROUTE_GEOMETRY_FORMATS}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            ),
+        )
+    if zoom is not None:
+        try:
+            zoom = int(zoom)
+        except ValueError:
+            return (
+                None,
+                None,
+                Response(
+                    {"message": "zoom must be an integer"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                ),
+            )
+    return geometry, zoom, None
+
 
 class TripViewSet(BaseViewSet):
     lookup_field = "trip_id"
     queryset = Trip.objects.all().order_by("-created_at")
     serializer_class = TripSerializer
     pagination_class = CustomPagination()
+    query_budget = {"list": 4, "retrieve": 3}
 
     def list(self, request, *args, **kwargs):
         """
@@ -84,13 +127,14 @@ class TripViewSet(BaseViewSet):
         """
         GET /api/trips/{trip_id}/ → retrieve a specific trip by ID.
         """
-        trip = self.queryset.filter(id=kwargs.get("trip_id")).first()
+        trips = self.serializer_class.optimize_queryset(self.queryset, request)
+        trip = trips.filter(id=kwargs.get("trip_id")).first()
         if trip is None:
             return Response(
                 {"message": "Trip not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
-        serializer = self.serializer_class(trip)
+        serializer = self.serializer_class(trip, context={"request": request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def update(self, request, *args, **kwargs):
@@ -128,98 +172,114 @@ class TripViewSet(BaseViewSet):
         """
         POST /api/trips/{trip_id}/calculate-route/
         Computes waypoints, HOS-compliant duty schedule, violations, and persists to DB.
+        ?geometry=polyline (or Accept: application/json; geometry=polyline)
+        returns an encoded polyline; ?zoom=N simplifies the path for that zoom.
+        ?async=1 queues the calculation and returns 202 with a job id to poll.
         """
         trip = self.queryset.filter(id=kwargs.get("trip_id")).first()
+        if trip is None:
+            return Response(
+                {"message": "Trip not found"}, status=status.HTTP_404_NOT_FOUND
+            )
         body = request.data
 
-        try:
+        geometry, zoom, error_response = route_format_options(request)
+        if error_response is not None:
+            return error_response
 
-            def resolve(loc_key, addr_key):
-                loc = body.get(loc_key)
-                if (
-                    loc
-                    and isinstance(loc, dict)
-                    and "lat" in loc
-                    and ("lon" in loc or "lng" in loc)
-                ):
-                    return (
-                        float(loc["lat"]),
-                        float(loc.get("lon") or loc.get("lng")),
-                    )
-                addr = body.get(addr_key)
-                if addr:
-                    return geocode_address(addr)
-                obj_loc = getattr(trip, loc_key, None)
-                if obj_loc and hasattr(obj_loc, "lat"):
-                    return (obj_loc.lat, obj_loc.lon)
-                raise ValueError(f"No location for {loc_key}")
-
-            origin = resolve("current_location", "current_location_address")
-            pickup = resolve("pickup_location", "pickup_address")
-            dropoff = resolve("dropoff_location", "dropoff_address")
+        if request.query_params.get("async") in ("1", "true"):
+            job = enqueue_route_job(
+                trip, {"body": body, "geometry": geometry, "zoom": zoom}
+            )
+            return Response(
+                {
+                    "job_id": job.id,
+                    "status": job.status,
+                    "status_url": request.build_absolute_uri(
+                        reverse("trips-route-job", kwargs={"job_id": job.id})
+                    ),
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
 
+        try:
+            result = calculate_trip_route(trip, body, geometry=geometry, zoom=zoom)
         except ValueError as e:
             return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception:
+        except GeocodingUnavailable as e:
+            return Response({"message": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["post"], url_path="calculate-routes")
+    def calculate_routes(self, request, *args, **kwargs):
+        """
+        POST /api/trips/calculate-routes/ → plan routes for many trips at once.
+        Body: {"trips": [{"trip_id": ..., <calculate-route body>}, ...]}.
+        Streams newline-delimited JSON: one line per trip as it completes,
+        then a {"summary": ...} line. Accepts ?geometry and ?zoom like
+        calculate-route.
+        """
+        items = request.data.get("trips") if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"message": "trips must be a non-empty list"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > settings.ROUTE_BATCH_MAX_TRIPS:
+            return Response(
+                {
+                    "message": "A batch can plan at most "
+                    f"{settings.ROUTE_BATCH_MAX_TRIPS} trips"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not all(isinstance(item, dict) for item in items):
             return Response(
-                {"message": "Geocoding failed or external service unavailable"},
-                status=status.HTTP_502_BAD_GATEWAY,
+                {"message": "Each trip must be an object"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Routing logic
-        route = calculate_approx_route([origin, pickup, dropoff])
-        hos_status_input = body.get(
-            "hos_status", {"drivingHoursUsed": 0.0, "canContinueDriving": True}
-        )
+        geometry, zoom, error_response = route_format_options(request)
+        if error_response is not None:
+            return error_response
 
-        waypoints = generate_hos_waypoints(
-            origin, pickup, dropoff, hos_status_input, route["distance"]
+        lines = (
+            json.dumps(line, cls=DjangoJSONEncoder) + "\n"
+            for line in plan_trip_batch(items, geometry=geometry, zoom=zoom)
         )
+        return StreamingHttpResponse(lines, content_type="application/x-ndjson")
 
-        # Duty schedule + HOS violations
-
-        total_driving_hours = route["duration"]
-        hos_schedule = generate_optimized_schedule("06:00", total_driving_hours)
-        hos_status = calculate_hos_status(hos_schedule, 0, DEFAULT_HOS_LIMITS)
-
-        # Persist waypoints
-        with transaction.atomic():
-            RouteWaypoint.objects.filter(trip=trip).delete()
-            for wp in waypoints:
-                eta_value = wp.get("eta")
-                eta_dt = None
-                if eta_value:
-                    try:
-                        eta_dt = (
-                            eta_value
-                            if isinstance(eta_value, datetime)
-                            else datetime.strptime(eta_value, "%H:%M")
-                        )
-                    except Exception:
-                        eta_dt = None
-
-                RouteWaypoint.objects.create(
-                    trip=trip,
-                    waypoint_type=wp.get("type"),
-                    estimated_arrival=eta_dt,
-                    duration_minutes=wp.get("duration_minutes", 0),
-                    description=wp.get("reason") or wp.get("address") or "",
-                    is_mandatory=wp.get("type") in ("rest", "mandatory_break"),
-                )
-
-        # -----------------------
-        # Build frontend response
-        # -----------------------
-        result = {
-            "route": build_route_response(
-                waypoints, route["path"], route["distance"], route["duration"]
-            ),
-            "hosSchedule": hos_schedule,
-            "hosStatus": hos_status,
-        }
-        
-        print(result)
-        return Response(result, status=status.HTTP_200_OK)
+    @action(detail=False, methods=["get"], url_path=r"jobs/(?P<job_id>[^/.]+)")
+    def route_job(self, request, job_id=None):
+        """
+        GET /api/trips/jobs/{job_id}/ → status and result of a route job.
+        ?wait=N long-polls up to N seconds for the job to finish.
+        """
+        job = RouteCalculationJob.objects.filter(id=job_id).first()
+        if job is None:
+            return Response(
+                {"message": "Job not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            wait = min(
+                float(request.query_params.get("wait", 0)),
+                settings.ROUTE_JOB_MAX_WAIT,
+            )
+        except ValueError:
+            return Response(
+                {"message": "wait must be a number of seconds"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        deadline = time.monotonic() + wait
+        while not job.is_finished and time.monotonic() < deadline:
+            time.sleep(JOB_POLL_INTERVAL)
+            job.refresh_from_db()
+
+        serializer = RouteCalculationJobSerializer(job)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["get", "post"], url_path="waypoints")
     def waypoints(self, request, *args, **kwargs):
@@ -0,0 +1,175 @@
+# apps/trips/batch.py
+import logging
+import multiprocessing
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional
+
+import django
+from django.conf import settings
+from django.db import transaction
+
+from apps.logs.services import rule_set_for
+from apps.trips.models import Trip
+from apps.trips.services import (
+    TRIP_LOCATION_KEYS,
+    collect_trip_locations,
+    geocode_many,
+    persist_route_waypoints,
+    plan_trip_route,
+)
+
+logger = logging.getLogger(__name__)
+
+_pool_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Process pool for routing/HOS work, started on first use. Workers are
+    spawned (not forked) so they never share the parent's DB connections or
+    threads. None when ROUTE_BATCH_WORKERS <= 1 (the default): the batch
+    then runs inline, in the request.
+    """
+    global _pool
+    if settings.ROUTE_BATCH_WORKERS <= 1:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.ROUTE_BATCH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=django.setup,
+                )
+    return _pool
+
+
+def _submit(pool: Optional[ProcessPoolExecutor], *args, **kwargs) -> Future:
+    if pool is not None:
+        return pool.submit(plan_trip_route, *args, **kwargs)
+    future = Future()
+    try:
+        future.set_result(plan_trip_route(*args, **kwargs))
+    except Exception as exc:
+        future.set_exception(exc)
+    return future
+
+
+def _trip_key(value: Any) -> Optional[str]:
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return None
+
+
+def plan_trip_batch(
+    items: List[Dict[str, Any]],
+    geometry: str = "coordinates",
+    zoom: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Plan routes for many trips, yielding one line per trip as it completes
+    and a final summary line.
+
+    Each item is a calculate-route body plus its `trip_id`. Trips are loaded
+    in one query and every address in the batch is geocoded once, however
+    many trips share it. Routing and HOS planning fan out over the process
+    pool; each trip's waypoints are written in their own transaction before
+    its line is yielded. Per-trip errors are reported on that trip's line
+    and do not stop the rest of the batch.
+    """
+    keys = [_trip_key(item.get("trip_id")) for item in items]
+    trips = Trip.objects.select_related("driver").in_bulk([key for key in keys if key])
+    trips = {str(trip_id): trip for trip_id, trip in trips.items()}
+
+    failed = 0
+    pending = []  # (trip, body, resolved, addresses)
+    for item, key in zip(items, keys):
+        trip_id = str(item.get("trip_id") or "")
+        trip = trips.get(key)
+        if trip is None:
+            failed += 1
+            yield {"trip_id": trip_id, "status": "failed", "error": "Trip not found"}
+            continue
+        try:
+            resolved, addresses = collect_trip_locations(trip, item)
+        except ValueError as exc:
+            failed += 1
+            yield {"trip_id": trip_id, "status": "failed", "error": str(exc)}
+            continue
+        pending.append((trip, item, resolved, addresses))
+
+    # One geocoding round for the whole batch
+    failures: Dict[str, Exception] = {}
+    geocoded = geocode_many(
+        {addr for *_, addresses in pending for addr in addresses.values()},
+        failures=failures,
+    )
+
+    pool = _get_pool()
+    futures = {}
+    for trip, body, resolved, addresses in pending:
+        missing = [addr for addr in addresses.values() if addr in failures]
+        if missing:
+            failed += 1
+            yield {
+                "trip_id": str(trip.id),
+                "status": "failed",
+                "error": str(failures[missing[0]]),
+            }
+            continue
+        for loc_key, addr in addresses.items():
+            resolved[loc_key] = geocoded[addr]
+        origin, pickup, dropoff = (resolved[k] for k, _ in TRIP_LOCATION_KEYS)
+        future = _submit(
+            pool,
+            origin,
+            pickup,
+            dropoff,
+            body,
+            geometry=geometry,
+            zoom=zoom,
+            rules=rule_set_for(trip.driver, trip),
+        )
+        futures[future] = trip
+
+    succeeded = 0
+    for future in as_completed(futures):
+        trip = futures[future]
+        try:
+            waypoints, response = future.result()
+        except ValueError as exc:
+            error = str(exc)
+        except Exception:
+            logger.exception("Batch route planning failed for trip %s", trip.id)
+            error = "Route planning failed"
+        else:
+            # Saved before the trip is reported, so a client that stops
+            # reading mid-stream never sees a success that was not stored
+            try:
+                with transaction.atomic():
+                    persist_route_waypoints(trip, waypoints, diff=True)
+            except Exception:
+                logger.exception("Saving batch waypoints failed for trip %s", trip.id)
+                error = "Saving the route failed"
+            else:
+                succeeded += 1
+                yield {
+                    "trip_id": str(trip.id),
+                    "status": "succeeded",
+                    "result": response,
+                }
+                continue
+        failed += 1
+        yield {"trip_id": str(trip.id), "status": "failed", "error": error}
+
+    yield {
+        "summary": {
+            "total": len(items),
+            "succeeded": succeeded,
+            "failed": failed,
+        }
+    }
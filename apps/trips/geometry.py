@@ -0,0 +1,174 @@
+# apps/trips/geometry.py
+import math
+from typing import List, Sequence, Tuple
+
+EARTH_RADIUS_MILES = 3959.0
+
+Point = Tuple[float, float]
+
+
+def haversine_miles(a: Point, b: Point) -> float:
+    """
+    Great-circle distance in miles between two (lat, lon) points.
+    """
+    return segment_distances([a, b])[0]
+
+
+def segment_distances(coords: Sequence[Point]) -> List[float]:
+    """
+    Distances in miles between consecutive (lat, lon) points, in one pass.
+    Each point is converted to radians (and its latitude cosine taken) once,
+    instead of once per segment end.
+    """
+    lats = [math.radians(p[0]) for p in coords]
+    lons = [math.radians(p[1]) for p in coords]
+    cos_lats = [math.cos(lat) for lat in lats]
+    sin, asin, sqrt = math.sin, math.asin, math.sqrt
+
+    distances = []
+    for i in range(len(coords) - 1):
+        hav = (
+            sin((lats[i + 1] - lats[i]) / 2) ** 2
+            + cos_lats[i] * cos_lats[i + 1] * sin((lons[i + 1] - lons[i]) / 2) ** 2
+        )
+        distances.append(2 * EARTH_RADIUS_MILES * asin(sqrt(min(1.0, hav))))
+    return distances
+
+
+def interpolate_point(
+    a: Point, b: Point, ratio: float, great_circle: bool = False
+) -> Point:
+    """
+    Point at `ratio` (0..1) of the way from a to b.
+    """
+    if not great_circle:
+        return a[0] + (b[0] - a[0]) * ratio, a[1] + (b[1] - a[1]) * ratio
+    return _slerp(a, b, [ratio])[0]
+
+
+def interpolate_path(
+    coords: Sequence[Point],
+    distances: Sequence[float],
+    spacing_miles: float = 50.0,
+    great_circle: bool = False,
+) -> List[List[float]]:
+    """
+    Densify a polyline for display: each segment gets one point roughly every
+    `spacing_miles` (at least two steps). Segment joints appear once.
+    Returns [[lat, lon], ...] lists, ready for JSON.
+    """
+    if not coords:
+        return []
+
+    path = [[float(coords[0][0]), float(coords[0][1])]]
+    for i, distance in enumerate(distances):
+        a, b = coords[i], coords[i + 1]
+        steps = max(2, int(distance // spacing_miles))
+        ratios = [step / steps for step in range(1, steps + 1)]
+        if great_circle:
+            path.extend([lat, lon] for lat, lon in _slerp(a, b, ratios))
+        else:
+            lat0, lon0 = a
+            dlat, dlon = b[0] - lat0, b[1] - lon0
+            path.extend([lat0 + dlat * r, lon0 + dlon * r] for r in ratios)
+    return path
+
+
+def _slerp(a: Point, b: Point, ratios: Sequence[float]) -> List[Point]:
+    """
+    Spherical interpolation between a and b for several ratios at once.
+    """
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    x1, y1, z1 = (
+        math.cos(lat1) * math.cos(lon1),
+        math.cos(lat1) * math.sin(lon1),
+        math.sin(lat1),
+    )
+    x2, y2, z2 = (
+        math.cos(lat2) * math.cos(lon2),
+        math.cos(lat2) * math.sin(lon2),
+        math.sin(lat2),
+    )
+    angle = math.acos(max(-1.0, min(1.0, x1 * x2 + y1 * y2 + z1 * z2)))
+    if angle < 1e-12:
+        return [(a[0], a[1]) for _ in ratios]
+
+    sin_angle = math.sin(angle)
+    points = []
+    for r in ratios:
+        wa = math.sin((1 - r) * angle) / sin_angle
+        wb = math.sin(r * angle) / sin_angle
+        x, y, z = wa * x1 + wb * x2, wa * y1 + wb * y2, wa * z1 + wb * z2
+        points.append(
+            (
+                math.degrees(math.atan2(z, math.hypot(x, y))),
+                math.degrees(math.atan2(y, x)),
+            )
+        )
+    return points
+
+
+def tolerance_for_zoom(zoom: int, pixels: float = 1.0) -> float:
+    """
+    Simplification tolerance in degrees that is invisible at a given web-map
+    zoom level: `pixels` worth of longitude on a 256px-tile map.
+    """
+    return pixels * 360.0 / (256 * 2 ** max(0, zoom))
+
+
+def simplify_path(path: Sequence[Sequence[float]], tolerance: float) -> List:
+    """
+    Douglas-Peucker simplification of a [lat, lon] polyline. Points closer
+    than `tolerance` degrees to the simplified line are dropped; the first
+    and last points are always kept.
+    """
+    if len(path) < 3 or tolerance <= 0:
+        return list(path)
+
+    tolerance_sq = tolerance * tolerance
+    keep = [False] * len(path)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(path) - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = path[first]
+        bx, by = path[last]
+        dx, dy = bx - ax, by - ay
+        seg_len_sq = dx * dx + dy * dy
+
+        max_dist_sq, index = 0.0, 0
+        for i in range(first + 1, last):
+            px, py = path[i]
+            if seg_len_sq == 0:
+                dist_sq = (px - ax) ** 2 + (py - ay) ** 2
+            else:
+                cross = dx * (py - ay) - dy * (px - ax)
+                dist_sq = cross * cross / seg_len_sq
+            if dist_sq > max_dist_sq:
+                max_dist_sq, index = dist_sq, i
+
+        if max_dist_sq > tolerance_sq:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return [point for point, kept in zip(path, keep) if kept]
+
+
+def encode_polyline(path: Sequence[Sequence[float]], precision: int = 5) -> str:
+    """
+    Encode [lat, lon] points with Google's encoded polyline algorithm.
+    """
+    factor = 10**precision
+    chunks = []
+    prev_lat = prev_lon = 0
+    for lat, lon in path:
+        lat_i, lon_i = int(round(lat * factor)), int(round(lon * factor))
+        for delta in (lat_i - prev_lat, lon_i - prev_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            chunks.append(chr(value + 63))
+        prev_lat, prev_lon = lat_i, lon_i
+    return "".join(chunks)
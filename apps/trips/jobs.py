@@ -0,0 +1,134 @@
+# apps/trips/jobs.py
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.trips.models import RouteCalculationJob, Trip
+from apps.trips.services import calculate_trip_route
+
+logger = logging.getLogger(__name__)
+
+# In-process runner; with ROUTE_JOB_WORKERS=0 jobs wait for `run_route_jobs`
+_job_executor = (
+    ThreadPoolExecutor(
+        max_workers=settings.ROUTE_JOB_WORKERS, thread_name_prefix="route-job"
+    )
+    if settings.ROUTE_JOB_WORKERS
+    else None
+)
+
+
+def enqueue_route_job(trip: Trip, payload: Dict[str, Any]) -> RouteCalculationJob:
+    """
+    Store a queued job and hand it to the local worker pool once committed.
+    payload holds the request `body` plus the `geometry` and `zoom` options.
+    """
+    job = RouteCalculationJob.objects.create(trip=trip, payload=payload)
+    if _job_executor is not None:
+        transaction.on_commit(lambda: _job_executor.submit(_run_in_thread, job.id))
+    return job
+
+
+def _claimable(now) -> Q:
+    # Queued, or running under a lease its runner let expire (it crashed)
+    return Q(status="queued") | Q(
+        status="running",
+        lease_expires_at__lt=now,
+        attempts__lt=settings.ROUTE_JOB_MAX_ATTEMPTS,
+    )
+
+
+def run_route_job(job_id) -> Optional[RouteCalculationJob]:
+    """
+    Claim a queued job, or a running one whose lease expired, and execute
+    it under a ROUTE_JOB_LEASE-second lease. Returns None when another
+    runner holds it.
+    """
+    now = timezone.now()
+    claimed = RouteCalculationJob.objects.filter(_claimable(now), id=job_id).update(
+        status="running",
+        started_at=now,
+        lease_expires_at=now + timedelta(seconds=settings.ROUTE_JOB_LEASE),
+        attempts=F("attempts") + 1,
+        updated_at=now,
+    )
+    if not claimed:
+        return None
+
+    job = RouteCalculationJob.objects.select_related("trip").get(id=job_id)
+    payload = job.payload or {}
+    try:
+        job.result = calculate_trip_route(
+            job.trip,
+            payload.get("body") or {},
+            geometry=payload.get("geometry", "coordinates"),
+            zoom=payload.get("zoom"),
+        )
+        job.status = "succeeded"
+    except ValueError as exc:
+        job.error = str(exc)
+        job.status = "failed"
+    except Exception as exc:
+        logger.exception("Route job %s failed", job_id)
+        job.error = str(exc)
+        job.status = "failed"
+    job.finished_at = timezone.now()
+    job.lease_expires_at = None
+    job.save(
+        update_fields=[
+            "result",
+            "error",
+            "status",
+            "finished_at",
+            "lease_expires_at",
+            "updated_at",
+        ]
+    )
+    return job
+
+
+def fail_abandoned_route_jobs() -> int:
+    """
+    Fail the jobs whose lease expired on their last allowed attempt; each
+    of their runs ended without finishing. Returns how many were failed.
+    """
+    now = timezone.now()
+    return RouteCalculationJob.objects.filter(
+        status="running",
+        lease_expires_at__lt=now,
+        attempts__gte=settings.ROUTE_JOB_MAX_ATTEMPTS,
+    ).update(
+        status="failed",
+        error="The route calculation stopped before finishing",
+        finished_at=now,
+        lease_expires_at=None,
+        updated_at=now,
+    )
+
+
+def run_pending_route_jobs(limit: Optional[int] = None) -> int:
+    """
+    Execute queued jobs, and retry those abandoned by a crashed runner,
+    oldest first; returns how many this call ran.
+    """
+    fail_abandoned_route_jobs()
+    job_ids = RouteCalculationJob.objects.filter(
+        _claimable(timezone.now())
+    ).values_list("id", flat=True)
+    if limit:
+        job_ids = job_ids[:limit]
+    return sum(1 for job_id in list(job_ids) if run_route_job(job_id) is not None)
+
+
+def _run_in_thread(job_id) -> None:
+    try:
+        run_route_job(job_id)
+    finally:
+        # Worker threads own their DB connections
+        connections.close_all()
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.trips.jobs import run_pending_route_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued route calculation jobs, and retry those whose runner "
+        "crashed (continuously unless --once)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true", help="Drain the queue once and exit."
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep when the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            ran = run_pending_route_jobs()
+            if ran:
+                self.stdout.write(f"Ran {ran} route job(s)")
+            if options["once"]:
+                return
+            if not ran:
+                time.sleep(options["interval"])
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trips", "0003_remove_routewaypoint_location"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="routewaypoint",
+            options={
+                "ordering": ["estimated_arrival", "sequence"],
+                "verbose_name_plural": "Route Waypoints",
+            },
+        ),
+        migrations.AddField(
+            model_name="routewaypoint",
+            name="sequence",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
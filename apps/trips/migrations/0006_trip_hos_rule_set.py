@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trips", "0005_routecalculationjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trip",
+            name="hos_rule_set",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("us_property_70_8", "US property-carrying, 70 hours / 8 days"),
+                    ("us_property_60_7", "US property-carrying, 60 hours / 7 days"),
+                    (
+                        "us_short_haul",
+                        "US short-haul (150 air-mile), 70 hours / 8 days",
+                    ),
+                    (
+                        "us_adverse_conditions",
+                        "US adverse driving conditions, 70 hours / 8 days",
+                    ),
+                ],
+                default="",
+                max_length=32,
+            ),
+        ),
+    ]
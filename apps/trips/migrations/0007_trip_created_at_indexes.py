@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("drivers", "0003_driver_hos_rule_set"),
+        ("locations", "0002_geocodecacheentry"),
+        ("trips", "0006_trip_hos_rule_set"),
+        ("vehicles", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(fields=["-created_at"], name="trip_created_at_desc"),
+        ),
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(
+                fields=["driver", "-created_at"], name="trip_driver_created_at"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(
+                fields=["vehicle", "-created_at"], name="trip_vehicle_created_at"
+            ),
+        ),
+    ]
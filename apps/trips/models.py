@@ -1,7 +1,10 @@
 from apps.utils.base import BaseModel
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
+from apps.logs.rules import RULE_SET_CHOICES
+
 
 class Trip(BaseModel):
     driver = models.ForeignKey(
@@ -47,6 +50,10 @@ class Trip(BaseModel):
         default="planned",
     )
     time_zone = models.CharField(max_length=50, default="UTC")
+    # Overrides the driver's rule set when set
+    hos_rule_set = models.CharField(
+        max_length=32, choices=RULE_SET_CHOICES, blank=True, default=""
+    )
 
     def __str__(self):
         return f"Trip {self.id} - {self.status}"
@@ -54,6 +61,16 @@ class Trip(BaseModel):
     class Meta:
         ordering = ["-created_at"]
         verbose_name_plural = "Trips"
+        # Newest-first pages, overall and per driver/vehicle (trips report)
+        indexes = [
+            models.Index(fields=["-created_at"], name="trip_created_at_desc"),
+            models.Index(
+                fields=["driver", "-created_at"], name="trip_driver_created_at"
+            ),
+            models.Index(
+                fields=["vehicle", "-created_at"], name="trip_vehicle_created_at"
+            ),
+        ]
 
 
 class RouteWaypoint(BaseModel):
@@ -74,10 +91,51 @@ class RouteWaypoint(BaseModel):
     duration_minutes = models.IntegerField()
     description = models.TextField(null=True, blank=True)
     is_mandatory = models.BooleanField(default=False)
+    sequence = models.PositiveIntegerField(default=0)  # position along the route
 
     def __str__(self):
         return f"{self.waypoint_type} at {self.location} for Trip {self.trip.id}"
 
     class Meta:
-        ordering = ["estimated_arrival"]
+        ordering = ["estimated_arrival", "sequence"]
         verbose_name_plural = "Route Waypoints"
+
+
+class RouteCalculationJob(BaseModel):
+    """
+    Queued route calculation for a trip, executed outside the request.
+    """
+
+    trip = models.ForeignKey(
+        "trips.Trip", on_delete=models.CASCADE, related_name="route_jobs"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            ("queued", "Queued"),
+            ("running", "Running"),
+            ("succeeded", "Succeeded"),
+            ("failed", "Failed"),
+        ],
+        default="queued",
+        db_index=True,
+    )
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # A running job whose lease ran out lost its worker and can be claimed again
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def __str__(self):
+        return f"Route job {self.id} ({self.status}) for Trip {self.trip_id}"
+
+    class Meta:
+        ordering = ["created_at"]
+        verbose_name_plural = "Route Calculation Jobs"
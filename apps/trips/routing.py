@@ -0,0 +1,327 @@
+# apps/trips/routing.py
+import csv
+import hashlib
+import heapq
+import math
+import os
+import threading
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+from apps.trips.geometry import haversine_miles
+
+INF = float("inf")
+GRID_CELL_DEGREES = 0.1
+MAX_SNAP_RINGS = 50  # ~5 degrees around the query point
+ONEWAY_VALUES = ("1", "true", "yes")
+
+Point = Tuple[float, float]
+
+
+class NoRouteError(ValueError):
+    """
+    Raised when the road graph cannot connect two points.
+    """
+
+
+class RoadGraph:
+    """
+    Directed road graph in compressed sparse row (CSR) form.
+
+    Node i sits at (lats[i], lons[i]); its outgoing edges are
+    offsets[i]..offsets[i + 1] in `targets`, `hours` (travel time) and
+    `miles` (length). All arrays are flat `array` buffers.
+    """
+
+    def __init__(self, lats, lons, offsets, targets, hours, miles):
+        self.lats = lats
+        self.lons = lons
+        self.offsets = offsets
+        self.targets = targets
+        self.hours = hours
+        self.miles = miles
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+        for node in range(len(lats)):
+            self._grid.setdefault(_cell(lats[node], lons[node]), []).append(node)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.lats)
+
+    @classmethod
+    def from_csv(cls, path: str, default_speed_mph: float) -> "RoadGraph":
+        """
+        Load an OSM-derived edge list with columns source, target, source_lat,
+        source_lon, target_lat, target_lon and optional length_miles,
+        speed_mph and oneway (1/true/yes). Edges are two-way unless oneway.
+        """
+        node_index: Dict[str, int] = {}
+        lats, lons = array("d"), array("d")
+        sources, targets = array("l"), array("l")
+        hours, miles = array("d"), array("d")
+
+        def node(node_id, lat, lon):
+            index = node_index.get(node_id)
+            if index is None:
+                index = node_index[node_id] = len(lats)
+                lats.append(float(lat))
+                lons.append(float(lon))
+            return index
+
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                u = node(row["source"], row["source_lat"], row["source_lon"])
+                v = node(row["target"], row["target_lat"], row["target_lon"])
+                length = float(row.get("length_miles") or 0) or haversine_miles(
+                    (lats[u], lons[u]), (lats[v], lons[v])
+                )
+                speed = float(row.get("speed_mph") or 0) or default_speed_mph
+                directions = [(u, v)]
+                if str(row.get("oneway", "")).strip().lower() not in ONEWAY_VALUES:
+                    directions.append((v, u))
+                for a, b in directions:
+                    sources.append(a)
+                    targets.append(b)
+                    hours.append(length / speed)
+                    miles.append(length)
+
+        return cls._build(lats, lons, sources, targets, hours, miles)
+
+    @classmethod
+    def _build(cls, lats, lons, sources, targets, hours, miles) -> "RoadGraph":
+        # Counting sort of the edge list by source node
+        n = len(lats)
+        offsets = array("l", [0]) * (n + 1)
+        for u in sources:
+            offsets[u + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+
+        cursor = array("l", offsets[:n])
+        csr_targets = array("l", [0]) * len(targets)
+        csr_hours = array("d", [0.0]) * len(targets)
+        csr_miles = array("d", [0.0]) * len(targets)
+        for e, u in enumerate(sources):
+            slot = cursor[u]
+            cursor[u] += 1
+            csr_targets[slot] = targets[e]
+            csr_hours[slot] = hours[e]
+            csr_miles[slot] = miles[e]
+        return cls(lats, lons, offsets, csr_targets, csr_hours, csr_miles)
+
+    def reversed(self) -> "RoadGraph":
+        sources = array("l")
+        for u in range(self.node_count):
+            sources.extend([u] * (self.offsets[u + 1] - self.offsets[u]))
+        return self._build(
+            self.lats, self.lons, self.targets, sources, self.hours, self.miles
+        )
+
+    def nearest_node(self, point: Point) -> int:
+        """
+        Closest node to a (lat, lon) point, searching grid rings outward.
+        """
+        row, col = _cell(point[0], point[1])
+        best, best_dist, found_ring = -1, INF, None
+        for ring in range(MAX_SNAP_RINGS + 1):
+            for cell in _ring_cells(row, col, ring):
+                for node in self._grid.get(cell, ()):
+                    dist = haversine_miles(point, (self.lats[node], self.lons[node]))
+                    if dist < best_dist:
+                        best, best_dist = node, dist
+            # One extra ring so a closer node just across a cell edge wins
+            if found_ring is not None:
+                break
+            if best >= 0:
+                found_ring = ring
+        if best < 0:
+            raise NoRouteError(f"No road near {point[0]:.5f}, {point[1]:.5f}")
+        return best
+
+    def travel_times_from(self, source: int) -> array:
+        """
+        Dijkstra over the whole graph: travel hours from source to every node.
+        """
+        dist = array("d", [INF]) * self.node_count
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        offsets, targets, hours = self.offsets, self.targets, self.hours
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for e in range(offsets[u], offsets[u + 1]):
+                v = targets[e]
+                nd = d + hours[e]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return dist
+
+
+class RoadNetworkEngine:
+    """
+    Shortest-time routing over a RoadGraph with ALT (A*, landmarks and the
+    triangle inequality). Landmark distance tables are computed once at load
+    time; each query then explores only a narrow corridor of the graph.
+    """
+
+    def __init__(self, path: str, landmarks: int, default_speed_mph: float):
+        stat = os.stat(path)
+        fingerprint = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        self.version = "road-" + hashlib.sha1(fingerprint.encode()).hexdigest()[:12]
+        self.default_speed_mph = default_speed_mph
+        self.graph = RoadGraph.from_csv(path, default_speed_mph)
+        self._from_landmark: List[array] = []
+        self._to_landmark: List[array] = []
+        self._select_landmarks(landmarks)
+
+    def _select_landmarks(self, count: int) -> None:
+        """
+        Farthest-point landmark selection: each new landmark is the node
+        farthest (in travel time) from the landmarks chosen so far.
+        """
+        if not self.graph.node_count:
+            return
+        reverse = self.graph.reversed()
+        # Distance to the closest landmark so far (-1 = unreachable or chosen);
+        # the first landmark is the node farthest from node 0
+        nearest = array(
+            "d", (d if d < INF else -1.0 for d in self.graph.travel_times_from(0))
+        )
+        for i in range(min(count, self.graph.node_count)):
+            landmark = max(range(len(nearest)), key=nearest.__getitem__)
+            from_landmark = self.graph.travel_times_from(landmark)
+            self._from_landmark.append(from_landmark)
+            self._to_landmark.append(reverse.travel_times_from(landmark))
+            for node, d in enumerate(from_landmark):
+                if i == 0 or d < nearest[node]:
+                    nearest[node] = d if d < INF else -1.0
+            nearest[landmark] = -1.0
+
+    def _lower_bound(self, target: int):
+        """
+        Admissible, consistent estimate of travel hours from any node to target.
+        """
+        tables = [
+            (from_l, from_l[target], to_l, to_l[target])
+            for from_l, to_l in zip(self._from_landmark, self._to_landmark)
+        ]
+
+        def estimate(node: int) -> float:
+            best = 0.0
+            for from_l, from_t, to_l, to_t in tables:
+                from_n, to_n = from_l[node], to_l[node]
+                if from_t < INF and from_n < INF and from_t - from_n > best:
+                    best = from_t - from_n
+                if to_n < INF and to_t < INF and to_n - to_t > best:
+                    best = to_n - to_t
+            return best
+
+        return estimate
+
+    def shortest_path(self, source: int, target: int) -> Tuple[List[int], float, float]:
+        """
+        Returns (nodes, hours, miles) for the fastest path source -> target.
+        """
+        graph = self.graph
+        offsets, targets, hours = graph.offsets, graph.targets, graph.hours
+        estimate = self._lower_bound(target)
+        best = {source: 0.0}
+        parent: Dict[int, Tuple[int, int]] = {}
+        closed = set()
+        heap = [(estimate(source), 0.0, source)]
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if u == target:
+                break
+            if u in closed:
+                continue
+            closed.add(u)
+            for e in range(offsets[u], offsets[u + 1]):
+                v = targets[e]
+                nd = d + hours[e]
+                if nd < best.get(v, INF):
+                    best[v] = nd
+                    parent[v] = (u, e)
+                    heapq.heappush(heap, (nd + estimate(v), nd, v))
+        else:
+            raise NoRouteError("No road route between the given points")
+
+        nodes, length = [target], 0.0
+        while nodes[-1] != source:
+            u, e = parent[nodes[-1]]
+            length += graph.miles[e]
+            nodes.append(u)
+        nodes.reverse()
+        return nodes, best[target], length
+
+    def route(self, coords: Sequence[Point]) -> Dict[str, object]:
+        """
+        Route through coords in order. Same shape as calculate_approx_route:
+        path ([lat, lon] lists), distance (miles), duration (hours), legs.
+        The hops between each point and its nearest road node are added at
+        the default speed.
+        """
+        graph = self.graph
+        snapped = [graph.nearest_node(p) for p in coords]
+        access = [
+            haversine_miles(p, (graph.lats[n], graph.lons[n]))
+            for p, n in zip(coords, snapped)
+        ]
+
+        path = [[float(coords[0][0]), float(coords[0][1])]]
+        legs, duration = [], 0.0
+        for i in range(len(coords) - 1):
+            nodes, hours, miles = self.shortest_path(snapped[i], snapped[i + 1])
+            access_miles = access[i] + access[i + 1]
+            legs.append(miles + access_miles)
+            duration += hours + access_miles / self.default_speed_mph
+            path.extend([graph.lats[n], graph.lons[n]] for n in nodes)
+            path.append([float(coords[i + 1][0]), float(coords[i + 1][1])])
+
+        return {
+            "path": path,
+            "distance": sum(legs),
+            "duration": duration,
+            "legs": legs,
+        }
+
+
+def _cell(lat: float, lon: float) -> Tuple[int, int]:
+    return math.floor(lat / GRID_CELL_DEGREES), math.floor(lon / GRID_CELL_DEGREES)
+
+
+def _ring_cells(row: int, col: int, ring: int):
+    if ring == 0:
+        yield row, col
+        return
+    for d in range(-ring, ring + 1):
+        yield row - ring, col + d
+        yield row + ring, col + d
+    for d in range(-ring + 1, ring):
+        yield row + d, col - ring
+        yield row + d, col + ring
+
+
+_engine_lock = threading.Lock()
+_engine: Optional[RoadNetworkEngine] = None
+
+
+def get_routing_engine() -> Optional[RoadNetworkEngine]:
+    """
+    The road network engine for settings.ROUTING_GRAPH_PATH, loaded and
+    preprocessed once per process; None when no graph is configured.
+    """
+    global _engine
+    if _engine is None and settings.ROUTING_GRAPH_PATH:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RoadNetworkEngine(
+                    settings.ROUTING_GRAPH_PATH,
+                    landmarks=settings.ROUTING_LANDMARKS,
+                    default_speed_mph=settings.ROUTING_DEFAULT_SPEED_MPH,
+                )
+    return _engine
@@ -1,73 +1,256 @@
 # apps/trips/services.py
-import math
-import requests
-from typing import List, Dict, Any, Tuple
+import heapq
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Iterable, List, Dict, Any, Optional, Tuple, Union
 
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from apps.locations.geocoders import get_geocoders
+from apps.logs.blocks import serialize_blocks
+from apps.logs.rules import HOSRuleSet, get_rule_set
+from apps.logs.services import (
+    generate_optimized_schedule,
+    calculate_hos_status,
+    rule_set_for,
+)
+from apps.locations.services import geocode_cache, normalize_address
+from apps.trips.geometry import (
+    encode_polyline,
+    haversine_miles,
+    interpolate_path,
+    interpolate_point,
+    segment_distances,
+    simplify_path,
+    tolerance_for_zoom,
+)
+from apps.trips.models import RouteWaypoint, Trip
+from apps.trips.routing import NoRouteError, get_routing_engine
 
 # Keep constants easy to tune
 AVG_SPEED_MPH = 55.0
 FUEL_INTERVAL_MILES = 400  # frontend uses 400 as example
-MAX_DRIVE_BEFORE_BREAK_HOURS = 8.0
+PICKUP_SERVICE_HOURS = 1.0
+DROPOFF_SERVICE_HOURS = 1.0
+FUEL_STOP_HOURS = 0.25
+STRAIGHT_LINE_VERSION = "straight-line-1"  # bump when the approximation changes
+
+
+# Bounded pool for concurrent lookups against remote geocoders
+_geocode_executor = ThreadPoolExecutor(
+    max_workers=settings.GEOCODE_MAX_WORKERS, thread_name_prefix="geocode"
+)
+
+
+def _geocode_local(address: str, countrycodes: str) -> Optional[Tuple[float, float]]:
+    for geocoder in get_geocoders():
+        if not geocoder.remote:
+            coords = geocoder.geocode(address, countrycodes)
+            if coords is not None:
+                return coords
+    return None
+
+
+def _geocode_remote(address: str, countrycodes: str) -> Optional[Tuple[float, float]]:
+    for geocoder in get_geocoders():
+        if geocoder.remote:
+            coords = geocoder.geocode(address, countrycodes)
+            if coords is not None:
+                return coords
+    return None
 
 
-# Simple wrapper for geocoding using Nominatim (OpenStreetMap)
 def geocode_address(address: str, countrycodes: str = "us") -> Tuple[float, float]:
     """
     Returns (lat, lon) or raises ValueError on failure.
     """
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {"format": "json", "q": address, "limit": 1, "countrycodes": countrycodes}
-    try:
-        resp = requests.get(
-            url, params=params, timeout=6, headers={"User-Agent": "hos-app/1.0"}
+    return geocode_many([address], countrycodes)[address]
+
+
+def geocode_many(
+    addresses: Iterable[str],
+    countrycodes: str = "us",
+    deadline: Optional[float] = None,
+    failures: Optional[Dict[str, Exception]] = None,
+) -> Dict[str, Tuple[float, float]]:
+    """
+    Geocode several addresses at once, returning {address: (lat, lon)}.
+
+    Local geocoder backends answer first; remote backends sit behind the
+    geocode cache (which also remembers "no result" answers) and the remaining
+    lookups run concurrently, so the wall time is bounded by the slowest single
+    request. Raises ValueError when an address has no result and TimeoutError
+    when the lookups outlive `deadline` seconds.
+    Network errors are not cached and bubble to the caller.
+
+    When a `failures` dict is passed nothing is raised: each address that
+    could not be geocoded is left out of the result and its error recorded
+    in `failures` instead.
+    """
+    if deadline is None:
+        deadline = settings.GEOCODE_DEADLINE
+
+    results: Dict[str, Optional[Tuple[float, float]]] = {}
+    keys: Dict[str, str] = {}
+    pending: Dict[str, str] = {}  # cache key -> address sent upstream
+    for address in addresses:
+        if address in keys:
+            continue
+        key = keys[address] = normalize_address(address, countrycodes)
+        if key in pending or key in results:
+            continue
+        coords = _geocode_local(address, countrycodes)
+        if coords is not None:
+            results[key] = coords
+            continue
+        found, coords = geocode_cache.lookup(key)
+        if found:
+            results[key] = coords
+        else:
+            pending[key] = address
+
+    futures = {
+        _geocode_executor.submit(_geocode_remote, address, countrycodes): key
+        for key, address in pending.items()
+    }
+    done, not_done = wait(futures, timeout=deadline)
+    for future in not_done:
+        future.cancel()
+
+    errors: Dict[str, Exception] = {}
+    for future in done:
+        key = futures[future]
+        try:
+            results[key] = future.result()
+        except Exception as exc:
+            errors[key] = exc
+            continue
+        # Cache writes stay on the calling thread (and its DB connection)
+        geocode_cache.store(key, pending[key], results[key])
+    for future in not_done:
+        errors[futures[future]] = TimeoutError(
+            f"Geocoding did not finish within {deadline}s"
         )
-        resp.raise_for_status()
-        data = resp.json()
-        if not data:
-            raise ValueError("No geocode result")
-        return float(data[0]["lat"]), float(data[0]["lon"])
-    except Exception:
-        # Bubble error to caller — caller may fallback to simple parsing
-        raise
 
+    if errors and failures is None:
+        # Network errors first, then timeouts, then missing results
+        raise min(errors.values(), key=lambda exc: isinstance(exc, TimeoutError))
 
-def haversine_miles(a: Tuple[float, float], b: Tuple[float, float]) -> float:
-    # a = (lat, lon)
-    R = 3959.0  # miles
-    lat1, lon1 = math.radians(a[0]), math.radians(a[1])
-    lat2, lon2 = math.radians(b[0]), math.radians(b[1])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    hav = (
-        math.sin(dlat / 2) ** 2
-        + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
-    )
-    c = 2 * math.atan2(math.sqrt(hav), math.sqrt(1 - hav))
-    return R * c
+    geocoded = {}
+    for address, key in keys.items():
+        if key in errors:
+            failures[address] = errors[key]
+        elif results[key] is None:
+            error = ValueError(f"No geocode result for {address}")
+            if failures is None:
+                raise error
+            failures[address] = error
+        else:
+            geocoded[address] = results[key]
+    return geocoded
 
 
-def calculate_approx_route(coords: List[Tuple[float, float]]) -> Dict[str, Any]:
+def calculate_approx_route(
+    coords: List[Tuple[float, float]], great_circle: bool = False
+) -> Dict[str, Any]:
     """
     Simple approximated route: straight-line segments, returns
-    path (list of points), distance (miles), duration (hours).
+    path (list of [lat, lon]), distance (miles), duration (hours) and
+    legs (miles per segment).
     This is a fallback if you don't use a routing engine.
     """
-    path = []
-    total_distance = 0.0
-    total_duration_hours = 0.0
-    for i in range(len(coords) - 1):
-        s = coords[i]
-        e = coords[i + 1]
-        total_distance += haversine_miles(s, e)
-        duration = haversine_miles(s, e) / AVG_SPEED_MPH
-        total_duration_hours += duration
-        # simple interpolation for visualization (n points)
-        steps = max(2, int(max(1, math.floor(haversine_miles(s, e) / 50))))
-        for step in range(steps + 1):
-            ratio = step / steps
-            path.append((s[0] + (e[0] - s[0]) * ratio, s[1] + (e[1] - s[1]) * ratio))
-    return {"path": path, "distance": total_distance, "duration": total_duration_hours}
+    legs = segment_distances(coords)
+    total_distance = sum(legs)
+    path = interpolate_path(coords, legs, great_circle=great_circle)
+    return {
+        "path": path,
+        "distance": total_distance,
+        "duration": total_distance / AVG_SPEED_MPH,
+        "legs": legs,
+    }
+
+
+def route_cache_key(
+    coords: List[Tuple[float, float]], engine_version: str, great_circle: bool
+) -> str:
+    """
+    Cache key for a route: engine version plus coordinates rounded to
+    settings.ROUTE_CACHE_PRECISION decimals (4 decimals is ~11 m).
+    """
+    precision = settings.ROUTE_CACHE_PRECISION
+    points = ";".join(f"{lat:.{precision}f},{lon:.{precision}f}" for lat, lon in coords)
+    return f"route:{engine_version}:{'gc' if great_circle else 'ln'}:{points}"
+
+
+def plan_route(
+    coords: List[Tuple[float, float]], great_circle: bool = False
+) -> Dict[str, Any]:
+    """
+    Route through coords with the road network engine when a graph is
+    configured, falling back to calculate_approx_route when it is not or
+    when the graph cannot connect the points. Same return shape either way.
+    Results are memoized in the Django cache so every worker shares them.
+    """
+    engine = get_routing_engine()
+    version = engine.version if engine is not None else STRAIGHT_LINE_VERSION
+    key = route_cache_key(coords, version, great_circle)
+    route = cache.get(key)
+    if route is not None:
+        return route
+
+    route = None
+    if engine is not None:
+        try:
+            route = engine.route(coords)
+        except NoRouteError:
+            pass
+    if route is None:
+        route = calculate_approx_route(coords, great_circle=great_circle)
+    cache.set(key, route, settings.ROUTE_CACHE_TIMEOUT)
+    return route
+
+
+# Stop kinds in tie-break order: arrivals first, and longer resets before
+# the shorter stops they make unnecessary
+_EVENT_PRIORITY = {
+    "pickup": 0,
+    "dropoff": 1,
+    "cycle_limit": 2,
+    "drive_limit": 3,
+    "on_duty_window": 4,
+    "rest_break": 5,
+    "fuel_stop": 6,
+}
+WAYPOINT_TYPES = {
+    "pickup": "pickup",
+    "dropoff": "dropoff",
+    "cycle_limit": "mandatory_break",
+    "drive_limit": "mandatory_break",
+    "on_duty_window": "mandatory_break",
+    "rest_break": "rest_break",
+    "fuel_stop": "fuel_stop",
+}
+WAYPOINT_ADDRESSES = {
+    "pickup": "Pickup location",
+    "dropoff": "Drop-off location",
+    "cycle_limit": "Required 34-hour restart",
+    "drive_limit": "Required 10-hour off-duty period",
+    "on_duty_window": "Required 10-hour off-duty period",
+    "rest_break": "Required rest break",
+    "fuel_stop": "Fuel stop",
+}
+# Stops the HOS rules require; "rest" is the name older clients still send
+MANDATORY_WAYPOINT_TYPES = frozenset({"rest", "rest_break", "mandatory_break"})
+WAYPOINT_REASONS = {
+    "cycle_limit": "HOS cycle limit reached",
+    "drive_limit": "HOS 11-hour driving limit",
+    "on_duty_window": "HOS 14-hour on-duty window",
+    "rest_break": "HOS 8-hour driving limit",
+    "fuel_stop": "Recommended fuel stop",
+}
 
 
 def generate_hos_waypoints(
@@ -75,151 +258,172 @@ def generate_hos_waypoints(
     pickup: Tuple[float, float],
     dropoff: Tuple[float, float],
     hos_status: Dict[str, Any],
-    route_distance: float,
+    legs: Optional[List[float]] = None,
+    rules: Optional[HOSRuleSet] = None,
+    avg_speed_mph: float = AVG_SPEED_MPH,
+    fuel_interval_miles: float = FUEL_INTERVAL_MILES,
+    start_time: Optional[datetime] = None,
 ) -> List[Dict[str, Any]]:
     """
-    Port of the frontend generateHOSWaypoints logic to Python.
-    Returns list of waypoints with lat/lon, type, eta_str, reason if any.
+    Event-driven HOS planner for origin -> pickup -> dropoff.
+    Returns list of waypoints with lat/lon, type, eta, duration and reason.
+
+    Every constraint (fuel interval, 30-minute break, 11-hour driving limit,
+    14-hour window, 10-hour reset, cycle limit with 34-hour restart) is
+    turned into "driving seconds until it triggers"; the nearest one is
+    taken from a priority queue, the clock jumps straight to it and its stop
+    is emitted. Work is O(number of stops) and all time arithmetic is in
+    whole seconds, so there is no float drift.
+
+    `legs` are the origin->pickup and pickup->dropoff distances of an already
+    computed route (straight-line distances when omitted). `rules` is the
+    HOSRuleSet to plan under (the default one when omitted); rule sets
+    without a break requirement get no rest-break stops. hos_status seeds
+    the driver's current drivingHoursUsed / onDutyHoursUsed /
+    cycleHoursUsed / hoursUntilBreak.
     """
-    waypoints = []
+    rules = rules or get_rule_set()
+    if start_time is None:
+        # For demo use naive UTC datetime at 06:00
+        start_time = datetime.utcnow().replace(
+            hour=6, minute=0, second=0, microsecond=0
+        )
 
-    # start time: allow the caller to send a starting timestamp in hos_status if needed.
-    # For demo use local naive datetime at 06:00
-    from datetime import datetime, timedelta
+    def seconds(hours: float) -> int:
+        return int(round(hours * 3600))
 
-    current_time = datetime.utcnow().replace(hour=6, minute=0, second=0, microsecond=0)
+    if not legs:
+        legs = [haversine_miles(origin, pickup), haversine_miles(pickup, dropoff)]
+    pickup_at = seconds(legs[0] / avg_speed_mph)  # driving seconds along the route
+    dropoff_at = pickup_at + seconds(legs[1] / avg_speed_mph)
+
+    max_drive = rules.max_driving
+    max_window = rules.window
+    max_cycle = rules.max_cycle
+    break_after = rules.break_after
+    fuel_every = max(1, seconds(fuel_interval_miles / avg_speed_mph))
+    stop_seconds = {
+        "pickup": seconds(PICKUP_SERVICE_HOURS),
+        "dropoff": seconds(DROPOFF_SERVICE_HOURS),
+        "fuel_stop": seconds(FUEL_STOP_HOURS),
+        "rest_break": rules.break_length,
+        "drive_limit": rules.reset_length,
+        "on_duty_window": rules.reset_length,
+        "cycle_limit": rules.restart_length,
+    }
 
-    # origin
-    waypoints.append(
+    # Driver state, all in seconds
+    driven = 0  # along this route
+    clock = 0  # since start_time
+    since_fuel = 0
+    shift_drive = seconds(hos_status.get("drivingHoursUsed", 0.0))
+    shift_elapsed = shift_drive + seconds(hos_status.get("onDutyHoursUsed", 0.0))
+    cycle = seconds(hos_status.get("cycleHoursUsed", 0.0))
+    if break_after is None:
+        since_break = 0
+    elif hos_status.get("hoursUntilBreak") is not None:
+        since_break = max(0, break_after - seconds(hos_status["hoursUntilBreak"]))
+    else:
+        since_break = shift_drive
+
+    def position() -> Tuple[float, float]:
+        if driven < pickup_at:
+            return interpolate_point(origin, pickup, driven / pickup_at)
+        if dropoff_at == pickup_at:
+            return dropoff
+        return interpolate_point(
+            pickup, dropoff, (driven - pickup_at) / (dropoff_at - pickup_at)
+        )
+
+    waypoints = [
         {
             "coordinates": origin,
             "type": "origin",
             "address": "Starting location",
-            "eta": current_time,
+            "eta": start_time,
+            "duration_minutes": 0,
             "complianceStatus": "safe",
         }
-    )
+    ]
+    picked_up = False
 
-    # pickup leg
-    dist_to_pickup = haversine_miles(origin, pickup)
-    time_to_pickup_hours = dist_to_pickup / AVG_SPEED_MPH
-    current_time += timedelta(hours=time_to_pickup_hours)
-    waypoints.append(
-        {
-            "coordinates": pickup,
-            "type": "pickup",
-            "address": "Pickup location",
-            "eta": current_time,
-            "serviceWindow": "1 hour",
-            "complianceStatus": "safe",
-        }
-    )
-    # add 1 hour service
-    current_time += timedelta(hours=1.0)
-
-    # iterate between pickup and dropoff placing fuel and rest stops
-    remaining_distance = haversine_miles(pickup, dropoff)
-    distance_covered = 0.0
-    driving_time_since_break = hos_status.get("drivingHoursUsed", 0.0)
-    next_fuel_at = FUEL_INTERVAL_MILES
-
-    def interp_point(ratio):
-        return (
-            pickup[0] + (dropoff[0] - pickup[0]) * ratio,
-            pickup[1] + (dropoff[1] - pickup[1]) * ratio,
-        )
+    while True:
+        upcoming = [
+            (dropoff_at - driven, "dropoff"),
+            (max_cycle - cycle, "cycle_limit"),
+            (max_drive - shift_drive, "drive_limit"),
+            (max_window - shift_elapsed, "on_duty_window"),
+            (fuel_every - since_fuel, "fuel_stop"),
+        ]
+        if break_after is not None:
+            upcoming.append((break_after - since_break, "rest_break"))
+        if not picked_up:
+            upcoming.append((pickup_at - driven, "pickup"))
+        heap = [
+            (max(0, remaining), _EVENT_PRIORITY[kind], kind)
+            for remaining, kind in upcoming
+        ]
+        heapq.heapify(heap)
+        drive, _, kind = heapq.heappop(heap)
 
-    while distance_covered < remaining_distance - 1e-6:
-        remaining = remaining_distance - distance_covered
-        hours_until_break = max(
-            0.0, MAX_DRIVE_BEFORE_BREAK_HOURS - driving_time_since_break
-        )
-        miles_until_break = hours_until_break * AVG_SPEED_MPH
-        next_chunk = min(
-            remaining, miles_until_break if miles_until_break > 0 else remaining
-        )
-        # fuel consideration
-        if (
-            next_fuel_at - distance_covered > 0
-            and next_fuel_at - distance_covered < next_chunk
-        ):
-            next_chunk = next_fuel_at - distance_covered
-        if next_chunk <= 1e-6:
-            break
-        distance_covered += next_chunk
-        ratio = min(1.0, distance_covered / remaining_distance)
-        new_pos = interp_point(ratio)
+        # Drive straight to the next event
+        driven += drive
+        clock += drive
+        since_fuel += drive
+        since_break += drive
+        shift_drive += drive
+        shift_elapsed += drive
+        cycle += drive
 
-        current_time += timedelta(hours=(next_chunk / AVG_SPEED_MPH))
-        driving_time_since_break += next_chunk / AVG_SPEED_MPH
-
-        # fuel stop
-        if (
-            abs(distance_covered - next_fuel_at) < 1e-3
-            or distance_covered > next_fuel_at - 1e-3
-        ):
-            waypoints.append(
-                {
-                    "coordinates": new_pos,
-                    "type": "fuel_stop",
-                    "address": "Fuel stop",
-                    "eta": current_time,
-                    "reason": "Recommended fuel stop",
-                    "complianceStatus": "safe",
-                }
-            )
-            current_time += timedelta(minutes=15)
-            next_fuel_at += FUEL_INTERVAL_MILES
-
-        # rest break
-        if (
-            driving_time_since_break >= MAX_DRIVE_BEFORE_BREAK_HOURS
-            or hos_status.get("drivingHoursUsed", 0) + driving_time_since_break
-            >= MAX_DRIVE_BEFORE_BREAK_HOURS
-        ):
-            waypoints.append(
-                {
-                    "coordinates": new_pos,
-                    "type": "rest_break",
-                    "address": "Required rest break",
-                    "eta": current_time,
-                    "reason": "HOS 8-hour driving limit",
-                    "complianceStatus": "safe",
-                }
-            )
-            current_time += timedelta(minutes=30)
-            driving_time_since_break = 0.0
-
-    # final dropoff
-    last_leg_distance = haversine_miles(
-        (
-            interp_point(min(1.0, distance_covered / remaining_distance))
-            if remaining_distance > 0
-            else pickup
-        ),
-        dropoff,
-    )
-    if last_leg_distance > 0.001:
-        current_time += timedelta(hours=(last_leg_distance / AVG_SPEED_MPH))
-
-    waypoints.append(
-        {
-            "coordinates": dropoff,
-            "type": "dropoff",
-            "address": "Drop-off location",
-            "eta": current_time,
-            "serviceWindow": "1 hour",
-            "complianceStatus": (
-                "safe" if hos_status.get("canContinueDriving", True) else "violation"
-            ),
+        duration = stop_seconds[kind]
+        waypoint = {
+            "coordinates": position(),
+            "type": WAYPOINT_TYPES[kind],
+            "address": WAYPOINT_ADDRESSES[kind],
+            "eta": start_time + timedelta(seconds=clock),
+            "duration_minutes": duration // 60,
+            "complianceStatus": "safe",
         }
-    )
+        if kind in WAYPOINT_REASONS:
+            waypoint["reason"] = WAYPOINT_REASONS[kind]
+        clock += duration
+
+        if kind == "pickup" or kind == "dropoff":
+            picked_up = True
+            waypoint["coordinates"] = pickup if kind == "pickup" else dropoff
+            waypoint["serviceWindow"] = f"{duration // 3600} hour"
+            if kind == "dropoff":
+                waypoint["complianceStatus"] = (
+                    "safe"
+                    if hos_status.get("canContinueDriving", True)
+                    else "violation"
+                )
+                waypoints.append(waypoint)
+                break
+            # On-duty, not driving: counts toward the window and cycle and
+            # satisfies the 30-minute break
+            shift_elapsed += duration
+            cycle += duration
+            if duration >= stop_seconds["rest_break"]:
+                since_break = 0
+        elif kind == "fuel_stop":
+            shift_elapsed += duration
+            cycle += duration
+            since_fuel = 0
+        elif kind == "rest_break":
+            shift_elapsed += duration
+            since_break = 0
+        else:
+            # 10-hour reset, or 34-hour restart which also resets the cycle
+            shift_drive = shift_elapsed = since_break = 0
+            if kind == "cycle_limit":
+                cycle = 0
+        waypoints.append(waypoint)
 
     return waypoints
 
 
-from typing import List, Dict, Any, Tuple, Union
-from datetime import datetime
+ROUTE_GEOMETRY_FORMATS = ("coordinates", "polyline")
 
 
 def build_route_response(
@@ -227,47 +431,305 @@ def build_route_response(
     path: List[Tuple[float, float]],
     distance: float,
     duration: float,
+    geometry: str = "coordinates",
+    zoom: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
     Build RouteCalculationResponse-style dict.
 
+    geometry="polyline" returns the path as a Google encoded polyline and
+    drops the duplicated waypoint `coordinates`. When a map zoom level is
+    given the path is simplified with a tolerance invisible at that zoom.
+
     Returns:
         Dict[str, Any]: A response dictionary containing route,
                         HOS schedule, and compliance warnings.
     """
-    route_coords: List[List[float]] = [[p[0], p[1]] for p in path]
+    if zoom is not None:
+        path = simplify_path(path, tolerance_for_zoom(zoom))
+    polyline = geometry == "polyline"
+
     route_waypoints: List[Dict[str, Union[str, int, float, Dict[str, float]]]] = []
 
     for i, wp in enumerate(waypoints):
         eta: Union[datetime, str, None] = wp.get("eta")
         eta_str: str = eta.isoformat() if isinstance(eta, datetime) else str(eta)
+        lat, lon = float(wp["coordinates"][0]), float(wp["coordinates"][1])
 
-        route_waypoints.append(
-            {
-                "id": str(i + 1),
-                "type": wp.get("type", ""),
-                "location": {
-                    "lat": float(wp["coordinates"][0]),
-                    "lon": float(wp["coordinates"][1]),
-                },
-                "coordinates": [
-                    float(wp["coordinates"][0]),
-                    float(wp["coordinates"][1]),
-                ],
-                "estimated_arrival": eta_str,
-                "duration_minutes": int(wp.get("duration_minutes", 0)),
-                "description": str(wp.get("reason") or wp.get("address", "")),
-                "is_mandatory": wp.get("type") in ("rest_break", "mandatory_break"),
-            }
-        )
+        route_waypoint = {
+            "id": str(i + 1),
+            "type": wp.get("type", ""),
+            "location": {"lat": lat, "lon": lon},
+            "estimated_arrival": eta_str,
+            "duration_minutes": int(wp.get("duration_minutes", 0)),
+            "description": str(wp.get("reason") or wp.get("address", "")),
+            "is_mandatory": wp.get("type") in MANDATORY_WAYPOINT_TYPES,
+        }
+        if not polyline:
+            route_waypoint["coordinates"] = [lat, lon]
+        route_waypoints.append(route_waypoint)
+
+    route = {
+        "distance": distance,
+        "duration": duration,
+        "waypoints": route_waypoints,
+    }
+    if polyline:
+        route["polyline"] = encode_polyline(path)
+    else:
+        route["coordinates"] = [[p[0], p[1]] for p in path]
 
     return {
-        "route": {
-            "coordinates": route_coords,
-            "distance": distance,
-            "duration": duration,
-            "waypoints": route_waypoints,
-        },
+        "route": route,
         "hos_schedule": [],  # can be added later
         "compliance_warnings": [],  # can be added later
     }
+
+
+WAYPOINT_FIELDS = (
+    "waypoint_type",
+    "estimated_arrival",
+    "duration_minutes",
+    "description",
+    "is_mandatory",
+)
+
+
+def _parse_eta(eta_value: Union[datetime, str, None]) -> Optional[datetime]:
+    if not eta_value:
+        return None
+    try:
+        eta = (
+            eta_value
+            if isinstance(eta_value, datetime)
+            else datetime.strptime(eta_value, "%H:%M")
+        )
+    except Exception:
+        return None
+    if timezone.is_naive(eta):
+        eta = timezone.make_aware(eta, dt_timezone.utc)
+    return eta
+
+
+def persist_route_waypoints(
+    trip: Trip, waypoints: List[Dict[str, Any]], diff: bool = False
+) -> int:
+    """
+    Save generated waypoints as RouteWaypoint rows numbered by `sequence`.
+
+    By default the trip's waypoints are replaced with a single bulk INSERT.
+    With diff=True the existing rows are matched by sequence and only new,
+    changed or dropped waypoints are written. Returns the number of rows
+    inserted, updated or deleted.
+    """
+    rows = [
+        RouteWaypoint(
+            trip=trip,
+            sequence=sequence,
+            waypoint_type=wp.get("type"),
+            estimated_arrival=_parse_eta(wp.get("eta")),
+            duration_minutes=wp.get("duration_minutes", 0),
+            description=wp.get("reason") or wp.get("address") or "",
+            is_mandatory=wp.get("type") in MANDATORY_WAYPOINT_TYPES,
+        )
+        for sequence, wp in enumerate(waypoints)
+    ]
+
+    with transaction.atomic():
+        if not diff:
+            deleted, _ = RouteWaypoint.objects.filter(trip=trip).delete()
+            RouteWaypoint.objects.bulk_create(rows)
+            return deleted + len(rows)
+
+        existing, stale = {}, []
+        for current in RouteWaypoint.objects.filter(trip=trip).order_by("sequence"):
+            if current.sequence in existing:
+                stale.append(current.id)
+            else:
+                existing[current.sequence] = current
+
+        to_create, to_update = [], []
+        now = timezone.now()
+        for row in rows:
+            current = existing.pop(row.sequence, None)
+            if current is None:
+                to_create.append(row)
+            elif any(getattr(current, f) != getattr(row, f) for f in WAYPOINT_FIELDS):
+                for field in WAYPOINT_FIELDS:
+                    setattr(current, field, getattr(row, field))
+                current.updated_at = now
+                to_update.append(current)
+        stale.extend(current.id for current in existing.values())
+
+        if stale:
+            RouteWaypoint.objects.filter(id__in=stale).delete()
+        if to_create:
+            RouteWaypoint.objects.bulk_create(to_create)
+        if to_update:
+            RouteWaypoint.objects.bulk_update(
+                to_update, WAYPOINT_FIELDS + ("updated_at",)
+            )
+    return len(stale) + len(to_create) + len(to_update)
+
+
+class GeocodingUnavailable(Exception):
+    """
+    Geocoding failed for a reason other than bad input (network, timeout).
+    """
+
+
+TRIP_LOCATION_KEYS = (
+    ("current_location", "current_location_address"),
+    ("pickup_location", "pickup_address"),
+    ("dropoff_location", "dropoff_address"),
+)
+
+
+def collect_trip_locations(
+    trip: Trip, body: Dict[str, Any]
+) -> Tuple[Dict[str, Tuple[float, float]], Dict[str, str]]:
+    """
+    Split a trip's locations into ({loc_key: (lat, lon)}, {loc_key: address}):
+    explicit lat/lon in the body and the trip's own locations are resolved
+    right away, addresses still need geocoding.
+    Raises ValueError when a location is missing altogether.
+    """
+    resolved = {}
+    addresses = {}
+    for loc_key, addr_key in TRIP_LOCATION_KEYS:
+        loc = body.get(loc_key)
+        if (
+            loc
+            and isinstance(loc, dict)
+            and "lat" in loc
+            and ("lon" in loc or "lng" in loc)
+        ):
+            resolved[loc_key] = (
+                float(loc["lat"]),
+                float(loc.get("lon") or loc.get("lng")),
+            )
+            continue
+        addr = body.get(addr_key)
+        if addr:
+            addresses[loc_key] = addr
+            continue
+        obj_loc = getattr(trip, loc_key, None)
+        if obj_loc and hasattr(obj_loc, "lat"):
+            resolved[loc_key] = (obj_loc.lat, obj_loc.lon)
+            continue
+        raise ValueError(f"No location for {loc_key}")
+    return resolved, addresses
+
+
+def resolve_trip_locations(
+    trip: Trip, body: Dict[str, Any]
+) -> Tuple[Tuple[float, float], ...]:
+    """
+    (origin, pickup, dropoff) from explicit lat/lon in the body, addresses
+    (geocoded together in one batch) or the trip's own locations.
+    Raises ValueError for missing/unknown locations and GeocodingUnavailable
+    when the geocoder itself fails.
+    """
+    resolved, addresses = collect_trip_locations(trip, body)
+
+    # Geocode every address in one concurrent batch
+    try:
+        geocoded = geocode_many(addresses.values())
+    except ValueError:
+        raise
+    except Exception as exc:
+        raise GeocodingUnavailable(
+            "Geocoding failed or external service unavailable"
+        ) from exc
+    for loc_key, addr in addresses.items():
+        resolved[loc_key] = geocoded[addr]
+
+    return tuple(resolved[key] for key, _ in TRIP_LOCATION_KEYS)
+
+
+def plan_trip_route(
+    origin: Tuple[float, float],
+    pickup: Tuple[float, float],
+    dropoff: Tuple[float, float],
+    body: Dict[str, Any],
+    geometry: str = "coordinates",
+    zoom: Optional[int] = None,
+    rules: Optional[HOSRuleSet] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Route, HOS waypoints, duty schedule and status for resolved locations,
+    under `rules` (the default rule set when omitted).
+    Returns (waypoints, response). Touches no database, so it can run in a
+    worker process; persisting the waypoints is left to the caller.
+    """
+    route = plan_route(
+        [origin, pickup, dropoff], great_circle=bool(body.get("great_circle"))
+    )
+    hos_status_input = body.get(
+        "hos_status", {"drivingHoursUsed": 0.0, "canContinueDriving": True}
+    )
+
+    waypoints = generate_hos_waypoints(
+        origin,
+        pickup,
+        dropoff,
+        hos_status_input,
+        legs=route.get("legs"),
+        rules=rules,
+    )
+
+    # Duty schedule + HOS violations, starting from the driver's current state
+    total_driving_hours = route["duration"]
+    cycle_hours = float(hos_status_input.get("cycleHoursUsed") or 0.0)
+    hos_schedule = generate_optimized_schedule(
+        "06:00",
+        total_driving_hours,
+        cycle_hours,
+        rules=rules,
+        hos_state=hos_status_input,
+        sleeper_split=bool(body.get("sleeper_split")),
+    )
+    hos_status = calculate_hos_status(
+        hos_schedule, cycle_hours, rules, hos_state=hos_status_input
+    )
+
+    response = {
+        "route": build_route_response(
+            waypoints,
+            route["path"],
+            route["distance"],
+            route["duration"],
+            geometry=geometry,
+            zoom=zoom,
+        ),
+        "hosSchedule": serialize_blocks(hos_schedule),
+        "hosStatus": hos_status,
+    }
+    return waypoints, response
+
+
+def calculate_trip_route(
+    trip: Trip,
+    body: Dict[str, Any],
+    geometry: str = "coordinates",
+    zoom: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Full route calculation for a trip: resolve locations, route, place HOS
+    waypoints, build the duty schedule and status, persist the waypoints and
+    return the frontend response. Raises like resolve_trip_locations.
+    """
+    origin, pickup, dropoff = resolve_trip_locations(trip, body)
+    waypoints, response = plan_trip_route(
+        origin,
+        pickup,
+        dropoff,
+        body,
+        geometry=geometry,
+        zoom=zoom,
+        rules=rule_set_for(trip.driver, trip),
+    )
+
+    # Persist waypoints, writing only what changed since the last calculation
+    persist_route_waypoints(trip, waypoints, diff=True)
+    return response
@@ -1,3 +1,184 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.drivers.models import Driver
+from apps.logs.blocks import DutyBlock
+from apps.locations.models import Location
+from apps.trips.batch import _get_pool, plan_trip_batch
+from apps.trips.jobs import run_pending_route_jobs
+from apps.trips.services import (
+    build_route_response,
+    generate_hos_waypoints,
+    plan_trip_route,
+)
+from apps.trips.models import RouteCalculationJob, RouteWaypoint, Trip
+from apps.users.models import User
+from apps.utils.testing import QueryBudgetTestMixin
+from apps.vehicles.models import Vehicle
+
+ROUTE_BODY = {
+    "current_location": {"lat": 32.78, "lon": -96.8},
+    "pickup_location": {"lat": 30.27, "lon": -97.74},
+    "dropoff_location": {"lat": 40.71, "lon": -74.0},
+}
+
+
+class TripTestMixin:
+    def create_driver(self, email="driver@example.com") -> Driver:
+        user = User.objects.create_user(email=email)
+        return Driver.objects.create(
+            user=user, license_number=email, home_terminal_time_zone="UTC"
+        )
+
+    def create_trips(self, count: int):
+        # Every trip with its own related rows, so a query per row shows up
+        trips = []
+        for number in range(count):
+            driver = self.create_driver(f"driver{number}@example.com")
+            location = Location.objects.create(
+                latitude=32.78, longitude=-96.8, address=f"Stop {number}"
+            )
+            vehicle = Vehicle.objects.create(
+                vehicle_number=f"V-{number}", make_model="Freightliner Cascadia"
+            )
+            trips.append(
+                Trip.objects.create(
+                    driver=driver,
+                    vehicle=vehicle,
+                    current_location=location,
+                    pickup_location=location,
+                    dropoff_location=location,
+                )
+            )
+        return trips
+
+
+class PlanTripBatchTests(TripTestMixin, TestCase):
+    def test_runs_inline_by_default(self):
+        self.assertIsNone(_get_pool())
+
+    def test_trips_are_saved_before_they_are_reported(self):
+        driver = self.create_driver()
+        trips = [Trip.objects.create(driver=driver) for _ in range(2)]
+        lines = plan_trip_batch([dict(ROUTE_BODY, trip_id=str(t.id)) for t in trips])
+
+        first = next(lines)
+        # The client goes away after the first line
+        lines.close()
+
+        self.assertEqual(first["status"], "succeeded")
+        self.assertTrue(RouteWaypoint.objects.filter(trip_id=first["trip_id"]).exists())
+
+    def test_summary_counts_saved_trips(self):
+        driver = self.create_driver()
+        trip = Trip.objects.create(driver=driver)
+        items = [dict(ROUTE_BODY, trip_id=str(trip.id)), {"trip_id": "missing"}]
+
+        *_, summary = plan_trip_batch(items)
+
+        self.assertEqual(summary["summary"], {"total": 2, "succeeded": 1, "failed": 1})
+
+
+class RouteJobLeaseTests(TripTestMixin, TestCase):
+    def create_running_job(self, lease_left: timedelta, attempts: int):
+        # A job a runner claimed and then stopped heartbeating on
+        return RouteCalculationJob.objects.create(
+            trip=Trip.objects.create(driver=self.create_driver()),
+            payload={"body": ROUTE_BODY},
+            status="running",
+            lease_expires_at=timezone.now() + lease_left,
+            attempts=attempts,
+        )
+
+    def test_expired_lease_is_run_again(self):
+        job = self.create_running_job(timedelta(seconds=-1), attempts=1)
+
+        self.assertEqual(run_pending_route_jobs(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "succeeded")
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNone(job.lease_expires_at)
+
+    def test_held_lease_is_left_alone(self):
+        job = self.create_running_job(timedelta(minutes=5), attempts=1)
+
+        self.assertEqual(run_pending_route_jobs(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "running")
+
+    def test_job_fails_after_its_last_attempt(self):
+        job = self.create_running_job(timedelta(seconds=-1), attempts=3)
+
+        self.assertEqual(run_pending_route_jobs(), 0)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertIsNotNone(job.finished_at)
+
+
+class PlanTripRouteTests(SimpleTestCase):
+    def test_status_counts_the_shift_already_used(self):
+        body = {
+            "hos_status": {
+                "drivingHoursUsed": 5.0,
+                "onDutyHoursUsed": 1.5,
+                "cycleHoursUsed": 20.0,
+            }
+        }
+        _, response = plan_trip_route(
+            (32.78, -96.8), (32.9, -96.9), (33.0, -97.0), body
+        )
+
+        driving = sum(
+            DutyBlock.from_dict(block).minutes
+            for block in response["hosSchedule"]
+            if block["status"] == "driving"
+        )
+        status = response["hosStatus"]
+        self.assertAlmostEqual(status["drivingHoursUsed"], 5.0 + driving / 60, 2)
+        self.assertGreaterEqual(status["onDutyHoursUsed"], 1.5)
+        self.assertEqual(
+            [v for v in status["violations"] if v["severity"] == "violation"], []
+        )
+
+
+class HOSWaypointTests(SimpleTestCase):
+    def test_rest_stops_are_mandatory(self):
+        # Dallas -> Austin -> New York: breaks and 10-hour resets on the way
+        waypoints = generate_hos_waypoints(
+            (32.78, -96.8), (30.27, -97.74), (40.71, -74.0), {}
+        )
+        waypoints.append(dict(waypoints[-1], type="rest"))
+        route = build_route_response(waypoints, [], 0.0, 0.0)["route"]
+
+        mandatory = {
+            waypoint["type"]
+            for waypoint in route["waypoints"]
+            if waypoint["is_mandatory"]
+        }
+        self.assertEqual(mandatory, {"rest", "rest_break", "mandatory_break"})
+
+
+class TripQueryBudgetTests(QueryBudgetTestMixin, TripTestMixin, APITestCase):
+    expand = "driver,vehicle,current_location,pickup_location,dropoff_location"
+
+    def setUp(self):
+        self.trips = self.create_trips(12)
+        self.client.force_login(self.trips[0].driver.user)
+
+    def test_list(self):
+        response = self.client.get("/api/trips/", {"expand": self.expand})
+        self.assertEqual(response.status_code, 200)
+        self.assertQueryBudget(response)
+        self.assertIsInstance(response.json()["results"][0]["driver"], dict)
+
+    def test_retrieve(self):
+        response = self.client.get(
+            f"/api/trips/{self.trips[0].id}/", {"expand": self.expand}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertQueryBudget(response)
@@ -0,0 +1,130 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# IN (%s, %s, ...) lists of any length are the same query shape
+_IN_LIST = re.compile(r"\((?:%s, )*%s\)")
+# Issued by atomic() only when a transaction is already open (as in tests),
+# so counting them would make the same request cost more under TestCase
+_SAVEPOINT = re.compile(r"(?:RELEASE |ROLLBACK TO )?SAVEPOINT ")
+
+
+def query_shape(sql: str) -> str:
+    return _IN_LIST.sub("(...)", sql)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    """
+    Queries one request ran: count, time spent in the database and how often
+    each SQL shape repeated. Installed as a connection execute_wrapper.
+    Savepoint statements are not counted.
+    """
+
+    __slots__ = ("count", "duration", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0  # seconds
+        self.shapes: Counter = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        if _SAVEPOINT.match(sql):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[query_shape(sql)] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """
+        (shape, count) of the shapes run at least `threshold` times: the
+        N+1 pattern of a query per row of an earlier one.
+        """
+        return [(sql, n) for sql, n in self.shapes.most_common() if n >= threshold]
+
+
+def view_query_budget(request) -> Optional[int]:
+    """
+    The `query_budget` of the viewset that served the request: an int for
+    every action, or a dict of action name -> int. None when not declared.
+    """
+    match = getattr(request, "resolver_match", None)
+    view_class = getattr(getattr(match, "func", None), "cls", None)
+    budget = getattr(view_class, "query_budget", None)
+    if isinstance(budget, dict):
+        actions = getattr(match.func, "actions", None) or {}
+        budget = budget.get(actions.get(request.method.lower()))
+    return budget
+
+
+class QueryCountMiddleware:
+    """
+    Counts the queries and database time of each request.
+
+    - Logs a warning for SQL shapes repeated QUERY_REPEAT_THRESHOLD times
+      and for requests over their viewset's `query_budget` (authentication
+      queries included); with QUERY_BUDGET_ENFORCE the latter raises
+      QueryBudgetExceeded instead, failing the test that made the request.
+    - With QUERY_COUNT_HEADERS, adds a Server-Timing header (db time and
+      query count, total time).
+    - Leaves the stats on `response.query_stats` for apps.utils.testing.
+
+    Queries run while a streaming response is consumed are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(stats))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        response.query_stats = stats
+        repeated = stats.repeated(settings.QUERY_REPEAT_THRESHOLD)
+        for sql, count in repeated:
+            logger.warning(
+                "%s %s repeated a query %d times: %s",
+                request.method,
+                request.path,
+                count,
+                sql,
+            )
+        if settings.QUERY_COUNT_HEADERS:
+            desc = f"{stats.count} queries"
+            if repeated:
+                desc += f", {len(repeated)} repeated"
+            response["Server-Timing"] = (
+                f'db;dur={stats.duration * 1000:.1f};desc="{desc}", '
+                f"total;dur={total * 1000:.1f}"
+            )
+
+        budget = view_query_budget(request)
+        if budget is not None and stats.count > budget:
+            message = (
+                f"{request.method} {request.path} ran {stats.count} queries, "
+                f"over its budget of {budget}"
+            )
+            if settings.QUERY_BUDGET_ENFORCE:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
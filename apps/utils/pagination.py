@@ -17,6 +17,9 @@ class CustomPagination(PageNumberPagination):
     def get_paginated_response(
         self, query_set: QuerySet, serializer_obj, request: HttpRequest
     ) -> dict:
+        # Join whatever ?expand= asks the serializer to nest
+        if hasattr(serializer_obj, "optimize_queryset"):
+            query_set = serializer_obj.optimize_queryset(query_set, request)
         try:
             page_data = self.paginate_queryset(query_set, request)
         except Exception:
@@ -0,0 +1,123 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db.models import Prefetch, QuerySet
+
+# ?expand=trip.driver,vehicle -> {"trip": {"driver": {}}, "vehicle": {}}
+Expansions = Dict[str, Dict[str, Any]]
+
+
+def parse_expand(value: Optional[str]) -> Expansions:
+    """
+    Parse a comma separated list of (dotted) relation names into a tree.
+    """
+    tree: Expansions = {}
+    for path in (value or "").split(","):
+        node = tree
+        for name in path.strip().split("."):
+            if not name:
+                break
+            node = node.setdefault(name, {})
+    return tree
+
+
+def request_expansions(request) -> Expansions:
+    if request is None:
+        return {}
+    params = getattr(request, "query_params", None) or request.GET
+    return parse_expand(params.get("expand"))
+
+
+class ExpandableSerializerMixin:
+    """
+    ModelSerializer mixin for flat read serializers: relations are rendered
+    as ids unless the request asks for them with ?expand=.
+
+    `expandable_fields` maps a relation on the model to the serializer used
+    when it is expanded; expansions nest with dots (?expand=trip.driver).
+    `optimize_queryset` applies the matching select_related/prefetch_related,
+    so a page costs the same number of queries whatever it expands.
+    Expansion only applies to output: serializers built with `data=` stay
+    flat so relations are written by id.
+    """
+
+    expandable_fields: Dict[str, type] = {}
+
+    def __init__(self, *args, expand: Optional[Expansions] = None, **kwargs):
+        self._expand = expand
+        super().__init__(*args, **kwargs)
+
+    def get_expansions(self) -> Expansions:
+        if self._expand is None:
+            if hasattr(self.root, "initial_data"):
+                return {}
+            self._expand = request_expansions(self.context.get("request"))
+        return self._expand
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name, nested in self.get_expansions().items():
+            serializer_class = self.expandable_fields.get(name)
+            if serializer_class is None:
+                continue
+            field = self.Meta.model._meta.get_field(name)
+            kwargs = {
+                "read_only": True,
+                "many": field.many_to_many or field.one_to_many,
+            }
+            if issubclass(serializer_class, ExpandableSerializerMixin):
+                kwargs["expand"] = nested
+            fields[name] = serializer_class(**kwargs)
+        return fields
+
+    @classmethod
+    def related_lookups(
+        cls, expand: Expansions, prefix: str = ""
+    ) -> Tuple[List[str], List[Prefetch]]:
+        """
+        select_related paths and Prefetch objects needed to render `expand`.
+        """
+        select: List[str] = []
+        prefetch: List[Prefetch] = []
+        for name, nested in expand.items():
+            serializer_class = cls.expandable_fields.get(name)
+            if serializer_class is None:
+                continue
+            field = cls.Meta.model._meta.get_field(name)
+            path = prefix + name
+            expandable = issubclass(serializer_class, ExpandableSerializerMixin)
+            if field.many_to_many or field.one_to_many:
+                queryset = field.related_model._default_manager.all()
+                if expandable:
+                    queryset = serializer_class.optimize_queryset(
+                        queryset, expand=nested
+                    )
+                prefetch.append(Prefetch(path, queryset=queryset))
+                continue
+            select.append(path)
+            if not expandable:
+                continue
+            nested_select, nested_prefetch = serializer_class.related_lookups(
+                nested, prefix=f"{path}__"
+            )
+            select += nested_select
+            prefetch += nested_prefetch
+        return select, prefetch
+
+    @classmethod
+    def optimize_queryset(
+        cls,
+        queryset: QuerySet,
+        request=None,
+        expand: Optional[Expansions] = None,
+    ) -> QuerySet:
+        """
+        Add the joins/prefetches for the request's (or the given) expansions.
+        """
+        if expand is None:
+            expand = request_expansions(request)
+        select, prefetch = cls.related_lookups(expand)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
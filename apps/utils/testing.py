@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.test import override_settings
+
+from apps.utils.middleware import QueryStats, view_query_budget
+
+
+class QueryBudgetTestMixin:
+    """
+    TestCase mixin for the query accounting of QueryCountMiddleware.
+
+    Every request made by the test client fails with QueryBudgetExceeded
+    when it runs more queries than its viewset's `query_budget`;
+    assertQueryBudget additionally checks one response against an explicit
+    budget and for repeated (N+1) query shapes.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._query_budget_settings = override_settings(QUERY_BUDGET_ENFORCE=True)
+        cls._query_budget_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._query_budget_settings.disable()
+        super().tearDownClass()
+
+    def assertQueryBudget(self, response, budget=None, allow_repeats=False):
+        stats: QueryStats = getattr(response, "query_stats", None)
+        if stats is None:
+            self.fail("Response has no query_stats; is QueryCountMiddleware on?")
+        if budget is None:
+            budget = view_query_budget(response.wsgi_request)
+        if budget is not None and stats.count > budget:
+            self.fail(
+                f"{stats.count} queries, over the budget of {budget}:\n"
+                + "\n".join(stats.shapes)
+            )
+        if not allow_repeats:
+            repeated = stats.repeated(settings.QUERY_REPEAT_THRESHOLD)
+            if repeated:
+                self.fail(
+                    "Repeated queries (N+1):\n"
+                    + "\n".join(f"{count}x {sql}" for sql, count in repeated)
+                )
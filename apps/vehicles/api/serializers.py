@@ -2,12 +2,15 @@ from rest_framework.serializers import ModelSerializer
 
 from apps.drivers.api.serializers import DriverSerializer
 from apps.locations.api.serializers import LocationSerializer
+from apps.utils.serializers import ExpandableSerializerMixin
 from apps.vehicles.models import Vehicle, VehicleLocation
 
 
-class VehicleSerializer(ModelSerializer):
-    current_driver = DriverSerializer(many=False, read_only=True)
-    last_known_location = LocationSerializer(many=False, read_only=True)
+class VehicleSerializer(ExpandableSerializerMixin, ModelSerializer):
+    expandable_fields = {
+        "current_driver": DriverSerializer,
+        "last_known_location": LocationSerializer,
+    }
 
     class Meta:
         model = Vehicle
@@ -21,10 +24,11 @@ class VehicleSerializer(ModelSerializer):
             "odometer",
             "status",
         ]
+        read_only_fields = ["current_driver", "last_known_location"]
 
 
-class VehicleLocationSerializer(ModelSerializer):
-    vehicle = VehicleSerializer(many=False, read_only=True)
+class VehicleLocationSerializer(ExpandableSerializerMixin, ModelSerializer):
+    expandable_fields = {"vehicle": VehicleSerializer}
 
     class Meta:
         model = VehicleLocation
@@ -37,3 +41,4 @@ class VehicleLocationSerializer(ModelSerializer):
             "speed",
             "timestamp",
         ]
+        read_only_fields = ["vehicle"]
@@ -14,6 +14,7 @@ class VehicleViewSet(BaseViewSet):
     queryset = Vehicle.objects.all()
     serializer_class = VehicleSerializer
     pagination_class = CustomPagination()
+    query_budget = {"list": 4, "retrieve": 3}
 
     def list(self, request, *args, **kwargs):
         """
@@ -50,7 +51,7 @@ class VehicleViewSet(BaseViewSet):
         """
         GET /api/vehicles/{vehicle_id}/ → retrieve a specific vehicle by ID.
         """
-        vehicle = self.queryset.filter(vehicle_id=kwargs.get("vehicle_id")).first()
+        vehicle = self.queryset.filter(id=kwargs.get("vehicle_id")).first()
         if vehicle is None:
             return Response(
                 {"message": "Vehicle not found"}, status=status.HTTP_404_NOT_FOUND
@@ -63,7 +64,7 @@ class VehicleViewSet(BaseViewSet):
         """
         PUT /api/vehicles/{vehicle_id}/ → update a vehicle.
         """
-        vehicle = self.queryset.filter(vehicle_id=kwargs.get("vehicle_id")).first()
+        vehicle = self.queryset.filter(id=kwargs.get("vehicle_id")).first()
         if vehicle is None:
             return Response(
                 {"message": "Vehicle not found"}, status=status.HTTP_404_NOT_FOUND
@@ -80,7 +81,7 @@ class VehicleViewSet(BaseViewSet):
         """
         DELETE /api/vehicles/{vehicle_id}/ → delete a vehicle.
         """
-        vehicle = self.queryset.filter(vehicle_id=kwargs.get("vehicle_id")).first()
+        vehicle = self.queryset.filter(id=kwargs.get("vehicle_id")).first()
         if vehicle is None:
             return Response(
                 {"message": "Vehicle not found"}, status=status.HTTP_404_NOT_FOUND
@@ -95,7 +96,7 @@ class VehicleViewSet(BaseViewSet):
         GET /api/vehicles/{vehicle_id}/locations/ → get location history for a vehicle.
         POST /api/vehicles/{vehicle_id}/locations/ → add a new location for a vehicle.
         """
-        vehicle = self.queryset.filter(vehicle_id=vehicle_id).first()
+        vehicle = self.queryset.filter(id=vehicle_id).first()
         if vehicle is None:
             return Response(
                 {"message": "Vehicle not found"}, status=status.HTTP_404_NOT_FOUND
@@ -113,11 +114,9 @@ class VehicleViewSet(BaseViewSet):
             return Response(paginated_res, status=status.HTTP_200_OK)
 
         # POST → add location
-        data = request.data.copy()
-        data["vehicle"] = vehicle.id
-        serializer = VehicleLocationSerializer(data=data)
+        serializer = VehicleLocationSerializer(data=request.data)
         if not serializer.is_valid(raise_exception=True):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer.save()
+        serializer.save(vehicle=vehicle)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -117,6 +117,7 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 MIDDLEWARE = [
+    "apps.utils.middleware.QueryCountMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -208,3 +209,62 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024 * 10  # 10MB limit
 
 # Django whitenoise forever-cacheable files and compression support
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+
+# Geocoding cache (seconds for TTLs)
+GEOCODE_CACHE_SIZE = env.int("GEOCODE_CACHE_SIZE", default=2048)
+GEOCODE_CACHE_TTL = env.int("GEOCODE_CACHE_TTL", default=60 * 60 * 24 * 30)
+GEOCODE_NEGATIVE_CACHE_TTL = env.int(
+    "GEOCODE_NEGATIVE_CACHE_TTL", default=60 * 60 * 24
+)
+GEOCODE_MAX_WORKERS = env.int("GEOCODE_MAX_WORKERS", default=4)
+GEOCODE_DEADLINE = env.float("GEOCODE_DEADLINE", default=10.0)
+
+# Geocoder backends, tried in order: local engines first, then the network
+GEOCODER_BACKENDS = env.list(
+    "GEOCODER_BACKENDS",
+    default=[
+        "apps.locations.geocoders.LocalGazetteerGeocoder",
+        "apps.locations.geocoders.NominatimGeocoder",
+    ],
+)
+GEOCODER_GAZETTEER_PATH = env("GEOCODER_GAZETTEER_PATH", default=None)
+GEOCODER_TIMEOUT = env.float("GEOCODER_TIMEOUT", default=6.0)
+NOMINATIM_URL = env(
+    "NOMINATIM_URL", default="https://nominatim.openstreetmap.org/search"
+)
+
+# Road network routing (OSM-derived edge list CSV); straight lines when unset
+ROUTING_GRAPH_PATH = env("ROUTING_GRAPH_PATH", default=None)
+ROUTING_LANDMARKS = env.int("ROUTING_LANDMARKS", default=8)
+ROUTING_DEFAULT_SPEED_MPH = env.float("ROUTING_DEFAULT_SPEED_MPH", default=55.0)
+
+# Cache shared by all workers (e.g. CACHE_URL=redis://...); LRU per process by default
+CACHES = {"default": env.cache_url("CACHE_URL", default="locmemcache://")}
+
+# Route results are memoized by rounded coordinates and routing engine version
+ROUTE_CACHE_PRECISION = env.int("ROUTE_CACHE_PRECISION", default=4)
+ROUTE_CACHE_TIMEOUT = env.int("ROUTE_CACHE_TIMEOUT", default=60 * 60 * 24)
+
+# Asynchronous route calculation jobs (0 workers = use `manage.py run_route_jobs`)
+ROUTE_JOB_WORKERS = env.int("ROUTE_JOB_WORKERS", default=2)
+ROUTE_JOB_MAX_WAIT = env.float("ROUTE_JOB_MAX_WAIT", default=25.0)
+# Seconds a runner holds a job; expired jobs are retried up to MAX_ATTEMPTS runs
+ROUTE_JOB_LEASE = env.int("ROUTE_JOB_LEASE", default=300)
+ROUTE_JOB_MAX_ATTEMPTS = env.int("ROUTE_JOB_MAX_ATTEMPTS", default=3)
+
+# Batch route planning runs inline by default: serverless hosts (Vercel)
+# cannot start worker processes. Set above 1 on a long-running server to
+# plan over that many spawned worker processes.
+ROUTE_BATCH_WORKERS = env.int("ROUTE_BATCH_WORKERS", default=1)
+ROUTE_BATCH_MAX_TRIPS = env.int("ROUTE_BATCH_MAX_TRIPS", default=100)
+
+# ELD duty event ingestion (events per NDJSON request)
+ELD_INGEST_MAX_EVENTS = env.int("ELD_INGEST_MAX_EVENTS", default=10000)
+
+# HOS check results are cached per log and input version (seconds)
+HOS_CHECK_CACHE_TIMEOUT = env.int("HOS_CHECK_CACHE_TIMEOUT", default=60 * 60)
+
+# Per-request query accounting (Server-Timing headers, N+1 and budget checks)
+QUERY_COUNT_HEADERS = env.bool("QUERY_COUNT_HEADERS", default=DEBUG)
+QUERY_REPEAT_THRESHOLD = env.int("QUERY_REPEAT_THRESHOLD", default=10)
+QUERY_BUDGET_ENFORCE = env.bool("QUERY_BUDGET_ENFORCE", default=False)